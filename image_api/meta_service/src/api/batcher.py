@@ -0,0 +1,117 @@
+import asyncio
+import contextvars
+import time
+
+from opentelemetry import trace
+
+from .executor import InferenceExecutor, InferenceQueueFull
+
+
+def run_batch(items: list) -> list:
+    """
+    Run batched calls one after another in the worker, every call in the context of its request
+    """
+    results = []
+    for ctx, func, args in items:
+        try:
+            results.append(ctx.run(func, *args))
+        except Exception as ex:
+            results.append(ex)
+    return results
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests to a processing block and dispatches them to the inference executor
+    as one batch of up to batch_size items, results are split back to the callers.
+    Requests are dispatched right away while a worker is idle, so batches only form when all workers are busy
+    and wait at most wait_time seconds for more items
+    """
+    def __init__(self, executor: InferenceExecutor, batch_size: int, wait_time: float, process_batch=run_batch):
+        self.executor = executor
+        self.batch_size = batch_size
+        self.wait_time = wait_time
+        self.process_batch = process_batch
+        self.limit = executor.limit * batch_size
+
+        self.__items = []
+        self.__pending = 0
+        self.__running = 0
+        self.__timer = None
+
+        self.__batches = 0
+        self.__batched_items = 0
+        self.__queueing_delay = 0.0
+        self.__max_queueing_delay = 0.0
+
+    async def submit(self, func, *args):
+        if self.__pending >= self.limit:
+            raise InferenceQueueFull(self.executor.retry_after)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # tracing context of the request is kept for its part of the batch
+        self.__items.append((contextvars.copy_context(), func, args, future, time.perf_counter()))
+        self.__pending += 1
+
+        if len(self.__items) >= self.batch_size or self.__running < self.executor.workers:
+            self.__flush()
+        elif self.__timer is None:
+            self.__timer = loop.call_later(self.wait_time, self.__flush)
+
+        try:
+            result, batch_size, delay = await future
+        finally:
+            self.__pending -= 1
+
+        span = trace.get_current_span()
+        span.set_attribute("batch.size", batch_size)
+        span.set_attribute("batch.queueing_delay_ms", delay * 1000)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def __flush(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+        while self.__items:
+            items, self.__items = self.__items[:self.batch_size], self.__items[self.batch_size:]
+            self.__running += 1
+            asyncio.ensure_future(self.__run(items))
+
+    async def __run(self, items: list):
+        dispatched = time.perf_counter()
+        delays = [dispatched - enqueued for *_, enqueued in items]
+        self.__batches += 1
+        self.__batched_items += len(items)
+        self.__queueing_delay += sum(delays)
+        self.__max_queueing_delay = max(self.__max_queueing_delay, *delays)
+
+        try:
+            results = await self.executor.run(self.process_batch, [(ctx, func, args) for ctx, func, args, *_ in items])
+        except Exception as ex:
+            results = [ex] * len(items)
+        finally:
+            self.__running -= 1
+
+        for (*_, future, _), result, delay in zip(items, results, delays):
+            if not future.done():
+                future.set_result((result, len(items), delay))
+
+        # a worker is free, requests collected meanwhile do not wait for the timer
+        if self.__items:
+            self.__flush()
+
+    def stats(self) -> dict:
+        return {
+            'batch_size': self.batch_size,
+            'wait_time_ms': self.wait_time * 1000,
+            'batches': self.__batches,
+            'items': self.__batched_items,
+            'pending': self.__pending,
+            'mean_batch_fill': self.__batched_items / ((self.__batches or 1) * self.batch_size),
+            'mean_queueing_delay_ms': self.__queueing_delay / (self.__batched_items or 1) * 1000,
+            'max_queueing_delay_ms': self.__max_queueing_delay * 1000,
+        }
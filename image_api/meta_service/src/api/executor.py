@@ -0,0 +1,58 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class InferenceQueueFull(Exception):
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+
+    def __str__(self):
+        return f"Inference queue is full, retry after {self.retry_after} seconds"
+
+
+class InferenceExecutor:
+    """
+    Runs blocking inference out of the event loop on a pool of workers,
+    requests above workers + queue_size are rejected instead of waiting
+    """
+    def __init__(self, workers: int, queue_size: int, retry_after: int):
+        self.workers = workers
+        self.limit = workers + queue_size
+        self.retry_after = retry_after
+        self.__pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+        self.__pending = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self.__pending
+
+    def __acquire(self):
+        with self.__lock:
+            if self.__pending >= self.limit:
+                raise InferenceQueueFull(self.retry_after)
+            self.__pending += 1
+
+    def __release(self):
+        with self.__lock:
+            self.__pending -= 1
+
+    async def run(self, func, *args, **kwargs):
+        self.__acquire()
+        try:
+            # tracing context of the request is kept in the worker thread
+            ctx = contextvars.copy_context()
+            future = self.__pool.submit(partial(ctx.run, func, *args, **kwargs))
+        except BaseException:
+            self.__release()
+            raise
+
+        # the slot is held until the worker is done, a cancelled request does not stop the running inference
+        future.add_done_callback(lambda _: self.__release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self.__pool.shutdown(wait=False)
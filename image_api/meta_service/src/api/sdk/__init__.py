@@ -1,6 +1,8 @@
-from .errors import BlockInitialisationException
+from plib.tracing.utils import ContextStub, get_tracer
+
+from .errors import BlockInitialisationException, UnknownUnitType
 from .utils import ContextUtils
-from .legacy_pb import LegacyProcessingBlock
+from .legacy_pb import LegacyProcessingBlock, shared_captures
 import grpc
 
 
@@ -23,16 +25,32 @@ class ProcessingBlock:
                 raise BlockInitialisationException(f"Failed to initialize processing block {e}")
 
     def process(self, sample_input: dict, version: str):
+        io_data = self.prepare_input(sample_input, self.conversion_needle)
+        self.run(io_data, version)
+        return self.prepare_output(io_data, sample_input)
+
+    @staticmethod
+    def prepare_input(sample_input: dict, conversion_needle: str) -> dict:
         io_data = {}
         for k, conversion_func in [
-            ('image', lambda x: ContextUtils.image2bsm(x['blob'], self.conversion_needle)),
+            ('image', lambda x: ContextUtils.image2bsm(x['blob'], conversion_needle)),
             ('objects', lambda x: x)
         ]:
             if k in sample_input and sample_input[k]:
                 io_data[k] = conversion_func(sample_input[k])
 
         ContextUtils.prepare_context(io_data)
+        return io_data
+
+    @staticmethod
+    def prepare_output(io_data: dict, sample_input: dict) -> dict:
+        ContextUtils.clean_trash(io_data)
+
+        if 'image' in sample_input:
+            io_data['image'] = sample_input['image']
+        return io_data
 
+    def run(self, io_data: dict, version: str):
         if type(self.block) is LegacyProcessingBlock:
             self.block(io_data, version)
         else:
@@ -42,12 +60,6 @@ class ProcessingBlock:
             self.__merge_objects(objects, io_data['objects'])  # probable objects's mismatch
             io_data['objects'] = objects
 
-        ContextUtils.clean_trash(io_data)
-
-        if 'image' in sample_input:
-            io_data['image'] = sample_input['image']
-        return io_data
-
     @staticmethod
     def __merge_objects(objects, new_objects):
         for idx, n_o in enumerate(new_objects):
@@ -60,6 +72,37 @@ class ProcessingBlock:
             self.processing_provider.close()
 
 
+class ProcessingPipeline:
+    """
+    Several processing blocks of one service run over a single decoded image,
+    every block gets objects detected by the previous ones. Legacy detector blocks with the same capturer
+    detect faces once per run, the later ones reuse the captured faces
+    """
+    def __init__(self, blocks: dict, conversion_needle):
+        self.blocks = blocks
+        self.conversion_needle = conversion_needle
+
+    def process(self, sample_input: dict, block_names: list, version: str):
+        tracer = get_tracer(__name__)
+
+        unknown_blocks = [name for name in block_names if name not in self.blocks]
+        if unknown_blocks:
+            raise UnknownUnitType(f"Unknown pipeline blocks {unknown_blocks}")
+
+        io_data = ProcessingBlock.prepare_input(sample_input, self.conversion_needle)
+
+        token = shared_captures.set({})
+        try:
+            for name in block_names:
+                with tracer.start_as_current_span(f"pipeline_{name}") if tracer else ContextStub():
+                    self.blocks[name].run(io_data, version)
+                    ContextUtils.clean_trash(io_data)
+        finally:
+            shared_captures.reset(token)
+
+        return ProcessingBlock.prepare_output(io_data, sample_input)
+
+
 class ProcessingBlockFactory:
     @staticmethod
     def create_face_sdk_block(fsdk_dll_path, fsdk_conf_dir_path, config: dict, conversion_needle: str):
@@ -85,3 +128,13 @@ class ProcessingBlockFactory:
         processing_provider = grpc.insecure_channel(grpc_url)
 
         return ProcessingBlock(processing_provider, config, conversion_needle, access_data)
+
+    @staticmethod
+    def create_face_sdk_pipeline(fsdk_dll_path, fsdk_conf_dir_path, configs: dict, conversion_needle: str):
+        from face_sdk import FacerecService
+        processing_provider = FacerecService.create_service(fsdk_dll_path, fsdk_conf_dir_path, '')
+
+        return ProcessingPipeline(
+            {name: ProcessingBlock(processing_provider, config, conversion_needle) for name, config in configs.items()},
+            conversion_needle
+        )
@@ -1,6 +1,8 @@
 import copy
 import re
+from contextvars import ContextVar
 from io import BytesIO
+from typing import Optional
 import numpy as np
 from grpc._channel import _InactiveRpcError
 from plib.tracing.utils import ContextStub, get_tracer
@@ -8,6 +10,9 @@ from plib.tracing.utils import ContextStub, get_tracer
 from .errors import InvalidContextException, UnknownUnitType
 from .utils import ContextUtils
 
+# faces captured during one pipeline run by (image, capturer), blocks with the same capturer do not detect again
+shared_captures: ContextVar[Optional[dict]] = ContextVar('shared_captures', default=None)
+
 
 class LegacyProcessingBlock:
     # TODO[QLC] crutch. remove grpc_service after wrapper service appear
@@ -24,6 +29,7 @@ class LegacyProcessingBlock:
         unit_type = config['unit_type'][1:]
         config['unit_type'] = unit_type
         self.enable_use_cuda = config.get('use_cuda')
+        self.__raw_image_capture = not config.get('disable_raw_image_capture')
 
         # TODO[QLC] crutch. remove sub_config after wrapper service appear
         self.sub_config = config.get('sub_block_config')
@@ -117,6 +123,8 @@ class LegacyProcessingBlock:
                     ), matching=True, processing=False
                 )
             elif el == 'capturer':
+                self.__capturer_key = (config['capturer_config'], self.enable_use_cuda,
+                                       self.downscale_rawsamples_to_preferred_size)
                 self.__capturer = self.service.create_capturer(
                     self.__resolve_config(
                         config['capturer_config'],
@@ -159,6 +167,28 @@ class LegacyProcessingBlock:
             self.__init_block()
             raise er
 
+    def __capture(self, bsm: dict):
+        captures = shared_captures.get()
+        if captures is None:
+            return self.__detect(bsm)
+
+        key = (id(bsm), self.__capturer_key)
+        if key not in captures:
+            captures[key] = self.__detect(bsm)
+        return captures[key]
+
+    def __detect(self, bsm: dict):
+        if self.__raw_image_capture:
+            raw_image = ContextUtils.bsm2raw_image(bsm)
+            if raw_image is not None:
+                try:
+                    return self.__capturer.capture(raw_image)
+                except TypeError:
+                    # capturer of this face_sdk version takes encoded images only
+                    self.__raw_image_capture = False
+
+        return self.__capturer.capture(ContextUtils.bsm2image(bsm))
+
     @staticmethod
     def __get_detect(id, _class, cap_obj, img_shape) -> dict:
         bbx = cap_obj.get_rectangle()
@@ -180,7 +210,7 @@ class LegacyProcessingBlock:
         ctx_objects = ctx['objects']
 
         with tracer.start_as_current_span("fitter_capture_v1") if tracer else ContextStub() as span:
-            cap_objects = self.__capturer.capture(ContextUtils.bsm2image(ctx['image']))
+            cap_objects = self.__capture(ctx['image'])
 
         for idx, cap_obj in enumerate(cap_objects):
             if (idx + 1) > len(ctx_objects):  # TODO use merge_objects function in ContextUtils
@@ -207,7 +237,7 @@ class LegacyProcessingBlock:
         ctx_objects = ctx['objects']
 
         with tracer.start_as_current_span("fitter_capture_v2") if tracer else ContextStub() as span:
-            cap_objects = self.__capturer.capture(ContextUtils.bsm2image(ctx['image']))
+            cap_objects = self.__capture(ctx['image'])
 
         for idx, cap_obj in enumerate(cap_objects):
             if (idx + 1) > len(ctx_objects):  # TODO use merge_objects function in ContextUtils
@@ -234,7 +264,7 @@ class LegacyProcessingBlock:
         ctx_objects = ctx['objects']
 
         with tracer.start_as_current_span("liveness_capture") if tracer else ContextStub() as span:
-            cap_objects = self.__capturer.capture(ContextUtils.bsm2image(ctx['image']))
+            cap_objects = self.__capture(ctx['image'])
 
         for idx, cap_obj in enumerate(cap_objects):
             if (idx + 1) > len(ctx_objects):  # TODO use merge_objects function in ContextUtils
@@ -269,7 +299,7 @@ class LegacyProcessingBlock:
         ctx_objects = ctx['objects']
 
         with tracer.start_as_current_span("template_capture_v1") if tracer else ContextStub() as span:
-            cap_objects = self.__capturer.capture(ContextUtils.bsm2image(ctx['image']))
+            cap_objects = self.__capture(ctx['image'])
 
         for idx, cap_obj in enumerate(cap_objects):
             if (idx + 1) > len(ctx_objects):  # TODO use merge_objects function in ContextUtils
@@ -301,7 +331,7 @@ class LegacyProcessingBlock:
         ctx_objects = ctx['objects']
 
         with tracer.start_as_current_span("template_capture_v2") if tracer else ContextStub() as span:
-            cap_objects = self.__capturer.capture(ContextUtils.bsm2image(ctx['image']))
+            cap_objects = self.__capture(ctx['image'])
 
         for idx, cap_obj in enumerate(cap_objects):
             if (idx + 1) > len(ctx_objects):  # TODO use merge_objects function in ContextUtils
@@ -328,10 +358,66 @@ class LegacyProcessingBlock:
                 })
         return ctx
 
+    def __match_matrix(self, probe_templates: list, gallery_templates: list) -> list:
+        """
+        Match results of every probe against every gallery template, one index and one search for all probes
+        """
+        if not probe_templates or not gallery_templates:
+            return [[] for _ in probe_templates]
+
+        template_index = self.__recognizer.create_index(gallery_templates, 1)
+        search_results = self.__recognizer.search(
+            probe_templates,
+            template_index,
+            len(gallery_templates),
+            self.facesdk_recognizer.SearchAccelerationType.NO_SEARCH_ACCELERATION)
+
+        matrix = []
+        for probe_search_results in search_results:
+            row = [None] * len(gallery_templates)
+            for search_result in probe_search_results:
+                row[int(search_result.i)] = search_result.match_result
+            matrix.append(row)
+        return matrix
+
+    @staticmethod
+    def __is_verification_matrix(ctx_objects: list) -> bool:
+        return any(obj.get('role') in ('probe', 'gallery') for obj in ctx_objects)
+
+    def __verification_matrix(self, ctx, get_blob):
+        probes, gallery = [], []
+        for obj in ctx['objects']:
+            if obj.get('class') == 'face':
+                (gallery if obj.get('role') == 'gallery' else probes).append(obj)
+
+        matrix = self.__match_matrix(
+            [self.__recognizer.load_template(BytesIO(get_blob(obj))) for obj in probes],
+            [self.__recognizer.load_template(BytesIO(get_blob(obj))) for obj in gallery]
+        )
+
+        ctx.update({
+            "verification_matrix": {
+                "probe_ids": [obj['id'] for obj in probes],
+                "gallery_ids": [obj['id'] for obj in gallery],
+                "results": [[{
+                    "distance": result.distance,
+                    "fa_r": result.fa_r,
+                    "fr_r": result.fr_r,
+                    "score": result.score
+                } for result in row] for row in matrix]
+            }
+        })
+
+        return ctx
+
     def verify_matcher_block_v1(self, ctx):
         tracer = get_tracer(__name__)
 
         ctx_objects = ctx['objects']
+        if self.__is_verification_matrix(ctx_objects):
+            with tracer.start_as_current_span("verify_matrix_v1") if tracer else ContextStub() as span:
+                return self.__verification_matrix(ctx, lambda obj: obj['template']['blob'])
+
         templates = []
         for obj in ctx_objects[:2]:
             if obj.get('class') == 'face':
@@ -360,6 +446,12 @@ class LegacyProcessingBlock:
             .split('v')
 
         ctx_objects = ctx['objects']
+        if self.__is_verification_matrix(ctx_objects):
+            with tracer.start_as_current_span("verify_matrix_v2") if tracer else ContextStub() as span:
+                return self.__verification_matrix(
+                    ctx, lambda obj: obj['template'][f"face_template_extractor_{weight}_{version}"]['blob']
+                )
+
         templates = []
         for obj in ctx_objects[:2]:
             if obj.get('class') == 'face':
@@ -419,49 +511,35 @@ class LegacyProcessingBlock:
             if obj.get('class') == 'face':
                 templates.append(self.__recognizer.load_template(BytesIO(obj['template']['blob'])))
 
+        # every template against every other one, the old per pair index is replaced by one pass over all of them
+        matrix = self.__match_matrix(templates, templates)
+
         matches = []
         unique_accord = []
-        for i in range(len(ctx_objects)):
-            for j in range(len(ctx_objects)):
-                s1_id, templates_1 = ctx_objects[i]['id'], [templates[i]]
-                s2_id, templates_2 = ctx_objects[j]['id'], [templates[j]]
+        for i, row in enumerate(matrix):
+            for j, match_result in enumerate(row):
+                if i == j:
+                    continue
+
+                # legacy accord format, object of the query is always the first one
+                accord = [f"{ctx_objects[i]['id']}@{ctx_objects[0]['id']}",
+                          f"{ctx_objects[j]['id']}@{ctx_objects[0]['id']}"]
 
-                if i == j or not len(templates_1) or not len(templates_2):
+                if set(accord) in unique_accord:
                     continue
 
-                template_index = self.__recognizer.create_index(templates_2, 1)
-                query_k_nearest = len(templates_2)
-
-                list_search_results = []
-                for query_template in templates_1:
-                    search_results = self.__recognizer.search(
-                        [query_template],
-                        template_index,
-                        query_k_nearest,
-                        self.facesdk_recognizer.SearchAccelerationType.NO_SEARCH_ACCELERATION)
-                    list_search_results.append(search_results[0])
-
-                for q, search_results in enumerate(list_search_results):
-                    obj1_id = ctx_objects[q]['id']
-                    for search_result in search_results:
-                        obj2_id = ctx_objects[int(search_result.i)]['id']
-                        accord = [f"{s1_id}@{obj1_id}", f"{s2_id}@{obj2_id}"]
-
-                        if set(accord) in unique_accord:
-                            continue
-
-                        is_similar = search_result.match_result.score >= 0.9
-
-                        matches.append({
-                            "accord": accord,
-                            "confidence": search_result.match_result.score if is_similar
-                            else 1 - search_result.match_result.score,
-                            "is_similar": is_similar,
-                        })
-                        unique_accord.append(set(accord))
+                is_similar = match_result.score >= 0.9
+
+                matches.append({
+                    "accord": accord,
+                    "confidence": match_result.score if is_similar else 1 - match_result.score,
+                    "is_similar": is_similar,
+                })
+                unique_accord.append(set(accord))
 
         ctx.update({
-            "matches": matches
+            "matches": matches,
+            "score_matrix": [[match_result.score for match_result in row] for row in matrix]
         })
 
         return ctx
@@ -513,10 +591,8 @@ class LegacyProcessingBlock:
             if (obj_class := ctx_object.get('class')) is not None and obj_class != 'face':
                 face_object_offset += 1
 
-        png_image = ContextUtils.bsm2image(ctx['image'])
-
         with tracer.start_as_current_span("quality_antispoofing_capture") if tracer else ContextStub() as span:
-            capture_obj = self.__capturer.capture(png_image)
+            capture_obj = self.__capture(ctx['image'])
 
         if len(capture_obj) > 1 and self.additional_variables['reject_many_faces']:
             raise InvalidContextException('More than one face detected')
@@ -555,7 +631,8 @@ class LegacyProcessingBlock:
                     f' is less than the threshold ({threshold})'
                 )
 
-            request = self.types.AntispoofingRequest(data=BytesIO(png_image))
+            # antispoofing service takes encoded images, so PNG is made only when it is requested
+            request = self.types.AntispoofingRequest(data=BytesIO(ContextUtils.bsm2image(ctx['image'])))
 
             try:
                 with tracer.start_as_current_span("quality_antispoofing_request") if tracer else ContextStub() as span:
@@ -2,6 +2,11 @@ import cv2
 import numpy as np
 import cv2
 
+try:
+    from face_sdk.modules.raw_image import RawImage, Format
+except ImportError:
+    RawImage = Format = None
+
 
 class ContextUtils:
     @classmethod
@@ -55,6 +60,18 @@ class ContextUtils:
         _, img = cv2.imencode('.png', image_vector)
         return img.tobytes()
 
+    @classmethod
+    def bsm2raw_image(cls, bsm: dict):
+        """
+        Decoded pixel buffer for the capturer without encoding, None if face_sdk has no RawImage
+        """
+        if RawImage is None:
+            return None
+
+        height, width = bsm['shape'][:2]
+        image_format = Format.FORMAT_RGB if bsm.get('color_model') == "RGB" else Format.FORMAT_BGR
+        return RawImage(width, height, image_format, bsm['blob'])
+
     @classmethod
     def bsm2array(cls, bsm: dict) -> np.array:
         return np.frombuffer(bsm['blob'], np.uint8).reshape(bsm['shape'])
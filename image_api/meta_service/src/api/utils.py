@@ -57,3 +57,35 @@ def sample_binary_resolver_v2(sample):
                     sample[k] = base64.b64encode(sample[k]).decode('ascii')
                 except base64.binascii.Error:
                     raise B64Exception('Sample base64 ecoding exception')
+
+
+def sample_bytes_resolver(sample, bsm_char="$"):
+    """
+    Binary request counterpart of sample_b64_resolver, blobs are already raw bytes
+    """
+    if type(sample) == list:
+        for obj in sample:
+            sample_bytes_resolver(obj, bsm_char)
+    elif type(sample) == dict:
+        for k, v in list(sample.items()):
+            if k.startswith(bsm_char):
+                sample[k[1:]] = v
+                del sample[k]
+            if type(v) in [list, dict]:
+                sample_bytes_resolver(v, bsm_char)
+
+
+def sample_bytes_output_resolver(sample):
+    """
+    Binary response counterpart of sample_binary_resolver, blobs are marked by $ and left as raw bytes
+    """
+    if type(sample) == list:
+        for obj in sample:
+            sample_bytes_output_resolver(obj)
+    elif type(sample) == dict:
+        for k, v in list(sample.items()):
+            if type(v) in [list, dict]:
+                sample_bytes_output_resolver(v)
+            elif type(v) == bytes:
+                sample["$" + str(k)] = v
+                del sample[k]
@@ -0,0 +1,98 @@
+"""
+Throughput of concurrent requests with inference called in the event loop against the inference executor,
+a fake processing block sleeps instead of face_sdk inference
+
+    python benchmark_inference_executor.py --requests 200 --concurrency 16 --latency 20 --workers 4 --batch-size 8
+"""
+import argparse
+import asyncio
+import time
+
+from api.batcher import MicroBatcher
+from api.executor import InferenceExecutor, InferenceQueueFull
+
+
+class FakeProcessingBlock:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def process(self, sample_input: dict, version: str):
+        time.sleep(self.latency)  # face_sdk releases the GIL during inference
+        return sample_input
+
+
+async def heartbeat(stop: asyncio.Event, lags: list, period: float = 0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(period)
+        lags.append(time.perf_counter() - start - period)
+
+
+async def load(handler, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async def request():
+        async with semaphore:
+            status = await handler()
+            statuses[status] = statuses.get(status, 0) + 1
+
+    stop, lags = asyncio.Event(), []
+    heartbeat_task = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[request() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await heartbeat_task
+
+    return {'rps': statuses.get(200, 0) / elapsed, 'statuses': statuses, 'max_loop_lag': max(lags, default=0)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200, help='Number of requests')
+    parser.add_argument('--concurrency', type=int, default=16, help='Number of concurrent clients')
+    parser.add_argument('--latency', type=float, default=20, help='Inference time of the fake block, ms')
+    parser.add_argument('--workers', type=int, default=4, help='Inference workers')
+    parser.add_argument('--queue-size', type=int, default=16, help='Inference queue size')
+    parser.add_argument('--batch-size', type=int, default=8, help='Micro-batch size')
+    parser.add_argument('--batch-wait', type=float, default=5, help='Micro-batch wait time, ms')
+    args = parser.parse_args()
+
+    block = FakeProcessingBlock(args.latency / 1000)
+    executor = InferenceExecutor(args.workers, args.queue_size, retry_after=1)
+
+    async def in_event_loop():
+        block.process({}, 'v1')
+        return 200
+
+    async def in_executor():
+        try:
+            await executor.run(block.process, {}, 'v1')
+            return 200
+        except InferenceQueueFull:
+            return 503
+
+    batcher = MicroBatcher(executor, args.batch_size, args.batch_wait / 1000)
+
+    async def in_batches():
+        try:
+            await batcher.submit(block.process, {}, 'v1')
+            return 200
+        except InferenceQueueFull:
+            return 503
+
+    for title, handler in [('in event loop', in_event_loop), ('executor', in_executor), ('batched', in_batches)]:
+        result = asyncio.run(load(handler, args.requests, args.concurrency))
+        print(f"{title}: {result['rps']:.1f} successful requests/s, statuses {result['statuses']}, "
+              f"max event loop lag {result['max_loop_lag'] * 1000:.1f} ms")
+
+    stats = batcher.stats()
+    print(f"batched: {stats['batches']} dispatches for {stats['items']} requests, "
+          f"mean fill {stats['mean_batch_fill']:.2f}, mean queueing delay {stats['mean_queueing_delay_ms']:.1f} ms")
+
+    executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,3 +11,7 @@ class RequestException(Exception):
 
 class B64Exception(RequestException):
     pass
+
+
+class BSONException(RequestException):
+    pass
@@ -1,5 +1,7 @@
 import importlib
 import logging
+
+import bson
 from functools import partial
 from typing import Optional
 
@@ -10,7 +12,13 @@ from settings import (APP_ROOT_PATH,
                       BLOCK_CONFIG,
                       FACE_SDK_CONF_DIR_PATH,
                       FACE_SDK_DLL_PATH,
+                      INFERENCE_BATCH_SIZE,
+                      INFERENCE_BATCH_WAIT,
+                      INFERENCE_QUEUE_SIZE,
+                      INFERENCE_RETRY_AFTER,
+                      INFERENCE_WORKERS,
                       MAX_BODY_SIZE,
+                      PIPELINE_CONFIG,
                       PROCESSING_DEPENDENCIES,
                       GRPC_SERVICE_URL,
                       UNIT_TYPE,
@@ -25,20 +33,24 @@ from settings import (APP_ROOT_PATH,
 
 from fastapi.staticfiles import StaticFiles
 from api.description import get_app_description
+from api.batcher import MicroBatcher
+from api.executor import InferenceExecutor, InferenceQueueFull
 
-from api.sdk import ProcessingBlock, ProcessingBlockFactory
+from api.sdk import ProcessingBlock, ProcessingBlockFactory, ProcessingPipeline
 from api.sdk.errors import SDKException
 
-from api.utils import sample_b64_resolver, sample_binary_resolver, sample_binary_resolver_v2
-from errors import RequestException
+from api.utils import (sample_b64_resolver, sample_binary_resolver, sample_binary_resolver_v2,
+                       sample_bytes_resolver, sample_bytes_output_resolver)
+from errors import BSONException, RequestException
 
-from fastapi import FastAPI, File, HTTPException, Request
+from fastapi import FastAPI, File, Form, HTTPException, Request
 from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from plib.tracing.utils import ContextStub, get_top_context_from_request
 
 processing_block: Optional[ProcessingBlock] = None
+processing_pipeline: Optional[ProcessingPipeline] = None
 
 swagger_ui_parameters = {
     "syntaxHighlight.theme": "obsidian",
@@ -58,6 +70,20 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 set_tracing_flag(bool(TRACING_ENABLED))
 tracer = ConnectionManager.init_connection(SERVICE_NAME, TRACER_URL)
 
+inference_executor = InferenceExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE, INFERENCE_RETRY_AFTER)
+inference_batcher = MicroBatcher(
+    inference_executor, INFERENCE_BATCH_SIZE, INFERENCE_BATCH_WAIT / 1000
+) if INFERENCE_BATCH_SIZE > 1 else None
+
+
+async def run_inference(processor, *args):
+    """
+    Run processing block request on the inference executor, batched with concurrent ones if batching is enabled
+    """
+    if inference_batcher is not None:
+        return await inference_batcher.submit(processor, *args)
+    return await inference_executor.run(processor, *args)
+
 
 @app.middleware("http")
 async def check_content_length(request: Request, call_next):
@@ -73,12 +99,13 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={'detail': exc.detail},
+        headers=getattr(exc, 'headers', None),
     )
 
 
 @app.on_event("startup")
 async def startup_event():
-    global processing_block
+    global processing_block, processing_pipeline
 
     if UNIT_TYPE in GRPC_BLOCKS:
         processing_block = ProcessingBlockFactory().create_grpc_block(
@@ -94,11 +121,18 @@ async def startup_event():
             FACE_SDK_DLL_PATH, FACE_SDK_CONF_DIR_PATH, BLOCK_CONFIG, CONVERSION_NEEDLE
         )
 
+    if PIPELINE_CONFIG:
+        processing_pipeline = ProcessingBlockFactory().create_face_sdk_pipeline(
+            FACE_SDK_DLL_PATH, FACE_SDK_CONF_DIR_PATH, PIPELINE_CONFIG, CONVERSION_NEEDLE
+        )
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    global processing_block
+    global processing_block, processing_pipeline
+    inference_executor.shutdown()
     del processing_block
+    del processing_pipeline
 
 
 def convert_sample_to_v1_output(sample: dict):
@@ -134,13 +168,15 @@ for version, params in VERSION_CONFIG.items():
     SampleInput = module.SampleInput
 
 
-    def web_sample_processor(sample_input: dict, api_version: str, resp_sample):
-        global processing_block
+    def web_sample_processor(sample_input: dict, api_version: str, resp_sample, block_names: Optional[list] = None):
         if api_version == 'v1':
             convert_sample_v1_to_input(sample_input)
         bsm_char = {"v1": "$", "v2": "_"}[api_version]
         sample_b64_resolver(sample_input, bsm_char)
-        n_sample = processing_block.process(sample_input, api_version)
+        if block_names is None:
+            n_sample = processing_block.process(sample_input, api_version)
+        else:
+            n_sample = processing_pipeline.process(sample_input, block_names, api_version)
         if api_version == 'v1':
             convert_sample_to_v1_output(n_sample)
             sample_binary_resolver(n_sample)
@@ -156,7 +192,11 @@ for version, params in VERSION_CONFIG.items():
         ctx = get_top_context_from_request(request)
         with tracer.start_as_current_span("process_sample", context=ctx) if tracer else ContextStub() as span:
             try:
-                return web_sample_processor(sample_input.dict(by_alias=True), api_version, resp_sample)
+                return await run_inference(
+                    web_sample_processor, sample_input.dict(by_alias=True), api_version, resp_sample
+                )
+            except InferenceQueueFull as ex:
+                raise HTTPException(status_code=503, detail=str(ex), headers={'Retry-After': str(ex.retry_after)})
             except (RequestException, SDKException) as ex:
                 span.set_status(Status(StatusCode.ERROR))
                 span.record_exception(ex)
@@ -184,7 +224,9 @@ for version, params in VERSION_CONFIG.items():
                             "format": "IMAGE"
                         }
                     }
-                    return web_sample_processor(sample_input, api_version, resp_sample)
+                    return await run_inference(web_sample_processor, sample_input, api_version, resp_sample)
+                except InferenceQueueFull as ex:
+                    raise HTTPException(status_code=503, detail=str(ex), headers={'Retry-After': str(ex.retry_after)})
                 except (RequestException, SDKException) as ex:
                     raise HTTPException(status_code=400, detail=str(ex))
 
@@ -197,6 +239,117 @@ for version, params in VERSION_CONFIG.items():
         # else:
         #     app.post(f"/{version}/process/image", response_model=Sample, tags=[version])(partial_func)
 
+    if PIPELINE_CONFIG:
+        async def process_pipeline(resp_sample,
+                                   api_version, request: Request,
+                                   image: bytes = File(..., description="Image supplied to the input"),
+                                   blocks: str = Form(..., description="Comma separated processing blocks, "
+                                                                       "run in the given order")):
+            """
+            Decode the image once and run several processing blocks over it, merged sample is returned
+            """
+            ctx = get_top_context_from_request(request)
+            with tracer.start_as_current_span("process_pipeline", context=ctx) if tracer else ContextStub() as span:
+                try:
+                    sample_input = {
+                        "image": {
+                            "blob": image,
+                            "format": "IMAGE"
+                        }
+                    }
+                    block_names = [name.strip() for name in blocks.split(',') if name.strip()]
+                    return await inference_executor.run(
+                        web_sample_processor, sample_input, api_version, resp_sample, block_names
+                    )
+                except InferenceQueueFull as ex:
+                    raise HTTPException(status_code=503, detail=str(ex), headers={'Retry-After': str(ex.retry_after)})
+                except (RequestException, SDKException) as ex:
+                    span.set_status(Status(StatusCode.ERROR))
+                    span.record_exception(ex)
+                    raise HTTPException(status_code=400, detail=str(ex))
+
+
+        partial_func = partial(process_pipeline, Sample, version)
+        partial_func.__doc__ = process_pipeline.__doc__
+        if version == 'v1':
+            app.post("/process/pipeline", response_model=Sample, tags=[version])(partial_func)
+
+
+BSON_MEDIA_TYPE = 'application/bson'
+
+
+def binary_sample_processor(sample_input: dict, block_names: Optional[list] = None):
+    """
+    v1 sample with raw bytes instead of base64 strings, the response is not validated by pydantic
+    """
+    convert_sample_v1_to_input(sample_input)
+    sample_bytes_resolver(sample_input)
+    if block_names is None:
+        n_sample = processing_block.process(sample_input, 'v1')
+    else:
+        n_sample = processing_pipeline.process(sample_input, block_names, 'v1')
+    convert_sample_to_v1_output(n_sample)
+    sample_bytes_output_resolver(n_sample)
+    return Response(content=bson.dumps(n_sample), media_type=BSON_MEDIA_TYPE)
+
+
+async def binary_response(request: Request, span_name: str, run, *args):
+    ctx = get_top_context_from_request(request)
+    with tracer.start_as_current_span(span_name, context=ctx) if tracer else ContextStub() as span:
+        try:
+            return await run(binary_sample_processor, *args)
+        except InferenceQueueFull as ex:
+            raise HTTPException(status_code=503, detail=str(ex), headers={'Retry-After': str(ex.retry_after)})
+        except (RequestException, SDKException) as ex:
+            span.set_status(Status(StatusCode.ERROR))
+            span.record_exception(ex)
+            raise HTTPException(status_code=400, detail=str(ex))
+
+
+@app.post("/process/sample/binary", tags=['binary'])
+async def process_sample_binary(request: Request,
+                                sample: bytes = File(..., description="v1 sample in BSON, $ fields hold raw bytes")):
+    """
+    Binary variant of /process/sample, BSON sample is returned
+    """
+    try:
+        sample_input = bson.loads(sample)
+    except Exception:
+        raise HTTPException(status_code=400, detail=str(BSONException('Failed to decode BSON sample')))
+    return await binary_response(request, "process_sample_binary", run_inference, sample_input)
+
+
+if not PROCESSING_DEPENDENCIES:
+    @app.post("/process/image/binary", tags=['binary'])
+    async def process_image_binary(request: Request,
+                                   image: bytes = File(..., description="Image supplied to the input")):
+        """
+        Binary variant of /process/image, BSON sample is returned
+        """
+        sample_input = {"image": {"blob": image, "format": "IMAGE"}}
+        return await binary_response(request, "process_image_binary", run_inference, sample_input)
+
+
+if PIPELINE_CONFIG:
+    @app.post("/process/pipeline/binary", tags=['binary'])
+    async def process_pipeline_binary(request: Request,
+                                      image: bytes = File(..., description="Image supplied to the input"),
+                                      blocks: str = Form(..., description="Comma separated processing blocks, "
+                                                                          "run in the given order")):
+        """
+        Binary variant of /process/pipeline, BSON sample is returned
+        """
+        sample_input = {"image": {"blob": image, "format": "IMAGE"}}
+        block_names = [name.strip() for name in blocks.split(',') if name.strip()]
+        return await binary_response(
+            request, "process_pipeline_binary", inference_executor.run, sample_input, block_names
+        )
+
+
+@app.get("/metrics/batching", include_in_schema=False)
+async def batching_metrics():
+    return inference_batcher.stats() if inference_batcher is not None else {}
+
 
 @app.get("/docs", include_in_schema=False)
 async def custom_swagger_ui_html():
@@ -16,6 +16,8 @@ def bool_env_convert_func(env_name):
 BLOCK_CONFIG['use_avx2'] = bool_env_convert_func('ENABLE_USE_AVX2')
 BLOCK_CONFIG['use_cuda'] = bool_env_convert_func('ENABLE_USE_CUDA')
 BLOCK_CONFIG['downscale_rawsamples_to_preferred_size'] = bool_env_convert_func('DOWNSCALE_RAWSAMPLES')
+# capturer gets PNG encoded images instead of decoded pixels, for face_sdk versions without RawImage capture
+BLOCK_CONFIG['disable_raw_image_capture'] = bool_env_convert_func('DISABLE_RAW_IMAGE_CAPTURE')
 
 GRPC_QUALITY_BLOCKS = ['_QUALITY_LIVENESS_ANTI_SPOOFING']
 GRPC_BLOCKS = ['_LIVENESS_ANTI_SPOOFING']
@@ -51,6 +53,21 @@ else:
 
 UNIT_TYPE = BLOCK_CONFIG['unit_type']
 
+# Blocks served by /process/pipeline over a single decoded image, name -> block config
+PIPELINE_CONFIG = CONFIG.get('pipeline_config', {})
+for __pipeline_block_config in PIPELINE_CONFIG.values():
+    __pipeline_block_config.update({
+        'use_avx2': BLOCK_CONFIG['use_avx2'],
+        'use_cuda': BLOCK_CONFIG['use_cuda'],
+        'downscale_rawsamples_to_preferred_size': BLOCK_CONFIG['downscale_rawsamples_to_preferred_size'],
+        'disable_raw_image_capture': BLOCK_CONFIG['disable_raw_image_capture'],
+        'versions': BLOCK_CONFIG['versions'],
+    })
+    if CAPTURER_CONFIG and 'capturer_config' in __pipeline_block_config:
+        __pipeline_block_config['capturer_config'] = CAPTURER_CONFIG
+    if RECOGNIZER_CONFIG and 'recognizer_config' in __pipeline_block_config:
+        __pipeline_block_config['recognizer_config'] = RECOGNIZER_CONFIG
+
 __face_sdk_path = os.environ.get("FACE_SDK_DIR",  './face_sdk')
 FACE_SDK_DLL_PATH = os.path.join(__face_sdk_path, 'lib', 'libfacerec.so')
 FACE_SDK_CONF_DIR_PATH = os.path.join(__face_sdk_path, 'conf', 'facerec')
@@ -60,6 +77,15 @@ PORT = os.environ['PORT']
 
 # Limits
 MAX_BODY_SIZE = int(os.environ['MAX_BODY_SIZE']) * 1000000
+# Inference runs out of the event loop, face_sdk blocks are shared by the workers of one process
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 1))
+# requests waiting for a worker, above it 503 with Retry-After is returned
+INFERENCE_QUEUE_SIZE = int(os.environ.get('INFERENCE_QUEUE_SIZE', 16))
+INFERENCE_RETRY_AFTER = int(os.environ.get('INFERENCE_RETRY_AFTER', 1))  # seconds
+# concurrent requests to the processing block dispatched to a worker as one batch, 1 disables batching.
+# Batches form only while all workers are busy and wait for more requests at most INFERENCE_BATCH_WAIT
+INFERENCE_BATCH_SIZE = int(os.environ.get('INFERENCE_BATCH_SIZE', 1))
+INFERENCE_BATCH_WAIT = int(os.environ.get('INFERENCE_BATCH_WAIT', 5))  # ms
 
 # Product Information
 APP_VERSION = os.environ['APP_VERSION']
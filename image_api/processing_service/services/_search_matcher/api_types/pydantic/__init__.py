@@ -27,6 +27,7 @@ class ISample(BaseModel):
 
 class Sample(ISample):
     matches: List[Match]
+    score_matrix: Optional[List[List[float]]] = Field(description='Scores of every face object against every other')
 
 
 class SampleInput(ISample):
@@ -17,6 +17,12 @@ class Verification(BaseModel):
     score: float = Field(description='Score')
 
 
+class VerificationMatrix(BaseModel):
+    probe_ids: List[int] = Field(description='Ids of probe objects, rows of results')
+    gallery_ids: List[int] = Field(description='Ids of gallery objects, columns of results')
+    results: List[List[Verification]] = Field(description='Verification of every probe against every gallery object')
+
+
 class ISample(BaseModel):
     objects: List[SampleObject] = Field(alias=OBJECTS_KEY, title='objects')
 
@@ -26,7 +32,8 @@ class ISample(BaseModel):
 
 
 class Sample(ISample):
-    verification: Verification
+    verification: Optional[Verification]
+    verification_matrix: Optional[VerificationMatrix]
 
 
 class SampleInput(ISample):
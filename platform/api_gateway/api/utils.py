@@ -1,6 +1,9 @@
 import os
 import json
-from typing import Optional
+import gzip
+import zlib
+from io import BytesIO
+from typing import Optional, BinaryIO
 
 from http.cookies import SimpleCookie
 
@@ -16,6 +19,17 @@ from user_domain.models import Workspace, Access
 from collector_domain.models import Agent
 from activation_manager.models import Activation, find_last_activation
 
+try:
+    import zstandard
+except ImportError:  # zstd encoded uploads are rejected without it
+    zstandard = None
+
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+class DecodedContentTooLarge(Exception):
+    pass
+
 
 def get_access(qa_only=False):
     def decorator(func):
@@ -107,6 +121,62 @@ def check_workspace(func):
     return wrapper
 
 
+def get_content_decoders() -> dict:
+    decoders = {'gzip': lambda stream: gzip.GzipFile(fileobj=stream, mode='rb')}
+    if zstandard is not None:
+        decoders['zstd'] = lambda stream: zstandard.ZstdDecompressor().stream_reader(stream)
+    return decoders
+
+
+def decode_stream(stream: BinaryIO, encoding: str, max_size: int) -> bytes:
+    """
+    Decompress stream chunk by chunk, never holding more than max_size decoded bytes
+    """
+    decoded = BytesIO()
+    reader = get_content_decoders()[encoding](stream)
+    while True:
+        chunk = reader.read(DECODE_CHUNK_SIZE)
+        if not chunk:
+            break
+        if decoded.tell() + len(chunk) > max_size:
+            raise DecodedContentTooLarge
+        decoded.write(chunk)
+    return decoded.getvalue()
+
+
+def decode_content(func):
+    """
+    Transparently decode request body sent with Content-Encoding (gzip, zstd), so views parse it as usual.
+    Decoded body is limited by INGEST_MAX_DECODED_SIZE, views reading request.body are still limited
+    by DATA_UPLOAD_MAX_MEMORY_SIZE as CONTENT_LENGTH is set to the decoded size
+    """
+    def wrapper(request, *args, **kwargs):
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding in ('', 'identity'):
+            return func(request, *args, **kwargs)
+
+        if encoding not in get_content_decoders():
+            return HttpResponse(json.dumps({'errors': f'Content-Encoding {encoding} is not supported.'}), status=415)
+
+        try:
+            body = decode_stream(request, encoding, settings.INGEST_MAX_DECODED_SIZE)
+        except DecodedContentTooLarge:
+            return HttpResponse(json.dumps(
+                {'errors': f'Decoded content exceeds {settings.INGEST_MAX_DECODED_SIZE} bytes.'}), status=413)
+        except (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ()):
+            return HttpResponseBadRequest(json.dumps({'errors': f'Content is not valid {encoding} data.'}))
+
+        # replace the consumed stream, so request.body, POST and FILES are parsed from decoded data
+        request._stream = BytesIO(body)
+        request._read_started = False
+        request.META['CONTENT_LENGTH'] = str(len(body))
+        del request.META['HTTP_CONTENT_ENCODING']
+
+        return func(request, *args, **kwargs)
+
+    return wrapper
+
+
 def set_cookies(cookie_str, response):
     def modify_param(param_name, param_value):
         # Removing the extra symbols, that are accidentally get in path
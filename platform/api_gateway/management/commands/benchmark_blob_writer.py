@@ -0,0 +1,56 @@
+import os
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from data_domain.managers import BlobBulkWriter
+from data_domain.models import Blob, BlobMeta
+from user_domain.models import Workspace
+
+
+class Command(BaseCommand):
+    help = 'Queries and time of writing activity blobs, Blob and BlobMeta per bsm against BlobBulkWriter, rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--activities', type=int, default=100, help='Number of activities')
+        parser.add_argument('--bsms', type=int, default=3, help='Number of bsms of every activity')
+        parser.add_argument('--blob-size', type=int, default=20000, help='Size of every blob in bytes')
+
+    @staticmethod
+    def __per_bsm(workspace: Workspace, activities: list):
+        for bsms in activities:
+            with transaction.atomic():
+                for data, meta in bsms:
+                    blob = Blob.objects.create(data=data)
+                    BlobMeta.objects.create(workspace=workspace, blob=blob, meta=meta)
+
+    @staticmethod
+    def __bulk(workspace: Workspace, activities: list):
+        for bsms in activities:
+            writer = BlobBulkWriter(workspace.id)
+            for data, meta in bsms:
+                writer.add(data, meta)
+            writer.flush()
+
+    def handle(self, *args, **options):
+        activities = [
+            [(os.urandom(options['blob_size']), {'type': 'image', 'format': 'IMAGE'}) for _ in range(options['bsms'])]
+            for _ in range(options['activities'])
+        ]
+        self.stdout.write(f"{options['activities']} activities with {options['bsms']} bsms of "
+                          f"{options['blob_size']} bytes")
+
+        for title, case in (('per bsm', self.__per_bsm), ('bulk writer', self.__bulk)):
+            with transaction.atomic():
+                workspace = Workspace.objects.create(title='benchmark_blob_writer')
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    case(workspace, activities)
+                    elapsed = time.perf_counter() - start
+                transaction.set_rollback(True)
+
+            inserts = sum(query['sql'].lstrip().upper().startswith('INSERT') for query in queries.captured_queries)
+            self.stdout.write(f'{title}: {len(queries) / len(activities):.1f} queries per activity '
+                              f'({inserts / len(activities):.1f} inserts), {elapsed * 1000:.1f} ms')
@@ -0,0 +1,69 @@
+import base64
+import json
+import os
+import timeit
+
+import bson
+from django.core.management import BaseCommand
+
+from data_domain.managers import BinarySampleTransport
+
+
+class Command(BaseCommand):
+    help = 'Size and CPU of image_api sample round trip, JSON with base64 against BSON with raw bytes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--image-size', type=int, default=500000, help='Size of encoded image in bytes')
+        parser.add_argument('--faces', type=int, default=5, help='Number of face objects in sample')
+        parser.add_argument('--template-size', type=int, default=1024, help='Size of raw template in bytes')
+        parser.add_argument('--number', type=int, default=50, help='Number of runs of every case')
+
+    @staticmethod
+    def __resolve_blobs(sample, convert):
+        # what image_api resolvers do with every $ field of the sample
+        if isinstance(sample, list):
+            for obj in sample:
+                Command.__resolve_blobs(obj, convert)
+        elif isinstance(sample, dict):
+            for key, value in sample.items():
+                if isinstance(value, (list, dict)):
+                    Command.__resolve_blobs(value, convert)
+                elif key.startswith('$'):
+                    sample[key] = convert(value)
+
+    def handle(self, *args, **options):
+        # SampleEnricher keeps blobs base64 encoded
+        sample = {
+            '$image': base64.b64encode(os.urandom(options['image_size'])).decode(),
+            'objects': [{
+                'id': idx, 'class': 'face', 'bbox': [0.1, 0.2, 0.3, 0.4], 'confidence': 0.9,
+                'fitter': {'keypoints': [0.5] * 63, 'fitter_type': 'fda', 'left_eye': [1, 2], 'right_eye': [3, 4]},
+                '$template': base64.b64encode(os.urandom(options['template_size'])).decode(),
+            } for idx in range(options['faces'])]
+        }
+        sizes = {}
+
+        def json_round_trip():
+            request = json.dumps(sample).encode()
+            server_sample = json.loads(request)
+            self.__resolve_blobs(server_sample, base64.b64decode)
+            self.__resolve_blobs(server_sample, lambda blob: base64.b64encode(blob).decode('ascii'))
+            response = json.dumps(server_sample).encode()
+            sizes['json'] = len(request), len(response)
+            return json.loads(response)
+
+        def binary_round_trip():
+            request = BinarySampleTransport.pack(sample)
+            response = bson.dumps(bson.loads(request))
+            sizes['binary'] = len(request), len(response)
+            return BinarySampleTransport.unpack(response)
+
+        assert json_round_trip() == binary_round_trip()
+
+        self.stdout.write(f"image of {options['image_size']} bytes, {options['faces']} faces with templates of "
+                          f"{options['template_size']} bytes")
+        for title, case in (('json', json_round_trip), ('binary', binary_round_trip)):
+            elapsed = timeit.timeit(case, number=options['number']) / options['number']
+            request_size, response_size = sizes[title]
+            self.stdout.write(f'{title}: request {request_size} bytes, response {response_size} bytes, '
+                              f'encode and decode {elapsed * 1000:.3f} ms')
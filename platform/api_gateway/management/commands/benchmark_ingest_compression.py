@@ -0,0 +1,68 @@
+import gzip
+import time
+import uuid
+from io import BytesIO
+
+import bson
+from PIL import Image
+from django.core.management import BaseCommand
+from django.test.client import encode_multipart, BOUNDARY
+
+from api_gateway.api.utils import decode_stream, zstandard
+
+
+class Command(BaseCommand):
+    help = 'Bytes on wire and CPU cost per network sample of Content-Encoding supported by PostProcess'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--humans', type=int, default=5, help='Number of humans in sample')
+        parser.add_argument('--image-size', type=int, default=160, help='Side of best shot JPEG in pixels')
+        parser.add_argument('--number', type=int, default=50, help='Number of runs of every encoding')
+
+    @staticmethod
+    def __build_image(size: int) -> bytes:
+        image = Image.effect_noise((size, size), 48).convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=90)
+        return buffer.getvalue()
+
+    def __build_body(self, humans: int, image_size: int) -> bytes:
+        processes = []
+        for _ in range(humans):
+            human_id = str(uuid.uuid4())
+            processes += [
+                {'id': human_id, 'object': {'class': 'human', 'id': str(uuid.uuid4())},
+                 'time_interval': ['2022-01-01T00:00:00.000000', '2022-01-01T00:00:10.000000'],
+                 'source': str(uuid.uuid4())},
+                {'id': str(uuid.uuid4()), 'parent': human_id,
+                 'object': {'class': 'face', 'age': 30, 'gender': 'MALE', 'quality': 0.9},
+                 '$best_shot': {'format': 'IMAGE', 'blob': self.__build_image(image_size)}},
+            ]
+        sample = b'\x01' + bson.dumps({'processes': processes})
+        return encode_multipart(BOUNDARY, {'sample': BytesIO(sample)})
+
+    def handle(self, *args, **options):
+        body = self.__build_body(options['humans'], options['image_size'])
+        number = options['number']
+
+        encoders = {'gzip': gzip.compress}
+        if zstandard is not None:
+            encoders['zstd'] = zstandard.ZstdCompressor().compress
+        else:
+            self.stdout.write('zstandard is not installed, zstd is skipped')
+
+        self.stdout.write(f'identity: {len(body)} bytes on wire')
+        for encoding, encode in encoders.items():
+            start = time.process_time()
+            for _ in range(number):
+                encoded = encode(body)
+            encode_time = (time.process_time() - start) / number
+
+            start = time.process_time()
+            for _ in range(number):
+                decode_stream(BytesIO(encoded), encoding, len(body))
+            decode_time = (time.process_time() - start) / number
+
+            self.stdout.write(f'{encoding}: {len(encoded)} bytes on wire ({len(encoded) / len(body):.0%}), '
+                              f'agent encode {encode_time * 1000:.2f} ms, '
+                              f'server decode {decode_time * 1000:.2f} ms per sample')
@@ -0,0 +1,41 @@
+import base64
+import json
+import os
+import timeit
+
+import requests
+from django.core.management import BaseCommand
+
+from data_domain.matcher.main import BinaryTemplateTransport
+
+
+class Command(BaseCommand):
+    help = 'Size and client encode cost of matcher search request, GraphQL with base64 against packed binary'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--templates', type=int, default=100, help='Number of templates in search request')
+        parser.add_argument('--template-size', type=int, default=1024, help='Size of raw template in bytes')
+        parser.add_argument('--number', type=int, default=50, help='Number of runs of every case')
+
+    def handle(self, *args, **options):
+        # templates are stored base64 encoded in sample meta
+        templates = [base64.b64encode(os.urandom(options['template_size'])).decode()
+                     for _ in range(options['templates'])]
+        variables = {'indexKey': 'index', 'templateVersion': 'template11v1000', 'nearestCount': 5,
+                     'score': 0.0, 'faR': 1.0, 'frR': 0.0}
+
+        def graphql():
+            operation = {'query': 'query{search}', 'variables': {**variables, 'templates': templates}}
+            return requests.Request('POST', 'http://matcher/graphql', data=json.dumps(operation),
+                                    headers={'Content-Type': 'application/json'}).prepare()
+
+        def binary():
+            files = {'templates': ('templates', BinaryTemplateTransport.pack(templates), 'application/octet-stream')}
+            return requests.Request('POST', 'http://matcher/binary/search',
+                                    data={'variables': json.dumps(variables)}, files=files).prepare()
+
+        self.stdout.write(f"{options['templates']} templates of {options['template_size']} bytes")
+        for title, case in (('graphql', graphql), ('binary', binary)):
+            size = len(case().body)
+            elapsed = timeit.timeit(case, number=options['number']) / options['number']
+            self.stdout.write(f'{title}: {size} bytes, encode {elapsed * 1000:.3f} ms')
@@ -0,0 +1,85 @@
+import timeit
+import uuid
+
+from django.core.management import BaseCommand
+
+from platform_lib.managers import ActivityProcessManager, RawProcessManager
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark of process managers on a large multi-human sample'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--humans', type=int, default=200, help='Number of human processes in sample')
+        parser.add_argument('--number', type=int, default=20, help='Number of runs of every case')
+
+    @staticmethod
+    def __build_sample(humans_count: int) -> dict:
+        processes = []
+        for _ in range(humans_count):
+            human_id, face_id, body_id = str(uuid.uuid4()), str(uuid.uuid4()), str(uuid.uuid4())
+            processes += [
+                {'id': human_id, 'object': {'class': 'human', 'id': str(uuid.uuid4())},
+                 'time_interval': ['2022-01-01T00:00:00', '2022-01-01T00:00:10']},
+                {'id': face_id, 'parent': human_id,
+                 'object': {'class': 'face', 'age': 30, 'gender': 'MALE', 'quality': 0.9},
+                 '$best_shot': {'id': str(uuid.uuid4())}, '$template11v1000': {'id': str(uuid.uuid4())}},
+                {'id': body_id, 'parent': human_id, 'object': {'class': 'body'}, '$best_shot': {'id': 'x'}},
+            ]
+        return {'processes': processes}
+
+    @staticmethod
+    def __linear_parse_human_processes(processes: list) -> list:
+        humans = RawProcessManager._get_processes(RawProcessManager.ProcessClass.HUMAN, processes)
+        humans_pack = []
+
+        def get_child(parent_id: str, output: list):
+            for proc in processes:
+                if proc.get('parent') == parent_id:
+                    output.append(proc)
+                    get_child(proc['id'], output)
+
+        for human in humans:
+            res = [human]
+            get_child(human['id'], res)
+            humans_pack.append({'processes': res})
+
+        return humans_pack
+
+    def handle(self, *args, **options):
+        sample = self.__build_sample(options['humans'])
+        number = options['number']
+        packs = RawProcessManager.parse_human_processes(sample['processes'])
+
+        def linear_lookups():
+            for pack in packs:
+                processes = pack['processes']
+                for process_class in (RawProcessManager.ProcessClass.HUMAN, RawProcessManager.ProcessClass.FACE,
+                                      RawProcessManager.ProcessClass.BODY, RawProcessManager.ProcessClass.HUMAN):
+                    RawProcessManager._get_processes(process_class, processes)
+                face = RawProcessManager._get_processes(RawProcessManager.ProcessClass.FACE, processes)[0]
+                for _ in range(3):
+                    RawProcessManager.get_process_info(face)
+
+        def indexed_lookups():
+            for pack in packs:
+                manager = ActivityProcessManager(pack)
+                manager.get_human_process()
+                manager.get_face_processes()
+                manager.get_body_processes()
+                manager.get_person_id()
+                manager.get_age_gender()
+                manager.get_face_best_shot()
+                manager.get_template('template11v1000')
+
+        cases = [
+            ('parse_human_processes, linear', lambda: self.__linear_parse_human_processes(sample['processes'])),
+            ('parse_human_processes, indexed', lambda: RawProcessManager.parse_human_processes(sample['processes'])),
+            ('per-pack lookups, linear', linear_lookups),
+            ('per-pack lookups, indexed', indexed_lookups),
+        ]
+
+        self.stdout.write(f"{options['humans']} humans, {len(sample['processes'])} processes, {number} runs")
+        for title, case in cases:
+            elapsed = timeit.timeit(case, number=number) / number
+            self.stdout.write(f'{title}: {elapsed * 1000:.2f} ms')
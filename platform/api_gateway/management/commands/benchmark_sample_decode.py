@@ -0,0 +1,79 @@
+import ctypes
+import ctypes.util
+import multiprocessing
+import os
+import tracemalloc
+import uuid
+
+import bson
+from django.core.management import BaseCommand
+
+from data_domain.models import Blob
+from platform_lib.managers import RawProcessManager
+
+
+class Command(BaseCommand):
+    help = 'Peak RSS per request of network sample decoding, eager bson.loads against lazy memoryview decoding'
+
+    boundary = b'-' * 40
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=8, help='Number of best shots in sample')
+        parser.add_argument('--image-size', type=int, default=512 * 1024, help='Size of every best shot in bytes')
+
+    def __build_body(self, images: int, image_size: int) -> bytes:
+        processes = []
+        for _ in range(images):
+            processes.append({
+                'id': str(uuid.uuid4()),
+                'object': {'class': 'face'},
+                '$best_shot': {'format': 'IMAGE', 'blob': os.urandom(image_size)}
+            })
+        sample = b'\x01' + bson.dumps({'processes': processes})
+        return b'sample' + b'\r\n\r\n\r' + sample + self.boundary + b'\r\n' * 4
+
+    def __handle_request(self, body: bytes, lazy: bool) -> list:
+        # same steps as PostProcess does with C++ formatted request body
+        start, end = len(b'sample') + 5, -(len(self.boundary) + 8)
+        data = memoryview(body)[start:end] if lazy else body[start:end]
+        sample, _ = RawProcessManager.decode(data, lazy=lazy)
+        _, bsms = RawProcessManager.extract_bsms(sample)
+        return [Blob(data=bsm.pop('blob')) for _, bsm, _ in bsms]
+
+    @staticmethod
+    def __get_rss(field: str) -> int:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field):
+                    return int(line.split()[1])  # in KiB
+        return 0
+
+    def __reset_peak_rss(self):
+        # give freed heap back to the system and reset VmHWM, so the peak covers one request only (Linux)
+        ctypes.CDLL(ctypes.util.find_library('c')).malloc_trim(0)
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+
+    def __measure(self, body: bytes, lazy: bool, result: multiprocessing.Queue):
+        self.__reset_peak_rss()
+        before = self.__get_rss('VmRSS')
+        tracemalloc.start()
+        blobs = self.__handle_request(body, lazy)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result.put((self.__get_rss('VmHWM') - before, traced_peak // 1024, len(blobs)))
+
+    def handle(self, *args, **options):
+        body = self.__build_body(options['images'], options['image_size'])
+        self.stdout.write(f'{options["images"]} images, request body {len(body) / 1024 ** 2:.1f} MiB')
+
+        context = multiprocessing.get_context('fork')
+        for title, lazy in (('eager', False), ('lazy', True)):
+            # every mode is measured in a fresh process, so heap of the previous one does not hide allocations
+            result = context.Queue()
+            process = context.Process(target=self.__measure, args=(body, lazy, result))
+            process.start()
+            peak_rss, traced_peak, blobs_count = result.get()
+            process.join()
+            self.stdout.write(f'{title}: peak RSS growth {peak_rss / 1024:.1f} MiB, '
+                              f'peak traced allocations {traced_peak / 1024:.1f} MiB, {blobs_count} blobs')
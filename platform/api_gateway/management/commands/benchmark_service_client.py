@@ -0,0 +1,65 @@
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management import BaseCommand
+
+from platform_lib.http_client import ServiceClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # as service servers do, otherwise delayed ACK dominates keep-alive latency
+    body = json.dumps({'data': {'search': []}}).encode()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Latency of service calls against a local stub server, new connection per call against pooled client'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=1000, help='Number of calls of every case')
+
+    @staticmethod
+    def __measure(call, number: int) -> list:
+        latencies = []
+        for _ in range(number):
+            start = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/graphql'
+        operation = json.dumps({'query': '{search}', 'variables': {}})
+        headers = {'Content-Type': 'application/json'}
+        client = ServiceClient.for_service('matcher')
+
+        cases = [
+            ('requests.post', lambda: requests.post(url, data=operation, headers=headers, timeout=10).json()),
+            ('ServiceClient', lambda: client.post(url, data=operation, headers=headers).json()),
+        ]
+
+        try:
+            for title, call in cases:
+                latencies = sorted(self.__measure(call, options['number']))
+                p99 = latencies[int(len(latencies) * 0.99) - 1]
+                self.stdout.write(f'{title}: mean {statistics.mean(latencies) * 1000:.3f} ms, '
+                                  f'p50 {statistics.median(latencies) * 1000:.3f} ms, p99 {p99 * 1000:.3f} ms')
+        finally:
+            server.shutdown()
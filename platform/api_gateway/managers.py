@@ -0,0 +1,140 @@
+import datetime
+import hashlib
+import json
+import logging
+import uuid
+from typing import List, Union, Tuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q, F, Min, Count
+
+from api_gateway.models import SpooledSample
+from collector_domain.models import Agent
+from platform_lib.utils import utcnow_with_tz
+from user_domain.models import Workspace
+
+logger = logging.getLogger(__name__)
+
+
+class IngestSpoolManager:
+    """
+    Durable spool of raw network samples accepted by PostProcess in spool mode.
+    Samples are claimed by workers with skip locked, so several workers drain the spool concurrently.
+    Claimed samples are deleted after ingestion, claims of crashed workers expire after INGEST_SPOOL_CLAIM_TIMEOUT
+    """
+
+    @staticmethod
+    def spool(parts: List[Union[bytes, memoryview]], workspace: Workspace, agent: Agent) -> List[SpooledSample]:
+        return SpooledSample.objects.bulk_create(
+            [SpooledSample(workspace=workspace, agent=agent, data=data) for data in parts]
+        )
+
+    @staticmethod
+    def claim(batch_size: int) -> List[SpooledSample]:
+        """
+        Claim the oldest not claimed samples. Samples which failed INGEST_SPOOL_MAX_ATTEMPTS times are dropped
+        """
+        now = utcnow_with_tz()
+        expired_claim_date = now - datetime.timedelta(seconds=settings.INGEST_SPOOL_CLAIM_TIMEOUT)
+
+        with transaction.atomic():
+            samples = list(
+                SpooledSample.objects.select_for_update(skip_locked=True, of=('self',)).select_related(
+                    'workspace', 'agent'
+                ).filter(
+                    Q(claim_date__isnull=True) | Q(claim_date__lt=expired_claim_date)
+                ).order_by('creation_date')[:batch_size]
+            )
+
+            dropped = [sample.id for sample in samples if sample.attempts >= settings.INGEST_SPOOL_MAX_ATTEMPTS]
+            if dropped:
+                logger.error(f'Drop {len(dropped)} spooled samples after {settings.INGEST_SPOOL_MAX_ATTEMPTS} attempts')
+                SpooledSample.objects.filter(id__in=dropped).delete()
+
+            samples = [sample for sample in samples if sample.id not in dropped]
+            SpooledSample.objects.filter(id__in=[sample.id for sample in samples]).update(
+                claim_date=now, attempts=F('attempts') + 1
+            )
+
+        return samples
+
+    @staticmethod
+    def release(samples: List[SpooledSample]) -> int:
+        """
+        Delete ingested samples
+        """
+        return SpooledSample.objects.filter(id__in=[sample.id for sample in samples]).delete()[0]
+
+    @staticmethod
+    def get_stats() -> Tuple[int, Optional[float]]:
+        """
+        Get spool depth and age of the oldest sample in seconds
+        """
+        stats = SpooledSample.objects.aggregate(depth=Count('id'), oldest=Min('creation_date'))
+        age = (utcnow_with_tz() - stats['oldest']).total_seconds() if stats['oldest'] else None
+        return stats['depth'], age
+
+
+class IngestIdempotencyManager:
+    """
+    Short-lived cache of processed agent uploads.
+    Upload is identified by agent supplied request id or by hash of its payload. While the first delivery is
+    processed the key holds a pending marker, after that it holds the response for INGEST_IDEMPOTENCY_TTL seconds
+    """
+    pending = 'pending'
+    duplicates_counter_key = 'ingest:duplicates_suppressed'
+
+    @staticmethod
+    def build_key(agent_id: Union[str, uuid.UUID], parts: List[Union[bytes, memoryview]],
+                  request_id: Optional[str] = None) -> str:
+        if request_id:
+            fingerprint = hashlib.blake2b(request_id.encode(), digest_size=16).hexdigest()
+        else:
+            digest = hashlib.blake2b(digest_size=16)
+            for data in parts:
+                digest.update(len(data).to_bytes(8, byteorder='big'))
+                digest.update(data)
+            fingerprint = digest.hexdigest()
+
+        return f'ingest:agent:{agent_id}:fingerprint:{fingerprint}'
+
+    @classmethod
+    def start(cls, key: str) -> Optional[Tuple[int, bytes]]:
+        """
+        Mark upload as being processed.
+        Returns status and content of the response for a duplicate upload, None for a new one
+        """
+        if cache.add(key, cls.pending, timeout=settings.INGEST_IDEMPOTENCY_TTL):
+            return None
+
+        result = cache.get(key)
+        if result is None:  # expired in between
+            return cls.start(key)
+
+        cls.__count_duplicate()
+        if result == cls.pending:
+            return 409, json.dumps({'errors': 'Duplicate request is being processed.'}).encode()
+
+        return result
+
+    @staticmethod
+    def finish(key: str, status: int, content: bytes):
+        cache.set(key, (status, content), timeout=settings.INGEST_IDEMPOTENCY_TTL)
+
+    @staticmethod
+    def abort(key: str):
+        cache.delete(key)
+
+    @classmethod
+    def get_duplicates_count(cls) -> int:
+        return cache.get(cls.duplicates_counter_key, 0)
+
+    @classmethod
+    def __count_duplicate(cls):
+        cache.add(cls.duplicates_counter_key, 0, timeout=None)
+        try:
+            cache.incr(cls.duplicates_counter_key)
+        except ValueError:  # evicted in between
+            cache.set(cls.duplicates_counter_key, 1, timeout=None)
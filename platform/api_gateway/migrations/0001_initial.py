@@ -0,0 +1,34 @@
+# Generated by Django 3.2.18 on 2023-06-01 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('user_domain', '0005_add_sample_ttl'),
+        ('collector_domain', '0005_auto_20230329_0902'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpooledSample',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('data', models.BinaryField(editable=False)),
+                ('attempts', models.IntegerField(default=0)),
+                ('claim_date', models.DateTimeField(blank=True, null=True)),
+                ('creation_date', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spooled_samples', to='collector_domain.agent')),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spooled_samples', to='user_domain.workspace')),
+            ],
+            options={
+                'verbose_name_plural': 'Spooled samples',
+                'db_table': 'api_gateway_spooled_sample',
+            },
+        ),
+    ]
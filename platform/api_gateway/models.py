@@ -1,3 +1,24 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+from collector_domain.models import Agent
+from user_domain.models import Workspace
+
+
+class SpooledSample(models.Model):
+    """
+    Raw network sample accepted from agent and waiting to be ingested by celery workers
+    """
+    id = models.UUIDField(primary_key=True, unique=True, default=uuid.uuid4, editable=False)
+
+    workspace = models.ForeignKey(Workspace, related_name='spooled_samples', on_delete=models.CASCADE, null=False)
+    agent = models.ForeignKey(Agent, related_name='spooled_samples', on_delete=models.CASCADE, null=False)
+    data = models.BinaryField(editable=False)
+    attempts = models.IntegerField(default=0)
+    claim_date = models.DateTimeField(null=True, blank=True)
+    creation_date = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'api_gateway_spooled_sample'
+        verbose_name_plural = 'Spooled samples'
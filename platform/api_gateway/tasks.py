@@ -0,0 +1,60 @@
+import logging
+import time
+import traceback
+from collections import defaultdict
+
+from celery import shared_task
+from django.conf import settings
+
+from api_gateway.managers import IngestSpoolManager
+from api_gateway.views import PostProcess
+from plib.tracing.utils import get_tracer, ContextStub
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def drain_ingest_spool():
+    """
+    Ingest spooled network samples by batches until the spool is empty or the drain period is over.
+    Next drains are started by beat, so several workers drain the spool concurrently under load
+    """
+    tracer = get_tracer(__name__)
+    with tracer.start_as_current_span("drain_ingest_spool") if tracer else ContextStub() as span:
+        depth, age = IngestSpoolManager.get_stats()
+        span.set_attribute("spool_depth", depth)
+        span.set_attribute("spool_age_seconds", age or 0)
+        if depth:
+            logger.info(f'Ingest spool depth: {depth}, oldest sample age: {age:.1f} s')
+
+        drained = 0
+        start_time = time.monotonic()
+        while time.monotonic() - start_time < settings.INGEST_SPOOL_DRAIN_PERIOD:
+            samples = IngestSpoolManager.claim(settings.INGEST_SPOOL_BATCH_SIZE)
+            if not samples:
+                break
+
+            groups = defaultdict(list)
+            for sample in samples:
+                groups[(sample.workspace_id, sample.agent_id)].append(sample)
+
+            for group in groups.values():
+                try:
+                    details = PostProcess.ingest_samples([sample.data for sample in group],
+                                                         group[0].workspace, group[0].agent)
+                except Exception:
+                    # claim expires and samples are taken again
+                    traceback.print_exc()
+                    continue
+
+                if details['failed'] or any('errors' in d for d in details['samples']):
+                    logger.warning(f'Failed spooled samples ingestion: {details}')
+
+                # samples failed by the batch write stay claimed, they are taken again after the claim expires
+                # and dropped after INGEST_SPOOL_MAX_ATTEMPTS
+                drained += IngestSpoolManager.release(
+                    [sample for sample, sample_details in zip(group, details['samples'])
+                     if not sample_details.get('retry')]
+                )
+
+        span.set_attribute("drained", drained)
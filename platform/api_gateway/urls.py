@@ -25,6 +25,8 @@ urlpatterns = [
     path('internal-api/vlw/', APIView.as_view(schema=internal_schema_vlw, graphiql=settings.DEBUG)),
     path('internal-api/v2/external-login/', ExternalLogin.as_view()),
     path('rest-api/v1/post-event/', PostProcess.as_view()),
+    path('rest-api/v1/post-events/', PostProcess.as_view(batch_mode=True)),
+    path('rest-api/v1/spool-events/', PostProcess.as_view(spool_mode=True)),
     path('rest-api/v1/activate/', ActivationView.as_view()),
     path('get-image/<sample_id>/', GetImage.as_view()),
     path('get-realtime-image/<image_key>/', GetRealtimeImage.as_view()),
@@ -1,4 +1,5 @@
 import re
+import copy
 import uuid
 import json
 import base64
@@ -6,7 +7,7 @@ import traceback
 from io import BytesIO
 from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Callable, Union
 from PIL import Image, UnidentifiedImageError
 from django.apps import apps
 from django.http import HttpRequest
@@ -26,7 +27,7 @@ import platform_lib.exceptions as exceptions
 import jsonref
 from django.conf import settings
 from django.db import transaction
-from django.db.models import F, Q
+from django.db.models import F, Q, Func, Value, JSONField
 from django.views.generic import View
 from django.core.exceptions import ValidationError, ObjectDoesNotExist, BadRequest
 from django.utils.decorators import method_decorator
@@ -35,16 +36,17 @@ from django.views.decorators.vary import patch_vary_headers
 from django.http.response import HttpResponseBadRequest, HttpResponse, JsonResponse, HttpResponseNotAllowed, \
     HttpResponseRedirect
 
-from notification_domain.managers import NotificationManager
+from notification_domain.managers import NotificationManager, TriggerEngine
 from platform_lib.managers import RealtimeImageCacheManager, ActivityProcessManager, RawProcessManager
 from collector_domain.managers import AgentManager
 from person_domain.tasks import duplicate_persons
 from user_domain.managers import LoginManager
 from user_domain.models import Workspace
-from data_domain.managers import OngoingManager, SampleManager, ActivityManager
+from data_domain.managers import OngoingManager, SampleManager, ActivityManager, BlobBulkWriter
+from api_gateway.managers import IngestSpoolManager, IngestIdempotencyManager
 from person_domain.managers import PersonManager
 from person_domain.models import Person, Profile
-from data_domain.models import Activity, Blob, BlobMeta, Sample
+from data_domain.models import Activity, BlobMeta, Sample
 from data_domain.tasks import reidentification, add_to_activity_index
 from platform_lib.validation import is_valid_json
 from notification_domain.models import Trigger, Notification, Endpoint
@@ -57,9 +59,10 @@ from collector_domain.models import Agent, Camera, AttentionArea
 from activation_manager.utils import catch_exception, encode_license
 from activation_manager.models import Activation, find_last_activation
 from activation_manager.certificate import validate_certificate, generate_certificate
-from api_gateway.api.utils import authorization, cors_resolver, set_cookies, get_access, check_workspace
+from api_gateway.api.utils import authorization, cors_resolver, set_cookies, get_access, check_workspace, \
+    decode_content
 from api_gateway.api.token import Token
-from notification_domain.tasks import triggers_handler
+from notification_domain.tasks import trigger_events_handler
 from licensing.common_managers import LicensingCommonEvent
 from plib.tracing.utils import get_tracer, ContextStub
 
@@ -193,12 +196,18 @@ class APIView(GraphQLView):
         return data
 
 
-@method_decorator([csrf_exempt, cors_resolver, authorization(['access', 'agent']), check_workspace, ], name='dispatch')
+@method_decorator([csrf_exempt, cors_resolver, authorization(['access', 'agent']), check_workspace, decode_content],
+                  name='dispatch')
 class PostProcess(View):
     process_key = 'processes'
     process_type = 0
     oneshot_type = 1
 
+    # Accept many network samples ('sample' parts) in one request and write them in bulk
+    batch_mode = False
+    # Only check and spool network samples, they are ingested by celery workers later
+    spool_mode = False
+
     def post(self, request, *args, **kwargs):
         if not request.content_type == 'multipart/form-data':
             return HttpResponseBadRequest(json.dumps({'errors': 'Content-Type must be multipart/form-data'}))
@@ -213,15 +222,47 @@ class PostProcess(View):
         else:
             return HttpResponseBadRequest(json.dumps({'errors': 'Authorization failed'}))
 
-        data = self.__parse_request(request)
+        if self.spool_mode or self.batch_mode:
+            parts = self.__parse_batch_request(request)
+        else:
+            data = self.__parse_request(request)
+            parts = [data] if data else []
 
-        if not data:
+        if not parts:
             return HttpResponse(json.dumps({'errors': 'Data is empty.'}))
 
+        # agents retry uploads after timeouts, repeated payloads get the earlier response
+        idempotency_key = IngestIdempotencyManager.build_key(agent.id, parts, request.headers.get('X-Request-Id'))
+        duplicate_response = IngestIdempotencyManager.start(idempotency_key)
+        if duplicate_response is not None:
+            status, content = duplicate_response
+            response = HttpResponse(content, status=status)
+            response['X-Duplicate-Request'] = 'true'
+            return response
+
+        try:
+            if self.spool_mode:
+                response = self.__post_spool(parts, workspace, agent)
+            elif self.batch_mode:
+                response = self.__post_batch(parts, workspace, agent)
+            else:
+                response = self.__post_single(request, parts[0], workspace, agent)
+        except Exception:
+            IngestIdempotencyManager.abort(idempotency_key)
+            raise
+
+        if 200 <= response.status_code < 300:
+            IngestIdempotencyManager.finish(idempotency_key, response.status_code, response.content)
+        else:  # let agent retry failed uploads
+            IngestIdempotencyManager.abort(idempotency_key)
+
+        return response
+
+    def __post_single(self, request, data: Union[bytes, memoryview], workspace: Workspace, agent: Agent):
         self.__update_agent_status_info(agent)
 
         try:
-            sample, is_raw = RawProcessManager.decode(data)
+            sample, is_raw = RawProcessManager.decode(data, lazy=True)
             if is_raw:
                 sample.update(RawProcessManager.parse_extra(request.POST))
         except Exception:
@@ -267,8 +308,6 @@ class PostProcess(View):
                         human_process_manager.is_activity_finalized(),
                         activity=existing_activity
                     )
-                    # TODO move sample creation in activity when update activity meta
-                    self.__create_samples_by_activity(str(workspace.id), activity)
                     ongoings[str(camera.id)].append(activity.data)
 
                     details['succeed'] += 1
@@ -292,78 +331,280 @@ class PostProcess(View):
 
         return HttpResponse(json.dumps({'data': 'Data has been posted.', 'details': details}))
 
+    def __post_batch(self, parts: List[Union[bytes, memoryview]], workspace: Workspace, agent: Agent):
+        if len(parts) > settings.INGEST_BATCH_MAX_SAMPLES:
+            return HttpResponseBadRequest(json.dumps(
+                {'errors': f'Too many samples. Limit is {settings.INGEST_BATCH_MAX_SAMPLES}.'}))
+
+        self.__update_agent_status_info(agent)
+
+        details = self.ingest_samples(parts, workspace, agent)
+
+        if details['failed'] or any('errors' in d for d in details['samples']):
+            return HttpResponseBadRequest(json.dumps({'errors': 'Failed record creation.', 'details': details}))
+
+        return HttpResponse(json.dumps({'data': 'Data has been posted.', 'details': details}))
+
+    def __post_spool(self, parts: List[Union[bytes, memoryview]], workspace: Workspace, agent: Agent):
+        if len(parts) > settings.INGEST_BATCH_MAX_SAMPLES:
+            return HttpResponseBadRequest(json.dumps(
+                {'errors': f'Too many samples. Limit is {settings.INGEST_BATCH_MAX_SAMPLES}.'}))
+
+        invalid_parts = [i for i, data in enumerate(parts) if not RawProcessManager.is_network_sample(data)]
+        if invalid_parts:
+            return HttpResponseBadRequest(json.dumps({'errors': 'Data must have "Network Sample" format.',
+                                                      'details': {'samples': invalid_parts}}))
+
+        self.__update_agent_status_info(agent)
+        IngestSpoolManager.spool(parts, workspace, agent)
+
+        return HttpResponse(json.dumps({'data': 'Data has been accepted.', 'details': {'total': len(parts)}}),
+                            status=202)
+
     @classmethod
-    def __create_samples_by_activity(cls, workspace_id: str, activity: Activity):
-        # TODO Extend with another sample types
-        def __parce_face_process_info_in_sample(face_process: Dict) -> Dict:
-            # TODO use activity data manager when it merged
-            face_embeddings = face_process['object'].get('embeddings', {})
-
-            templates_to_create = []
-            regex = re.compile('template')
-            for key in face_embeddings.keys():
-                if regex.search(key):
-                    templates_to_create.append(key)
-
-            if not templates_to_create:  # do not create sample without templates
-                raise NotImplementedError
-
-            face_object = {
-                'id': 1,  # TODO replace hardcoded value
-                'class': 'face',
-            }
+    def ingest_samples(cls, parts: List[Union[bytes, memoryview]], workspace: Workspace, agent: Agent) -> dict:
+        """
+        Ingest network samples and return details of every sample.
+        Samples failed by an error of the whole batch write (not by their data) are marked with retry
+        """
+        samples_details = []
+        humans = []
+        for data in parts:
+            sample_details = {'succeed': 0, 'failed': 0, 'total': 0}
+            samples_details.append(sample_details)
 
-            face_object['templates'] = {template_version: face_embeddings[template_version]
-                                        for template_version in templates_to_create}
+            try:
+                sample, _ = RawProcessManager.decode(data, lazy=True)
+            except Exception:
+                traceback.print_exc()
+                sample_details['errors'] = 'Data must have "Network Sample" format.'
+                continue
 
-            if crop_image := face_process.get('$best_shot'):
-                face_object['$cropImage'] = crop_image
+            if cls.__get_sample_type(sample) != cls.process_type or not sample.get('processes'):
+                sample_details['errors'] = 'Processes is empty.'
+                continue
 
-            if age := face_process['object'].get('age'):
-                face_object['age'] = age
+            if RawProcessManager.is_media_process(sample['processes']):
+                cls.__update_or_create_media_activity(sample, workspace, agent)
+                continue
 
-            if gender := face_process['object'].get('gender'):
-                face_object['gender'] = gender
+            humans_pack = RawProcessManager.parse_human_processes(sample['processes'])
+            sample_details['total'] = len(humans_pack)
+            humans += [(sample_details, human) for human in humans_pack]
 
-            if quality := face_process['object'].get('quality'):
-                face_object['quality'] = quality
+        try:
+            written = cls.__write_batch(humans, workspace, agent)
+        except Exception:
+            traceback.print_exc()
+            written = []
+            for sample_details, _ in humans:
+                sample_details.update({'succeed': 0, 'failed': sample_details['total'], 'retry': True})
 
-            return {
-                f'objects@{SampleObjectsName.PROCESSING_CAPTURER}': [face_object]
-            }
+        ongoings = defaultdict(lambda: [])
+        activities_to_index = {}
+        for activity, camera, need_reid, template_info in written:
+            ongoings[str(camera.id)].append(activity.data)
+            if need_reid:
+                PostProcess.__reidentify(activity)
+            if template_info:
+                activities_to_index[template_info['activityId']] = template_info
+
+        if activities_to_index:
+            template_version = workspace.config.get('template_version', settings.DEFAULT_TEMPLATES_VERSION)
+            add_to_activity_index.delay(str(workspace.id), template_version, list(activities_to_index.values()))
+
+        if ongoings:
+            cls.__create_ongoings(ongoings, workspace)
+
+        return {
+            'succeed': sum(d['succeed'] for d in samples_details),
+            'failed': sum(d['failed'] for d in samples_details),
+            'total': sum(d['total'] for d in samples_details),
+            'samples': samples_details
+        }
+
+    @classmethod
+    @transaction.atomic
+    def __write_batch(cls, humans: List[Tuple[dict, dict]], workspace: Workspace, agent: Agent) -> \
+            List[Tuple[Activity, Camera, bool, Optional[dict]]]:
+        """
+        Merge all human packs of a batch in memory and write them with a few bulk statements.
+        The same activity may be sent several times within one batch, so the packs are applied
+        one after another to a single activity instance which is written once.
+        """
+        humans = [(details, human, ActivityProcessManager(human)) for details, human in humans]
+
+        camera_ids = {manager.get_human_process().get('source') for _, _, manager in humans}
+        cameras = {str(camera.id): camera for camera in Camera.objects.filter(id__in=camera_ids)}
+
+        activity_ids = {manager.get_human_process().get('id') for _, _, manager in humans}
+        activities = {str(activity.id): activity
+                      for activity in Activity.objects.select_for_update().filter(id__in=activity_ids)}
+        existing_ids = set(activities.keys())
+
+        username = workspace.accesses.first().user.username
+        blob_writer = BlobBulkWriter(workspace.id)
+        pending_samples = []
+        merged = {}
+        merged_details = defaultdict(list)
+
+        for sample_details, human, manager in humans:
+            camera = cameras.get(str(manager.get_human_process().get('source')))
+            if camera is None:
+                sample_details['failed'] += 1
+                continue
+
+            rois = manager.get_roi_process()
+            if rois:
+                cls.__get_or_create_roi(rois, workspace, camera)
+
+            if not manager.get_person_id():
+                continue
+
+            UsageAnalytics(username=username, operation='activity', meta={'device': str(agent.id)}).start()
 
+            activity_id = str(manager.get_human_process().get('id', ''))
+            activity = activities.get(activity_id)
+            if activity is not None and activity.workspace_id != workspace.id:
+                sample_details['failed'] += 1
+                continue
+
+            # roll back in-memory changes of this pack if it fails
+            snapshot = (copy.deepcopy(activity.data), activity.status, activity.person_id) if activity else None
+            blobs_count, samples_count = len(blob_writer), len(pending_samples)
+            try:
+                activity, need_reid, template_info, _ = cls.__merge_activity(
+                    human,
+                    workspace,
+                    camera,
+                    manager.is_activity_finalized(),
+                    activity=activity,
+                    bsm_writer=lambda bsms, context: cls.__create_bsms(bsms, blob_writer, context)
+                )
+                pending_samples += cls.__build_samples_by_activity(str(workspace.id), activity)
+            except Exception:
+                traceback.print_exc()
+                if snapshot:
+                    activity.data, activity.status, activity.person_id = snapshot
+                blob_writer.truncate(blobs_count)
+                del pending_samples[samples_count:]
+                sample_details['failed'] += 1
+                continue
+
+            activities[activity_id] = activity
+            _, _, was_need_reid, was_template_info = merged.get(activity_id, (None, None, False, None))
+            merged[activity_id] = (activity, camera, need_reid or was_need_reid, template_info or was_template_info)
+            merged_details[activity_id].append(sample_details)
+
+        blob_writer.flush()
+        Sample.objects.bulk_create(pending_samples)
+
+        Activity.objects.bulk_create(
+            [activity for activity_id, (activity, *_) in merged.items() if activity_id not in existing_ids])
+
+        # bulk_update does not touch auto_now fields
+        now = utcnow_with_tz()
+        activities_to_update = [activity for activity_id, (activity, *_) in merged.items()
+                                if activity_id in existing_ids]
+        for activity in activities_to_update:
+            activity.last_modified = now
+        Activity.objects.bulk_update(activities_to_update, ['data', 'status', 'person', 'last_modified'])
+
+        for details_list in merged_details.values():
+            for sample_details in details_list:
+                sample_details['succeed'] += 1
+
+        return list(merged.values())
+
+    @classmethod
+    def __build_samples_by_activity(cls, workspace_id: str, activity: Activity) -> List[Sample]:
+        """
+        Build (not saved) face samples for activity face processes without samples
+        and link them to the processes
+        """
+        samples = []
         face_processes = ActivityProcessManager(activity.data).get_face_processes()
         for face_process in face_processes:
             if not face_process.get('sample_id'):
                 try:
-                    face_sample_meta = __parce_face_process_info_in_sample(face_process)
+                    face_sample_meta = cls.__parce_face_process_info_in_sample(face_process)
                 except NotImplementedError:
                     continue
-                face_sample = SampleManager.create_sample(workspace_id, face_sample_meta)
+                face_sample = Sample(workspace_id=workspace_id, meta=face_sample_meta)
                 face_process['sample_id'] = str(face_sample.id)
+                samples.append(face_sample)
 
-        activity.save()
+        return samples
+
+    @staticmethod
+    def __parce_face_process_info_in_sample(face_process: Dict) -> Dict:
+        # TODO use activity data manager when it merged
+        face_embeddings = face_process['object'].get('embeddings', {})
+
+        templates_to_create = []
+        regex = re.compile('template')
+        for key in face_embeddings.keys():
+            if regex.search(key):
+                templates_to_create.append(key)
+
+        if not templates_to_create:  # do not create sample without templates
+            raise NotImplementedError
+
+        face_object = {
+            'id': 1,  # TODO replace hardcoded value
+            'class': 'face',
+        }
+
+        face_object['templates'] = {template_version: face_embeddings[template_version]
+                                    for template_version in templates_to_create}
+
+        if crop_image := face_process.get('$best_shot'):
+            face_object['$cropImage'] = crop_image
+
+        if age := face_process['object'].get('age'):
+            face_object['age'] = age
+
+        if gender := face_process['object'].get('gender'):
+            face_object['gender'] = gender
+
+        if quality := face_process['object'].get('quality'):
+            face_object['quality'] = quality
+
+        return {
+            f'objects@{SampleObjectsName.PROCESSING_CAPTURER}': [face_object]
+        }
 
     @staticmethod
     def __update_agent_status_info(agent: Agent):
-        with transaction.atomic():
-            AgentManager.update_or_activate_agent(agent.id)
+        AgentManager.heartbeat(agent)
 
     @staticmethod
     def __parse_request(request):
         raw_data = request.body
         if len(request.FILES):
             data = request.FILES.get('sample', list(request.FILES.values())[0])
-            return data.read()
+            return PostProcess.__read_file(data)
         elif len(request.POST):  # C++ specific parsing
             boundary_size = 40
             before_data = 5  # control symbols
             after_data = boundary_size + 8  # control symbols
             key = list(request.POST.keys())[0]
             key_index = raw_data.find(key.encode())
-            data = raw_data[key_index + len(key) + before_data:-after_data]
+            data = memoryview(raw_data)[key_index + len(key) + before_data:-after_data]
             return data
 
+    @staticmethod
+    def __parse_batch_request(request) -> List[Union[bytes, memoryview]]:
+        files = request.FILES.getlist('sample') or list(request.FILES.values())
+        return [PostProcess.__read_file(data) for data in files]
+
+    @staticmethod
+    def __read_file(file) -> Union[bytes, memoryview]:
+        # in-memory uploads are exposed without copying, big ones are spooled to disk and have to be read
+        if isinstance(file.file, BytesIO):
+            return file.file.getbuffer()
+        return file.read()
+
     @staticmethod
     @transaction.atomic
     def __update_or_create_media_activity(sample: dict, workspace: Workspace, agent: Agent) -> Activity:
@@ -386,10 +627,66 @@ class PostProcess(View):
     def __create_or_update_activity(cls, sample: dict, workspace: Workspace, camera: Camera, finalized: bool,
                                     activity: Optional[Activity] = None) -> \
             Tuple[Activity, bool, dict]:
-        if not RawProcessManager.validate_sample_meta(
-                {k: v for k, v in sample.items() if not k.startswith(RawProcessManager.bsm_indicator)}
-        ):
+        if activity is not None:
+            activity = ActivityManager.lock_activity(activity)
+
+        blob_writer = BlobBulkWriter(workspace.id)
+        activity, need_reid, template_info, updated_processes = cls.__merge_activity(
+            sample, workspace, camera, finalized, activity=activity,
+            bsm_writer=lambda bsms, context: cls.__create_bsms(bsms, blob_writer, context)
+        )
+        blob_writer.flush()
+
+        if activity is None:
+            return activity, need_reid, template_info
+
+        # TODO Extend with another sample types
+        face_samples = cls.__build_samples_by_activity(str(workspace.id), activity)
+        if face_samples:
+            Sample.objects.bulk_create(face_samples)
+
+        if updated_processes is None:
+            activity.save()
+        else:
+            sample_ids = {str(face_sample.id) for face_sample in face_samples}
+            for index, process in enumerate(activity.data['processes']):
+                if process.get('sample_id') in sample_ids:
+                    updated_processes[index] = process
+            cls.__save_updated_processes(activity, updated_processes)
+
+        return activity, need_reid, template_info
+
+    @staticmethod
+    def __save_updated_processes(activity: Activity, updated_processes: Dict[int, dict]):
+        """
+        Write only changed processes of the locked activity by jsonb_set instead of the whole activity data.
+        Indexes out of the stored processes list are appended to its end
+        """
+        data = F('data')
+        for index in sorted(updated_processes):
+            data = Func(data, Value(f'{{processes,{index}}}'),
+                        Value(updated_processes[index], output_field=JSONField()),
+                        function='jsonb_set', output_field=JSONField())
+
+        activity.last_modified = utcnow_with_tz()
+        Activity.objects.filter(id=activity.id).update(
+            data=data, status=activity.status, person_id=activity.person_id, last_modified=activity.last_modified
+        )
+
+    @classmethod
+    def __merge_activity(cls, sample: dict, workspace: Workspace, camera: Camera, finalized: bool,
+                         activity: Optional[Activity], bsm_writer: Callable[[list, dict], list]) -> \
+            Tuple[Activity, bool, dict, Optional[Dict[int, dict]]]:
+        """
+        Apply human pack to the new or already locked activity in memory. Activity itself is not saved,
+        blobs are written by **bsm_writer**.
+        Processes of the existing activity are matched by id. Changed and added processes are returned by
+        their indexes in activity processes, or None if the whole activity data should be written
+        """
+        raw_sample_meta = {k: v for k, v in sample.items() if not k.startswith(RawProcessManager.bsm_indicator)}
+        if not RawProcessManager.validate_sample_meta(raw_sample_meta):
             raise ValidationError('Validation error. Meta failed.')
+        validated_meta = RawProcessManager.get_validated_snapshot(raw_sample_meta)
 
         def create_and_substitute_bsms(meta: dict, bsms: list, activity_id: str,
                                        filters: Optional[List[int]] = None) -> dict:
@@ -397,7 +694,7 @@ class PostProcess(View):
             if filters:
                 # if bsms = [bsm0, bsm1, bsm2, bsm3] and filters = [2, 3] -> bsms = [bsm2, bsm3]
                 bsms = [bsms[i] for i in filters]
-            created_bsms = cls.__create_bsms(bsms, workspace, context)
+            created_bsms = bsm_writer(bsms, context)
             if filters:  # place bsm in right position in list to use RawProcessManager.substitute_bsms
                 created_bsms.reverse()
                 tmp = []
@@ -423,10 +720,11 @@ class PostProcess(View):
 
         sample_type = cls.__get_sample_type(sample)
         if sample_type != cls.process_type:
-            return None, False, None
+            return None, False, None, None
 
         raw_meta, bsms = RawProcessManager.extract_bsms(sample)
         context = {}
+        updated_processes = None
 
         sample_manager = ActivityProcessManager(raw_meta)
         parent_process = sample_manager.get_human_process()
@@ -434,31 +732,42 @@ class PostProcess(View):
 
         if activity is None:  # create new activity
             activity_id = parent_process.get('id')
-            activity = Activity.objects.create(
+            activity = Activity(
                 id=activity_id, data={}, creation_date=utcnow_with_tz(), workspace=workspace,
                 person_id=None
             )
             activity.camera = camera
             final_meta = create_and_substitute_bsms(raw_meta, bsms, str(activity.id))
         else:  # update existing activity
-            activity = ActivityManager.lock_activity(activity)
             activity_processes = activity.data['processes']
+            process_indexes = {}
+            for index, process in enumerate(activity_processes):
+                process_indexes.setdefault(process['id'], index)
+
+            # only processes can be written partially, other keys of activity data are replaced by new ones
+            if set(activity.data.keys()) == set(raw_meta.keys()) == {'processes'}:
+                updated_processes = {}
+
             for process in raw_meta['processes']:
-                existing_process = next(filter(lambda p: p['id'] == process['id'], activity_processes), None)
-                if not existing_process:  # append new process to activity
+                index = process_indexes.get(process['id'])
+                if index is None:  # append new process to activity
                     blob_items = ActivityProcessManager.get_blob_items(process)
                     if blob_items:  # create new blobs
                         process = create_and_substitute_bsms(
                             {'processes': [process]}, bsms, str(activity.id))['processes'][0]
+                    index = process_indexes[process['id']] = len(activity_processes)
                     activity_processes.append(process)
                 else:  # update existing process
+                    existing_process = activity_processes[index]
                     old_blob_items = ActivityProcessManager.get_blob_items(existing_process)
                     new_blob_items = ActivityProcessManager.get_blob_items(process)
                     filters = [nv for (nk, nv) in new_blob_items if (nk, nv) not in old_blob_items]
                     merge_dicts(existing_process, process)
                     if filters:
-                        process = create_and_substitute_bsms(
-                            {'processes': [existing_process]}, bsms, str(activity.id), filters)['processes'][0]
+                        create_and_substitute_bsms(
+                            {'processes': [existing_process]}, bsms, str(activity.id), filters)
+                if updated_processes is not None:
+                    updated_processes[index] = activity_processes[index]
             final_meta = raw_meta
             final_meta['processes'] = activity_processes
 
@@ -480,14 +789,13 @@ class PostProcess(View):
             need_reid = ((not activity.person) and
                          (ActivityProcessManager(final_meta).get_template_ids() is not None))
 
-        if not RawProcessManager.validate_sample_meta(final_meta):
+        if not RawProcessManager.validate_sample_meta(final_meta, validated=validated_meta):
             raise ValidationError('Validation error. Sample failed')
 
         assert activity, 'Not implemented type'
 
         activity.data = final_meta
         activity.status = Activity.Type.FINALIZED if finalized else Activity.Type.PROGRESS
-        activity.save()
 
         template_info = None
         if finalized:
@@ -495,7 +803,7 @@ class PostProcess(View):
             template_id = (ActivityProcessManager(final_meta).get_template(template_version) or {}).get("id")
             template_info = {"id": template_id, "activityId": str(activity.id)} if template_id else None
 
-        return activity, need_reid, template_info
+        return activity, need_reid, template_info, updated_processes
 
     @classmethod
     def __reidentify(cls, activity: Activity):
@@ -505,13 +813,16 @@ class PostProcess(View):
             traceback.print_exc()
 
     @staticmethod
-    def __create_bsms(bsms: list, workspace: Workspace, context: dict) -> list:
+    def __create_bsms(bsms: list, writer: BlobBulkWriter, context: dict) -> list:
+        """
+        Add bsms to **writer**, rows are inserted when the writer is flushed
+        """
         written_bsms = []
         for key, bsm, _ in bsms:
             blob = bsm.pop('blob', b'')
             blob_type = None
 
-            assert isinstance(blob, bytes), 'Blob data should be a bytes object'
+            assert isinstance(blob, (bytes, memoryview)), 'Blob data should be a bytes-like object'
 
             if bsm.get('encoding', '') == 'base64':
                 blob = base64.b64decode(blob)
@@ -522,11 +833,9 @@ class PostProcess(View):
             elif key.startswith(RawProcessManager.bsm_indicator):
                 blob_type = key.replace(RawProcessManager.bsm_indicator, '')
 
-            blob_obj = Blob.objects.create(data=blob)
-            blob_meta = BlobMeta.objects.create(workspace=workspace, blob=blob_obj,
-                                                meta={**bsm, **context, 'type': blob_type})
+            blob_meta_id = writer.add(blob, {**bsm, **context, 'type': blob_type})
 
-            written_bsms.append({'id': str(blob_meta.id)})
+            written_bsms.append({'id': blob_meta_id})
 
         return written_bsms
 
@@ -540,6 +849,8 @@ class PostProcess(View):
     @transaction.atomic
     def __create_ongoings(cls, ongoings: dict, workspace: Workspace) -> None:
         cameras = Camera.objects.filter(id__in=list(ongoings.keys())).prefetch_related('locations')
+        ongoings_by_camera = {}
+        change_keys = set()
 
         for camera in cameras:
             location = camera.locations.first()
@@ -587,8 +898,12 @@ class PostProcess(View):
                     'face_best_shot': face_best_shot.get('id') if face_best_shot else None,
                     'body_best_shot': body_best_shot.get('id') if body_best_shot else None,
                 })
-            OngoingManager.set_ongoings(only_humans, str(workspace.id), str(camera.id))
-        triggers_handler.delay(str(workspace.id))
+            ongoings_by_camera[str(camera.id)] = only_humans
+            change_keys.update(TriggerEngine.get_change_keys(only_humans))
+
+        OngoingManager.set_ongoings_many(ongoings_by_camera, str(workspace.id))
+        if change_keys:
+            trigger_events_handler.delay(str(workspace.id), sorted(change_keys))
 
     # TODO: Move to activity data manager?
     @staticmethod
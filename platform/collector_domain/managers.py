@@ -3,9 +3,10 @@ import json
 import logging
 import uuid
 from enum import Enum
-from typing import Union, List, Tuple, Optional
+from typing import Union, List, Tuple, Optional, Dict
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import QuerySet, Q
 
@@ -181,7 +182,66 @@ class AgentManager:
         return self.agent.info.get(self.status_field_name, self.AgentStatus.INACTIVE)
 
     def get_agent_last_active_time(self) -> str:
-        return self.agent.info.get(self.last_active_time_field_name, None)
+        return self.__latest_time(self.agent.info.get(self.last_active_time_field_name, None),
+                                  cache.get(self.__build_heartbeat_key(self.agent.id)))
+
+    @staticmethod
+    def __build_heartbeat_key(agent_id: Union[str, uuid.UUID]) -> str:
+        return f'agents:heartbeat:{agent_id}'
+
+    @staticmethod
+    def __latest_time(*times: Optional[str]) -> Optional[str]:
+        times = [time for time in times if time]
+        return max(times, key=datetime.datetime.fromisoformat) if times else None
+
+    @classmethod
+    def heartbeat(cls, agent: Agent):
+        """
+        Buffer agent last active time in cache.
+        Agent row is locked and written only when agent status changes, buffered time is flushed
+        to the database by **sync_agent_status**
+        """
+        cache.set(cls.__build_heartbeat_key(agent.id), datetime.datetime.utcnow().isoformat(),
+                  timeout=settings.AGENT_HEARTBEAT_TIMEOUT)
+
+        if agent.info.get(cls.status_field_name) != cls.AgentStatus.ACTIVE:
+            with transaction.atomic():
+                cls.update_or_activate_agent(agent.id)
+
+    @classmethod
+    def get_heartbeats(cls, agent_ids: List[Union[str, uuid.UUID]]) -> Dict[str, str]:
+        """
+        Get buffered last active times of agents by one cache request
+        """
+        keys = {cls.__build_heartbeat_key(agent_id): str(agent_id) for agent_id in agent_ids}
+        return {keys[key]: time for key, time in cache.get_many(list(keys.keys())).items()}
+
+    @classmethod
+    def sync_agent_status(cls, agent: Agent, heartbeat: Optional[str] = None) -> bool:
+        """
+        Flush buffered last active time to the locked agent and deactivate agent if it is inactive too long.
+        Agent is saved only if something changed
+
+        Returns
+        -------
+        bool
+            True if agent was saved
+        """
+        last_active_time = agent.info.get(cls.last_active_time_field_name, None)
+        latest_time = cls.__latest_time(last_active_time, heartbeat)
+        changed = latest_time != last_active_time
+        if changed:
+            agent.info[cls.last_active_time_field_name] = latest_time
+
+        if agent.info.get(cls.status_field_name) == cls.AgentStatus.ACTIVE and \
+                not cls.__is_active_time(latest_time):
+            agent.info[cls.status_field_name] = cls.AgentStatus.INACTIVE
+            changed = True
+
+        if changed:
+            agent.save()
+
+        return changed
 
     @classmethod
     def update_or_activate_agent(cls, agent_id: Union[str, uuid.UUID]):
@@ -205,7 +265,8 @@ class AgentManager:
     def check_agent_status(self) -> bool:
         """
         Check status of agent.
-        Get last active period from agent info and compare current time + AGENT_INACTIVE_PERIOD_SECONDS with it.
+        Get last active period from agent info or heartbeat buffer and compare current time
+        + AGENT_INACTIVE_PERIOD_SECONDS with it.
         If last active period less or equal then true else false.
         If last active period not presented in info return false
 
@@ -214,8 +275,11 @@ class AgentManager:
         bool
             Result of checking agent status
         """
+        return self.__is_active_time(self.get_agent_last_active_time())
+
+    @staticmethod
+    def __is_active_time(last_update_time_string: Optional[str]) -> bool:
         agent_inactive_period = settings.AGENT_INACTIVE_PERIOD_SECONDS
-        last_update_time_string = self.agent.info.get(self.last_active_time_field_name, None)
 
         # Return inactive agent status if not found suitable last active time field
         if not last_update_time_string:
@@ -9,9 +9,8 @@ def agent_status_checker():
     agents = AgentManager.get_all_agents()
 
     with transaction.atomic():
-        for agent in agents.select_for_update():
-            agent_manager = AgentManager(agent.id)
-            agent_status = agent_manager.get_agent_status()
+        locked_agents = list(agents.select_for_update())
+        heartbeats = AgentManager.get_heartbeats([agent.id for agent in locked_agents])
 
-            if not agent_manager.check_agent_status() and agent_status == agent_manager.AgentStatus.ACTIVE:
-                AgentManager.deactivate_agent(agent.id)
+        for agent in locked_agents:
+            AgentManager.sync_agent_status(agent, heartbeats.get(str(agent.id)))
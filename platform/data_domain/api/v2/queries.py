@@ -2,7 +2,6 @@ import base64
 from json import JSONDecodeError
 from typing import List, Optional
 
-import requests
 import strawberry
 from django.apps import apps
 from django.conf import settings
@@ -12,11 +11,12 @@ from strawberry.types import Info
 from data_domain.api.utils import check_search_input_data, get_templates
 from data_domain.api.v2.types import (ActivityFilter, ActivityOrdering,
                                       ActivityOutput, ActivitySearchType,
-                                      MatchResult, SearchType)
+                                      MatchResult, PairMatchResult, SearchType)
 from data_domain.managers import SampleManager
 from data_domain.matcher import ActivityMatcherAPI, MatcherAPI
 from data_domain.models import BlobMeta, Sample
 from platform_lib.exceptions import BadInputDataException, InternalException
+from platform_lib.http_client import ServiceClient
 from platform_lib.strawberry_auth.permissions import (IsHaveAccess,
                                                       IsWorkspaceActive)
 from platform_lib.types import JSON, CountList, CustomBinaryType, EyesInput
@@ -27,6 +27,27 @@ from platform_lib.utils import (SampleObjectsName, StrawberryDjangoCountList,
 workspace_model = apps.get_model('user_domain', 'Workspace')
 
 
+def _post_verify_matcher(objects: List[dict]) -> dict:
+    response = ServiceClient.for_service('image_api').post(
+        f'{settings.VERIFY_MATCHER_SERVICE_URL}/process/sample',
+        json={"objects": objects})
+
+    try:
+        result_json = response.json()
+    except (ValueError, TypeError, JSONDecodeError):
+        raise InternalException('0x176cbb31', response.content)
+
+    if response.status_code != 200:
+        if (detail := result_json.get('detail')) is not None:
+            err = detail
+        else:
+            err = result_json
+
+        raise InternalException('0x176cbb31', err)
+
+    return result_json
+
+
 @strawberry.type
 class Query:
     activities: CountList[ActivityOutput] = StrawberryDjangoCountList(permission_classes=[IsHaveAccess],
@@ -53,6 +74,8 @@ class Query:
         # GET TEMPLATE BLOBS
         target_sample = Sample.objects.get(id=target_sample_id)
         target_template_id = SampleManager.get_template_id(target_sample.meta, template_version)
+        if not target_template_id:
+            raise BadInputDataException("0x7c2e41a9", target_sample_id)
         target_blob = BlobMeta.objects.select_related('blob').get(id=target_template_id).blob.data
         target_template = base64.standard_b64encode(target_blob.tobytes()).decode()
         match_templates = [target_template]
@@ -60,6 +83,8 @@ class Query:
         if source_sample_id:
             source_sample = Sample.objects.get(id=source_sample_id)
             source_template_id = SampleManager.get_template_id(source_sample.meta, template_version)
+            if not source_template_id:
+                raise BadInputDataException("0x7c2e41a9", source_sample_id)
             source_blob = BlobMeta.objects.select_related('blob').get(id=source_template_id).blob.data
             match_templates.append(base64.standard_b64encode(source_blob.tobytes()).decode())
 
@@ -86,24 +111,49 @@ class Query:
         for templ in match_templates:
             proc_objects.append({"$template": templ, "class": "face"})
 
-        response = requests.post(
-            f'{settings.VERIFY_MATCHER_SERVICE_URL}/process/sample',
-            json={"objects": proc_objects})
+        result_json = _post_verify_matcher(proc_objects)
 
-        try:
-            result_json = response.json()
-        except (ValueError, TypeError, JSONDecodeError):
-            raise InternalException('0x176cbb31', response.content)
+        return MatchResult(**result_json['verification'])
 
-        if response.status_code != 200:
-            if (detail := result_json.get('detail')) is not None:
-                err = detail
-            else:
-                err = result_json
+    @strawberry.field(permission_classes=[IsHaveAccess, IsWorkspaceActive],
+                      description="Compare every source sample with every target sample in the DB in one request")
+    def verify_many(self, info: Info, target_sample_ids: List[ID], source_sample_ids: List[ID]) \
+            -> List[PairMatchResult]:
+        if not target_sample_ids or not source_sample_ids:
+            return []
 
-            raise InternalException('0x176cbb31', err)
+        workspace_id = get_workspace_id(info=info)
+        template_version = workspace_model.objects.get(id=workspace_id).config.get(
+            'template_version', settings.DEFAULT_TEMPLATES_VERSION
+        )
 
-        return MatchResult(**result_json['verification'])
+        sample_ids = list(dict.fromkeys([*target_sample_ids, *source_sample_ids]))
+        samples = {str(sample.id): sample for sample in Sample.objects.filter(id__in=sample_ids)}
+        if len(samples) != len(sample_ids):
+            raise Sample.DoesNotExist('Sample matching query does not exist.')
+
+        template_ids = {sample_id: SampleManager.get_template_id(sample.meta, template_version)
+                        for sample_id, sample in samples.items()}
+        blobs = {str(blob_meta.id): blob_meta.blob.data for blob_meta in
+                 BlobMeta.objects.select_related('blob').filter(id__in=template_ids.values())}
+        for sample_id, template_id in template_ids.items():
+            if template_id not in blobs:
+                raise BadInputDataException("0x7c2e41a9", sample_id)
+
+        # sources are queried against one index built from the targets
+        proc_objects = [{
+            "$template": base64.standard_b64encode(blobs[template_ids[sample_id]].tobytes()).decode(),
+            "class": "face",
+            "role": role
+        } for role, ids in (("probe", source_sample_ids), ("gallery", target_sample_ids)) for sample_id in ids]
+
+        verification_matrix = _post_verify_matcher(proc_objects)['verification_matrix']
+
+        return [PairMatchResult(target_sample_id=target_sample_id,
+                                source_sample_id=source_sample_id,
+                                match_result=MatchResult(**result))
+                for source_sample_id, row in zip(source_sample_ids, verification_matrix['results'])
+                for target_sample_id, result in zip(target_sample_ids, row)]
 
     @strawberry.field(permission_classes=[IsHaveAccess, IsWorkspaceActive],
                       description="Search similar people in a workspace based on images, sample data, or sample IDs" +
@@ -145,6 +145,13 @@ class MatchResult:
     score: float
 
 
+@strawberry.type
+class PairMatchResult:
+    target_sample_id: ID
+    source_sample_id: ID
+    match_result: MatchResult
+
+
 @strawberry.type
 class ProfileOutputData:
     id: ID
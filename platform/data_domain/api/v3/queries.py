@@ -18,7 +18,4 @@ class Query:
         data = SampleEnricher(image=image)
         functions = SampleEnricher.get_functions_by_fields(requested_fields)
 
-        for function in functions:
-            function(data)
-
-        return data.get_result()  # noqa
+        return data.process(functions).get_result()  # noqa
@@ -1,33 +1,40 @@
 import copy
 import io
 import json
+import logging
 import math
+import time
 import uuid
-from collections import namedtuple
+from collections import namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 
 import bson
 import base64
 import datetime
 from itertools import chain
-from functools import partial
-from typing import List, Tuple, Union, Optional
+from typing import Dict, List, Tuple, Union, Optional, Iterable
 
 import jsonschema
-import requests
 from PIL import Image
 from django.core.cache import cache
 from django.db import transaction
 from django.db.models import QuerySet
 
-from data_domain.models import Sample, Activity, BlobMeta, Blob
+from data_domain.models import Sample, Activity, BlobMeta, Blob, IndexMutation, DirtyIndex
+from data_domain.matcher.base import MatcherRequestError
+from data_domain.matcher.main import MatcherAPI
 from main import settings
 from user_domain.models import Workspace
+from platform_lib.validation import validate
 from platform_lib.validation.schemes import activation_schema, activity_meta_scheme, sample_meta_scheme
 from platform_lib.exceptions import BadInputDataException
 from platform_lib.utils import get_detect, face_processing_data_parser,\
     utcnow_with_tz, SampleObjectsName, camel, snake, fixed_validate_image
 from platform_lib.managers import BaseProcessManager
+from platform_lib.http_client import ServiceClient
+
+logger = logging.getLogger(__name__)
 
 
 class AgentDataManager:
@@ -67,12 +74,12 @@ class AgentDataManager:
     @classmethod
     def validate_sample_meta(cls, meta: dict):
         try:
-            jsonschema.validate(meta, activity_meta_scheme)
+            validate(meta, activity_meta_scheme)
         except jsonschema.ValidationError:
             try:
                 # bson doesn't decode numbers therefore try to decode meta data
                 s = {k: cls.__json_decoder(v) for k, v in meta.items()}
-                jsonschema.validate(s, activity_meta_scheme)
+                validate(s, activity_meta_scheme)
             except Exception:
                 return False
         return True
@@ -129,30 +136,88 @@ class AgentDataManager:
 
 
 class OngoingManager:
+    """
+    Ongoings are cached per camera with the time they were set. A workspace snapshot of all its cameras
+    is cached next to them with the workspace ongoings version, every write bumps the version,
+    so a reader gets ongoings of the whole workspace in one round trip while nothing changes
+    """
     timeout = 10  # in seconds
-    cache_set = partial(cache.set, timeout=timeout)
 
-    @staticmethod
-    def set_ongoings(ongoings: List[dict], workspace_id: str, camera_id: str) -> None:
-        OngoingManager.cache_set(OngoingManager.__build_cache_key(workspace_id, camera_id), ongoings)
+    @classmethod
+    def set_ongoings(cls, ongoings: List[dict], workspace_id: str, camera_id: str) -> None:
+        cls.set_ongoings_many({camera_id: ongoings}, workspace_id)
 
-    @staticmethod
-    def get_ongoings(workspace_id: str, location_id: str = '') -> List[dict]:
-        cameras = Workspace.objects.get(id=workspace_id).cameras.all()
+    @classmethod
+    def set_ongoings_many(cls, ongoings_by_camera: Dict[str, List[dict]], workspace_id: str) -> None:
+        set_time = time.time()
+        cache.set_many({
+            cls.__build_cache_key(workspace_id, camera_id): (set_time, ongoings)
+            for camera_id, ongoings in ongoings_by_camera.items()
+        }, timeout=cls.timeout)
+        cls.__bump_version(workspace_id)
+
+    @classmethod
+    def get_ongoings(cls, workspace_id: str, location_id: str = '') -> List[dict]:
         if location_id:
-            cameras = cameras.filter(camera_location__label_id=location_id)
+            cameras = Workspace.objects.get(id=workspace_id).cameras.all() \
+                .filter(camera_location__label_id=location_id).values_list('id', flat=True)
+            return cls.__alive(cls.__get_entries(workspace_id, cameras).values())
 
-        ongoings = [cache.get(OngoingManager.__build_cache_key(workspace_id, camera.id), []) for camera in cameras]
-        return list(chain(*ongoings))
+        return cls.__alive(cls.get_snapshot(workspace_id).values())
+
+    @classmethod
+    def get_snapshot(cls, workspace_id: str) -> Dict[str, tuple]:
+        """
+        Cached (set time, ongoings) of cameras of the workspace, rebuilt when ongoings were set after it
+        """
+        version_key, snapshot_key = cls.__build_version_key(workspace_id), cls.__build_snapshot_key(workspace_id)
+        cached = cache.get_many([version_key, snapshot_key])
+        version = cached.get(version_key, 0)
+        snapshot = cached.get(snapshot_key)
+        if snapshot is not None and snapshot[0] == version:
+            return snapshot[1]
+
+        cameras = Workspace.objects.get(id=workspace_id).cameras.all().values_list('id', flat=True)
+        entries = cls.__get_entries(workspace_id, cameras)
+        cache.set(snapshot_key, (version, entries), timeout=cls.timeout)
+        return entries
 
     @staticmethod
     def get_parent_process(ongoing: dict) -> dict:
         return next(filter(lambda proc: proc.get('object', {}).get('class', '') == 'human', ongoing['processes']), {})
 
+    @classmethod
+    def __get_entries(cls, workspace_id: str, camera_ids: Iterable[Union[str, uuid.UUID]]) -> Dict[str, tuple]:
+        keys = {cls.__build_cache_key(workspace_id, camera_id): str(camera_id) for camera_id in camera_ids}
+        return {keys[key]: entry for key, entry in cache.get_many(list(keys)).items() if isinstance(entry, tuple)}
+
+    @classmethod
+    def __alive(cls, entries: Iterable[tuple]) -> List[dict]:
+        # a snapshot may outlive ongoings of a camera that stopped sending them
+        expired = time.time() - cls.timeout
+        return list(chain.from_iterable(ongoings for set_time, ongoings in entries if set_time > expired))
+
+    @classmethod
+    def __bump_version(cls, workspace_id: str):
+        version_key = cls.__build_version_key(workspace_id)
+        cache.add(version_key, 0, timeout=None)
+        try:
+            cache.incr(version_key)
+        except ValueError:  # evicted in between
+            cache.set(version_key, 1, timeout=None)
+
     @staticmethod
     def __build_cache_key(workspace_id: str, camera_id: str) -> str:
         return f'ongoings:workspace:{workspace_id}:camera:{camera_id}'
 
+    @staticmethod
+    def __build_snapshot_key(workspace_id: str) -> str:
+        return f'ongoings:workspace:{workspace_id}:snapshot'
+
+    @staticmethod
+    def __build_version_key(workspace_id: str) -> str:
+        return f'ongoings:workspace:{workspace_id}:version'
+
 
 class SampleManager:
     @staticmethod
@@ -238,7 +303,7 @@ class SampleManager:
         return old_quality or new_quality
 
     @staticmethod
-    def __create_bsms(bsms: list, workspace_id: Union[str, uuid.UUID]) -> list:
+    def __create_bsms(bsms: list, writer: 'BlobBulkWriter') -> list:
         written_bsms = []
         for key, bsm, _ in bsms:
             try:
@@ -257,20 +322,19 @@ class SampleManager:
             elif key.startswith(AgentDataManager.bsm_indicator):
                 blob_type = key.replace(AgentDataManager.bsm_indicator, '')
 
-            blob_obj = Blob.objects.create(data=blob)
-            blob_meta = BlobMeta.objects.create(workspace_id=workspace_id, blob=blob_obj,
-                                                meta={'type': blob_type, 'format': binary_format})
+            blob_meta_id = writer.add(blob, {'type': blob_type, 'format': binary_format})
 
-            written_bsms.append({'id': str(blob_meta.id)})
+            written_bsms.append({'id': blob_meta_id})
 
         return written_bsms
 
     @classmethod
     def create_blobs(cls, workspace_id: str, meta: dict) -> dict:
-        with transaction.atomic():
-            meta, bsms = AgentDataManager.extract_bsms(meta)
-            created_bsms = cls.__create_bsms(bsms, workspace_id)
-            meta = AgentDataManager.substitute_bsms(meta, created_bsms)
+        writer = BlobBulkWriter(workspace_id)
+        meta, bsms = AgentDataManager.extract_bsms(meta)
+        created_bsms = cls.__create_bsms(bsms, writer)
+        meta = AgentDataManager.substitute_bsms(meta, created_bsms)
+        writer.flush()
         return meta
 
     @staticmethod
@@ -312,6 +376,229 @@ class BlobMetaManager:
         return BlobMeta.objects.get(id=self.id).blob
 
 
+class BlobBulkWriter:
+    """
+    Collect Blob and BlobMeta rows and insert them with two statements on flush.
+    Ids are generated on the client side, so BlobMeta ids can be substituted into meta before the rows are written
+    """
+    def __init__(self, workspace_id: Union[str, uuid.UUID]):
+        self.workspace_id = workspace_id
+        self.__blobs: List[Blob] = []
+        self.__blob_metas: List[BlobMeta] = []
+
+    def __len__(self) -> int:
+        return len(self.__blobs)
+
+    def add(self, data: bytes, meta: dict) -> str:
+        blob = Blob(id=uuid.uuid4(), data=data)
+        blob_meta = BlobMeta(id=uuid.uuid4(), workspace_id=self.workspace_id, blob=blob, meta=meta)
+        self.__blobs.append(blob)
+        self.__blob_metas.append(blob_meta)
+        return str(blob_meta.id)
+
+    def truncate(self, size: int):
+        """
+        Drop rows added after the writer had **size** rows
+        """
+        del self.__blobs[size:]
+        del self.__blob_metas[size:]
+
+    def flush(self) -> int:
+        written = len(self.__blobs)
+        if not written:
+            return 0
+
+        with transaction.atomic():
+            Blob.objects.bulk_create(self.__blobs)
+            BlobMeta.objects.bulk_create(self.__blob_metas)
+
+        self.__blobs, self.__blob_metas = [], []
+        return written
+
+
+class IndexMutationManager:
+    """
+    Buffer of matcher index changes. Adds and removes are collected per (index, template version),
+    coalesced and sent to the matcher as one batched call per action right before the index commit
+    """
+    @staticmethod
+    def add(workspace_id: Union[str, uuid.UUID], index: Union[str, uuid.UUID], template_version: str,
+            templates_info: List[dict]):
+        IndexMutation.objects.bulk_create([
+            IndexMutation(workspace_id=workspace_id, index=str(index), template_version=template_version,
+                          person_id=str(info['personId']), template_id=str(info['id']))
+            for info in templates_info
+        ])
+
+    @staticmethod
+    def remove(workspace_id: Union[str, uuid.UUID], index: Union[str, uuid.UUID], template_version: str,
+               person_ids: Iterable[Union[str, uuid.UUID]]):
+        IndexMutation.objects.bulk_create([
+            IndexMutation(workspace_id=workspace_id, index=str(index), template_version=template_version,
+                          person_id=str(person_id))
+            for person_id in person_ids
+        ])
+
+    @staticmethod
+    def discard(workspace_id: Union[str, uuid.UUID], person_ids: Iterable[Union[str, uuid.UUID]]):
+        IndexMutation.objects.filter(workspace_id=workspace_id, person_id__in=list(map(str, person_ids))).delete()
+
+    @staticmethod
+    def coalesce(mutations: Iterable[IndexMutation]) -> Tuple[List[str], List[dict]]:
+        """
+        Reduce ordered mutations to the persons to remove and the templates to add after the removal.
+        Removal of a person cancels adds buffered before it, repeated adds of a template are sent once
+        """
+        removed = set()
+        added = defaultdict(dict)
+        for mutation in mutations:
+            if mutation.template_id is None:
+                removed.add(mutation.person_id)
+                added.pop(mutation.person_id, None)
+            else:
+                added[mutation.person_id][mutation.template_id] = {
+                    'id': mutation.template_id, 'personId': mutation.person_id
+                }
+
+        return sorted(removed), [info for templates in added.values() for info in templates.values()]
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Send buffered mutations to the matcher. Mutations of an index stay buffered if the matcher is not reachable
+        or rejects any batch of them, they are sent again by the next flush.
+        An index is flushed by one worker at a time, sent mutations are deleted after the matcher accepted them,
+        so no rows are locked during the matcher requests
+        """
+        flushed = 0
+        keys = IndexMutation.objects.values_list('index', 'template_version').distinct()
+        for index, template_version in keys:
+            lock_key = f'matcher:flush:{index}:{template_version}'
+            if not cache.add(lock_key, True, timeout=settings.INDEX_UPDATE_PERIOD):
+                continue
+            try:
+                mutations = list(IndexMutation.objects.filter(
+                    index=index, template_version=template_version
+                ).order_by('id'))
+                if not mutations:
+                    continue
+
+                # lag of the index counts from the first buffered change, not from the flush
+                IndexCommitManager.mark_dirty(index, template_version, mutations[0].creation_date)
+                person_ids, templates_info = cls.coalesce(mutations)
+                for i in range(0, len(person_ids), settings.BATCH_SIZE):
+                    MatcherAPI.set_base_remove(index, template_version, person_ids[i:i + settings.BATCH_SIZE],
+                                               raise_errors=True)
+                for i in range(0, len(templates_info), settings.BATCH_SIZE):
+                    MatcherAPI.set_base_add(index, template_version, templates_info[i:i + settings.BATCH_SIZE],
+                                            raise_errors=True)
+
+                # mutations buffered during the requests are left for the next flush
+                IndexMutation.objects.filter(id__in=[mutation.id for mutation in mutations]).delete()
+                flushed += len(mutations)
+            except MatcherRequestError as ex:
+                # removes are sent before adds, so resending the whole buffer gives the same index
+                logger.warning(msg=f'Mutations of index {index}:{template_version} stay buffered. {ex}')
+            finally:
+                cache.delete(lock_key)
+
+        return flushed
+
+
+class IndexCommitManager:
+    """
+    Tracks matcher indexes with uncommitted changes, so only they are committed.
+    Dirty indexes are claimed with skip locked and removed before the commit,
+    changes made while a commit is running mark the index dirty again for the next one
+    """
+    @staticmethod
+    def mark_dirty(index: Union[str, uuid.UUID], template_version: str,
+                   dirty_since: Optional[datetime.datetime] = None):
+        dirty_since = dirty_since or utcnow_with_tz()
+        DirtyIndex.objects.bulk_create(
+            [DirtyIndex(index=str(index), template_version=template_version, dirty_since=dirty_since)],
+            ignore_conflicts=True
+        )
+        # keep the earliest change when the index is already dirty
+        DirtyIndex.objects.filter(index=str(index), template_version=template_version,
+                                  dirty_since__gt=dirty_since).update(dirty_since=dirty_since)
+
+    @classmethod
+    def mark_all_dirty(cls) -> int:
+        """
+        Mark indexes of all active workspaces and their labels dirty
+        """
+        from label_domain.models import Label
+
+        count = 0
+        for ws in Workspace.objects.filter(config__is_active=True):
+            template_version = ws.config.get('template_version', settings.DEFAULT_TEMPLATES_VERSION)
+            indexes = [ws.id, *Label.objects.filter(workspace_id=ws.id).values_list('id', flat=True)]
+            for index in indexes:
+                cls.mark_dirty(index, template_version)
+            count += len(indexes)
+        return count
+
+    @staticmethod
+    def forget(index: Union[str, uuid.UUID], template_version: str):
+        DirtyIndex.objects.filter(index=str(index), template_version=template_version).delete()
+
+    @staticmethod
+    def get_commit_lag(index: Union[str, uuid.UUID], template_version: str) -> float:
+        """
+        Seconds since the first uncommitted change of the index, 0 if the index is committed
+        """
+        dirty_index = DirtyIndex.objects.filter(index=str(index), template_version=template_version).first()
+        return (utcnow_with_tz() - dirty_index.dirty_since).total_seconds() if dirty_index else 0.
+
+    @staticmethod
+    def claim() -> List[DirtyIndex]:
+        with transaction.atomic():
+            dirty_indexes = list(DirtyIndex.objects.select_for_update(skip_locked=True).order_by('dirty_since'))
+            DirtyIndex.objects.filter(id__in=[dirty_index.id for dirty_index in dirty_indexes]).delete()
+        return dirty_indexes
+
+    @classmethod
+    def commit(cls) -> Dict[str, float]:
+        """
+        Commit dirty indexes, at most INDEX_COMMIT_CONCURRENCY at a time
+
+        Returns
+        -------
+        Dict[str, float]
+            commit lag in seconds by '<index>:<template version>'
+        """
+        dirty_indexes = cls.claim()
+        if not dirty_indexes:
+            return {}
+
+        def commit_index(dirty_index: DirtyIndex) -> float:
+            # errors and timeouts raise, so the index is marked dirty again
+            MatcherAPI.set_base_commit(dirty_index.index, dirty_index.template_version, raise_errors=True)
+            return (utcnow_with_tz() - dirty_index.dirty_since).total_seconds()
+
+        lags, error = {}, None
+        with ThreadPoolExecutor(max_workers=settings.INDEX_COMMIT_CONCURRENCY) as executor:
+            futures = [(dirty_index, executor.submit(commit_index, dirty_index)) for dirty_index in dirty_indexes]
+            for dirty_index, future in futures:
+                try:
+                    lags[f'{dirty_index.index}:{dirty_index.template_version}'] = future.result()
+                except Exception as ex:
+                    # stays dirty with its first change time, so the lag keeps growing until it is committed
+                    cls.mark_dirty(dirty_index.index, dirty_index.template_version, dirty_index.dirty_since)
+                    error = error or ex
+
+        for key, lag in lags.items():
+            if lag > settings.INDEX_COMMIT_LAG_WARNING:
+                logger.warning(msg=f'Index {key} was committed {lag:.1f} seconds after the change')
+        if lags:
+            logger.info(msg=f'Committed {len(lags)} indexes, max commit lag {max(lags.values()):.1f} seconds')
+
+        if error is not None:
+            raise error
+        return lags
+
+
 class ActivityManager:
     @staticmethod
     def get_activities(workspace: Workspace, activities_ids: list):
@@ -456,6 +743,60 @@ class ActivityManager:
         return list(filter(None, map(lambda x: x.get("sample_id"), face_processes)))
 
 
+class BinarySampleTransport:
+    """
+    image_api requests with images and templates as raw bytes in BSON instead of base64 strings in JSON.
+    Services without binary endpoints are remembered and asked over JSON
+    """
+    bsm_indicator = "$"
+    unsupported_statuses = (404, 405, 415, 501)
+    __unsupported_urls = set()
+
+    @classmethod
+    def _convert_blobs(cls, sample: Union[dict, list], convert: callable, blob_type: type):
+        items = sample.items() if isinstance(sample, dict) else enumerate(sample)
+        for key, value in items:
+            if isinstance(value, (dict, list)):
+                cls._convert_blobs(value, convert, blob_type)
+            elif isinstance(value, blob_type) and isinstance(key, str) and key.startswith(cls.bsm_indicator):
+                sample[key] = convert(value)
+
+    @classmethod
+    def pack(cls, sample: dict) -> bytes:
+        # blob values are replaced in a copy, SampleEnricher keeps base64 sample
+        packed_sample = copy.deepcopy(sample)
+        cls._convert_blobs(packed_sample, base64.standard_b64decode, str)
+        return bson.dumps(packed_sample)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> dict:
+        sample = bson.loads(data)
+        cls._convert_blobs(sample, lambda blob: base64.b64encode(blob).decode('ascii'), bytes)
+        return sample
+
+    @classmethod
+    def is_available(cls, service_url: str, path: str) -> bool:
+        return settings.IMAGE_API_BINARY_TRANSPORT and f"{service_url}{path}" not in cls.__unsupported_urls
+
+    @classmethod
+    def post(cls, service_url: str, path: str, request_id: Optional[str] = None, **kwargs):
+        """
+        Returns response of the binary endpoint or None if binary transport is not available
+        """
+        if not cls.is_available(service_url, path):
+            return None
+
+        response = ServiceClient.for_service('image_api').post(
+            url=f"{service_url}{path}/binary", headers={'X_REQUEST_ID': request_id}, **kwargs)
+
+        if response.status_code in cls.unsupported_statuses:
+            logger.info(msg=f'{service_url}{path} does not support binary samples, JSON is used')
+            cls.__unsupported_urls.add(f"{service_url}{path}")
+            return None
+
+        return response
+
+
 class SampleEnricher:
     @dataclass(frozen=True, order=True)
     class FunctionContainer:
@@ -707,7 +1048,40 @@ class SampleEnricher:
         }
         headers = {'X_REQUEST_ID': request_id}
 
-        response = requests.post(url=f"{service_url}/process/image", files=files, headers=headers)
+        response = BinarySampleTransport.post(service_url, '/process/image', request_id, files=files)
+        if response is not None:
+            cls._handle__image_api_response_error(response)
+            return BinarySampleTransport.unpack(response.content)
+
+        response = ServiceClient.for_service('image_api').post(
+            url=f"{service_url}/process/image", files=files, headers=headers)
+
+        cls._handle__image_api_response_error(response)
+
+        return response.json()
+
+    @classmethod
+    def _handle_pipeline(cls,
+                         image: Union[str, bytes],
+                         blocks: List[str],
+                         service_url: str,
+                         request_id: Optional[str] = None) -> Optional[dict]:
+        files = {
+            'image': ('image.jpg', image)
+        }
+        data = {'blocks': ','.join(blocks)}
+        headers = {'X_REQUEST_ID': request_id}
+
+        response = BinarySampleTransport.post(service_url, '/process/pipeline', request_id, files=files, data=data)
+        if response is not None:
+            cls._handle__image_api_response_error(response)
+            return BinarySampleTransport.unpack(response.content)
+
+        response = ServiceClient.for_service('image_api').post(
+            url=f"{service_url}/process/pipeline", files=files, data=data, headers=headers)
+
+        if response.status_code == 404:
+            return None
 
         cls._handle__image_api_response_error(response)
 
@@ -717,7 +1091,15 @@ class SampleEnricher:
     def _handle_sample(cls, sample_data: dict, service_url: str, request_id: Optional[str] = None) -> dict:
         headers = {'X_REQUEST_ID': request_id}
 
-        response = requests.post(url=f"{service_url}/process/sample", json=sample_data, headers=headers)
+        if BinarySampleTransport.is_available(service_url, '/process/sample'):
+            files = {'sample': ('sample.bson', BinarySampleTransport.pack(sample_data), 'application/bson')}
+            response = BinarySampleTransport.post(service_url, '/process/sample', request_id, files=files)
+            if response is not None:
+                cls._handle__image_api_response_error(response)
+                return BinarySampleTransport.unpack(response.content)
+
+        response = ServiceClient.for_service('image_api').post(
+            url=f"{service_url}/process/sample", json=sample_data, headers=headers)
 
         cls._handle__image_api_response_error(response)
 
@@ -729,7 +1111,7 @@ class SampleEnricher:
         else:
             if sample_validation_cheme is not None:
                 # Check if current sample data is enough for quality_estimator
-                jsonschema.validate(self._sample, sample_validation_cheme)
+                validate(self._sample, sample_validation_cheme)
 
             return self._handle_sample(sample_data=self._sample, service_url=service_url, request_id=self.request_id)
 
@@ -745,7 +1127,7 @@ class SampleEnricher:
             raise Exception('Wrong SampleEnricher input')
 
         if sample_meta is not None:
-            jsonschema.validate(sample_meta, sample_meta_scheme)
+            validate(sample_meta, sample_meta_scheme)
 
             self._sample_indexes = {}
 
@@ -841,7 +1223,7 @@ class SampleEnricher:
             raise Exception('Quality estimation requires detected face')
 
         # Check if current sample data is enough for quality_estimator
-        jsonschema.validate(self._sample, self.fitter_validation_scheme)
+        validate(self._sample, self.fitter_validation_scheme)
 
         result = self._handle_sample(self._sample, settings.QUALITY_ASSESSMENT_SERVICE_URL, self.request_id)
 
@@ -861,9 +1243,78 @@ class SampleEnricher:
                 del object_['$template']
                 del object_['template_size']
 
-        jsonschema.validate(result, sample_meta_scheme)
+        validate(result, sample_meta_scheme)
         return result
 
+    # image_api pipeline blocks doing the same work as the functions
+    pipeline_blocks = {
+        'face_fitter': 'face_detector_face_fitter',
+        'template_extractor': 'face_detector_template_extractor',
+        'liveness_estimator': 'face_detector_liveness_estimator',
+        'gender_estimator': 'gender_estimator',
+        'emotion_estimator': 'emotion_estimator',
+        'mask_estimator': 'mask_estimator',
+        'age_estimator': 'age_estimator',
+        'quality_estimator': 'quality_assessment_estimator',
+    }
+
+    def process(self, functions: List[callable]):
+        """
+        Apply functions to the image, with one image_api pipeline request if every function has a pipeline block,
+        otherwise independent functions of the same weight are requested concurrently
+        """
+        blocks = [self.pipeline_blocks.get(function.__name__) for function in functions]
+
+        if settings.IMAGE_API_PIPELINE_URL and self._sample is None and blocks and all(blocks):
+            result = self._handle_pipeline(self._image, blocks, settings.IMAGE_API_PIPELINE_URL, self.request_id)
+            if result is not None:
+                self._sample = result
+                return self
+            logger.warning('image_api pipeline is not available, sending a request per block')
+
+        for level in self._get_levels(functions):
+            self._run_level(level)
+        return self
+
+    @classmethod
+    def _get_levels(cls, functions: List[callable]) -> List[List[callable]]:
+        """
+        Functions grouped by weight, every function depends on the whole previous group only
+        """
+        weights = {container.func_name: container.weight for container in cls.function_containers}
+
+        levels = defaultdict(list)
+        for function in functions:
+            levels[weights[function.__name__]].append(function)
+
+        return [levels[weight] for weight in sorted(levels)]
+
+    def _run_level(self, functions: List[callable]):
+        # detection from the bare image sets the objects order, so it is never run in parallel
+        if len(functions) == 1 or self._sample is None:
+            for function in functions:
+                function(self)
+            return
+
+        branches = [copy.copy(self) for _ in functions]
+        with ThreadPoolExecutor(max_workers=min(len(functions), settings.SAMPLE_ENRICHER_CONCURRENCY)) as executor:
+            futures = [executor.submit(function, branch) for function, branch in zip(functions, branches)]
+
+        self._sample = self._merge_samples([future.result()._sample for future in futures])
+
+    @staticmethod
+    def _merge_samples(samples: List[dict]) -> dict:
+        merged_sample, *other_samples = samples
+        merged_objects = merged_sample.setdefault('objects', [])
+
+        for sample in other_samples:
+            for idx, object_ in enumerate(sample.get('objects', [])):
+                if (idx + 1) > len(merged_objects):
+                    merged_objects.append({})
+                merged_objects[idx].update(object_)
+
+        return merged_sample
+
     function_containers = (
         namedtuple("FunctionContainers", ['face_detector',
                                           'face_fitter',
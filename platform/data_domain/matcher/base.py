@@ -0,0 +1,57 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class MatcherRequestError(Exception):
+    """
+    Matcher returned errors or did not answer in time, raised instead of an empty result when raise_errors is set
+    """
+
+
+class MatcherBackend(ABC):
+    """
+    1:N matcher interface behind MatcherAPI and ActivityMatcherAPI.
+    Owner ids of templates are person ids for face indexes and activity ids for activity indexes
+    """
+
+    @abstractmethod
+    def set_base(self, index_key: str, template_version: str):
+        """
+        (Re)build index from the templates stored in the database, returns templates count
+        """
+
+    @abstractmethod
+    def set_base_add(self, index_key: str, template_version: str, templates_info: list, raise_errors: bool = False):
+        """
+        Add templates, templates_info items are {'id': <template BlobMeta id>, '<owner key>': <owner id>}
+        """
+
+    @abstractmethod
+    def set_base_remove(self, index_key: str, template_version: str, ids: list, raise_errors: bool = False):
+        """
+        Remove all templates of the owners
+        """
+
+    def set_base_commit(self, index_key: str, template_version: str, raise_errors: bool = False):
+        """
+        Make added and removed templates searchable, nothing to do for backends which apply changes right away
+        """
+        return {}
+
+    @abstractmethod
+    def delete_index(self, index_key: str, template_version: str):
+        pass
+
+    @abstractmethod
+    def search(self,
+               index_key: str,
+               template_version: str,
+               templates: List[str],
+               nearest_count: int = 5,
+               score: float = 0.0,
+               far: float = 1.0,
+               frr: float = 0.0) -> List[dict]:
+        """
+        Search nearest templates for every base64 encoded template, results keep the order of templates:
+        [{'template': <template>, 'searchResult': [{'<owner key>', 'matchTemplateId', 'matchResult'}]}]
+        """
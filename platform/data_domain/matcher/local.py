@@ -0,0 +1,282 @@
+import base64
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from data_domain.matcher.base import MatcherBackend
+from data_domain.models import Activity, BlobMeta, Sample
+
+try:
+    import numpy as np
+except ImportError:  # only the local backend needs it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateIndex:
+    """
+    Immutable snapshot of an index: owner and template ids with L2-normalized template vectors as matrix rows.
+    Changes build a new snapshot, so searches running in other threads keep a consistent one
+    """
+    def __init__(self, generation: int, owner_ids: List[str], template_ids: List[str], matrix: 'np.ndarray'):
+        self.generation = generation
+        self.owner_ids = owner_ids
+        self.template_ids = template_ids
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return len(self.owner_ids)
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self.matrix.shape[1] if len(self) else None
+
+    def add(self, generation: int, owner_ids: List[str], template_ids: List[str], matrix: 'np.ndarray') -> \
+            'TemplateIndex':
+        if not len(self):
+            return TemplateIndex(generation, owner_ids, template_ids, matrix)
+        return TemplateIndex(generation, self.owner_ids + owner_ids, self.template_ids + template_ids,
+                             np.vstack([self.matrix, matrix]))
+
+    def remove(self, generation: int, owner_ids: List[str]) -> 'TemplateIndex':
+        owner_ids = set(owner_ids)
+        keep = [i for i, owner_id in enumerate(self.owner_ids) if owner_id not in owner_ids]
+        return TemplateIndex(generation, [self.owner_ids[i] for i in keep], [self.template_ids[i] for i in keep],
+                             self.matrix[keep])
+
+
+class LocalMatcher(MatcherBackend):
+    """
+    In-process matcher for small and medium indexes, search is one matrix product of normalized templates.
+    Indexes are loaded from the database on first use. Every change bumps the index generation in cache,
+    processes holding an older generation reload the index on their next search.
+    Changes are searchable right away, commit has nothing to do.
+    Templates are read as float32 vectors after MATCHER_LOCAL_TEMPLATE_OFFSET bytes.
+    Cosine similarity is mapped to score and faR so that MATCHER_LOCAL_MATCH_SIMILARITY gets
+    DEFAULT_SCORE_THRESHOLD_VALUE and DEFAULT_FAR_THRESHOLD_VALUE, the thresholds callers compare with.
+    Higher similarity gives higher score and lower faR, frR is score. Values away from the threshold are
+    interpolated, not calibrated like the ones of matcher service
+    """
+    def __init__(self, kind: str, owner_key: str, loader: Callable[[str, str], List[Tuple[str, str]]]):
+        if np is None:
+            raise ImproperlyConfigured('numpy is required by the local matcher backend')
+
+        self.kind = kind
+        self.owner_key = owner_key
+        self.loader = loader
+        self.__indexes: Dict[Tuple[str, str], TemplateIndex] = {}
+        self.__lock = threading.RLock()
+
+    @classmethod
+    def face(cls) -> 'LocalMatcher':
+        return cls('face', 'personId', cls.__load_face_templates)
+
+    @classmethod
+    def activity(cls) -> 'LocalMatcher':
+        return cls('activity', 'activityId', cls.__load_activity_templates)
+
+    def set_base(self, index_key: str, template_version: str):
+        key = (str(index_key), template_version)
+        with self.__lock:
+            generation = self.__bump_generation(key)
+            index = self.__indexes[key] = self.__build(generation, self.loader(*key))
+        return len(index)
+
+    def set_base_add(self, index_key: str, template_version: str, templates_info: list, raise_errors: bool = False):
+        owner_ids = [str(info[self.owner_key]) for info in templates_info]
+        template_ids = [str(info['id']) for info in templates_info]
+        return self.__update(
+            (str(index_key), template_version),
+            lambda index, generation: index.add(generation, *self.__read_templates(owner_ids, template_ids,
+                                                                                   index.dimension))
+        )
+
+    def set_base_remove(self, index_key: str, template_version: str, ids: list, raise_errors: bool = False):
+        owner_ids = list(map(str, ids))
+        return self.__update(
+            (str(index_key), template_version),
+            lambda index, generation: index.remove(generation, owner_ids)
+        )
+
+    def delete_index(self, index_key: str, template_version: str):
+        key = (str(index_key), template_version)
+        with self.__lock:
+            self.__bump_generation(key)
+            self.__indexes.pop(key, None)
+        return True
+
+    def search(self,
+               index_key: str,
+               template_version: str,
+               templates: List[str],
+               nearest_count: int = 5,
+               score: float = 0.0,
+               far: float = 1.0,
+               frr: float = 0.0) -> List[dict]:
+        index = self.__get_index((str(index_key), template_version))
+        results = [{'template': template, 'searchResult': []} for template in templates]
+        if not len(index) or not templates:
+            return results
+
+        queries = [self.decode(base64.b64decode(template) if isinstance(template, str) else template)
+                   for template in templates]
+        valid = [i for i, query in enumerate(queries) if query.size == index.dimension]
+        if len(valid) != len(queries):
+            logger.warning(msg=f'{len(queries) - len(valid)} templates do not fit index {index_key} dimension')
+        if not valid:
+            return results
+
+        similarity = self.normalize(np.vstack([queries[i] for i in valid])) @ index.matrix.T
+        k = min(nearest_count, len(index))
+        nearest = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+
+        for row, i in enumerate(valid):
+            candidates = nearest[row][np.argsort(-similarity[row, nearest[row]])]
+            for j in candidates:
+                match_result = self.match_result(float(similarity[row, j]))
+                if match_result['score'] < score or match_result['faR'] > far:
+                    continue
+                results[i]['searchResult'].append({
+                    self.owner_key: index.owner_ids[j],
+                    'matchTemplateId': index.template_ids[j],
+                    'matchResult': match_result
+                })
+
+        return results
+
+    @staticmethod
+    def decode(template: bytes) -> 'np.ndarray':
+        data = memoryview(template)[settings.MATCHER_LOCAL_TEMPLATE_OFFSET:]
+        return np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)
+
+    @staticmethod
+    def normalize(matrix: 'np.ndarray') -> 'np.ndarray':
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.where(norms == 0, 1, norms)).astype(np.float32, copy=False)
+
+    @staticmethod
+    def match_result(similarity: float) -> dict:
+        threshold = settings.MATCHER_LOCAL_MATCH_SIMILARITY
+        threshold_score = float(settings.DEFAULT_SCORE_THRESHOLD_VALUE)
+        similarity = min(max(similarity, -1.), 1.)
+
+        # piecewise linear: -1 -> 0, threshold -> threshold score, 1 -> 1
+        if similarity <= threshold:
+            score = threshold_score * (similarity + 1) / (threshold + 1)
+        else:
+            score = threshold_score + (1 - threshold_score) * (similarity - threshold) / (1 - threshold)
+        # log-linear: -1 -> 1, threshold -> threshold faR
+        far = float(settings.DEFAULT_FAR_THRESHOLD_VALUE) ** ((similarity + 1) / (threshold + 1))
+
+        return {
+            'distance': float(np.sqrt(max(0., 2 - 2 * similarity))),
+            'faR': far,
+            'frR': score,
+            'score': score
+        }
+
+    def __update(self, key: Tuple[str, str], change: Callable[[TemplateIndex, int], TemplateIndex]):
+        with self.__lock:
+            index = self.__indexes.get(key)
+            generation = self.__bump_generation(key)
+            if index is not None and index.generation == generation - 1:
+                index = self.__indexes[key] = change(index, generation)
+                return len(index)
+
+            # not loaded or this process missed other changes, the index is loaded on the next search
+            self.__indexes.pop(key, None)
+            return {}
+
+    def __get_index(self, key: Tuple[str, str]) -> TemplateIndex:
+        with self.__lock:
+            index = self.__indexes.get(key)
+            generation = self.__get_generation(key)
+            if index is None or index.generation != generation:
+                index = self.__indexes[key] = self.__build(generation, self.loader(*key))
+        return index
+
+    def __build(self, generation: int, templates: List[Tuple[str, str]]) -> TemplateIndex:
+        owner_ids = [owner_id for owner_id, _ in templates]
+        template_ids = [template_id for _, template_id in templates]
+        return TemplateIndex(generation, *self.__read_templates(owner_ids, template_ids))
+
+    def __read_templates(self, owner_ids: List[str], template_ids: List[str], dimension: Optional[int] = None) -> \
+            Tuple[List[str], List[str], 'np.ndarray']:
+        blobs = {str(blob_meta.id): blob_meta.blob.data
+                 for blob_meta in BlobMeta.objects.select_related('blob').filter(id__in=template_ids)}
+
+        rows, read_owner_ids, read_template_ids = [], [], []
+        for owner_id, template_id in zip(owner_ids, template_ids):
+            blob = blobs.get(template_id)
+            if blob is None:
+                continue
+            vector = self.decode(bytes(blob))
+            dimension = dimension or vector.size
+            if vector.size != dimension:
+                logger.warning(msg=f'Template {template_id} does not fit index dimension {dimension}')
+                continue
+            rows.append(vector)
+            read_owner_ids.append(owner_id)
+            read_template_ids.append(template_id)
+
+        matrix = self.normalize(np.vstack(rows)) if rows else np.empty((0, dimension or 0), dtype=np.float32)
+        return read_owner_ids, read_template_ids, matrix
+
+    def __generation_key(self, key: Tuple[str, str]) -> str:
+        return f'matcher:local:{self.kind}:{key[0]}:{key[1]}'
+
+    def __get_generation(self, key: Tuple[str, str]) -> int:
+        return cache.get(self.__generation_key(key), 0)
+
+    def __bump_generation(self, key: Tuple[str, str]) -> int:
+        generation_key = self.__generation_key(key)
+        cache.add(generation_key, 0, timeout=None)
+        try:
+            return cache.incr(generation_key)
+        except ValueError:  # evicted in between
+            cache.set(generation_key, 1, timeout=None)
+            return 1
+
+    @staticmethod
+    def __load_face_templates(index_key: str, template_version: str) -> List[Tuple[str, str]]:
+        """
+        Main sample templates of persons of a workspace or of profiles of a label
+        """
+        from data_domain.managers import SampleManager
+        from label_domain.models import Label
+        from person_domain.models import Person, Profile
+
+        if Label.objects.filter(id=index_key).exists():
+            owners = Profile.objects.filter(profile_groups__id=index_key, person__isnull=False) \
+                .values_list('person_id', 'info__main_sample_id')
+        else:
+            owners = Person.objects.filter(workspace_id=index_key).values_list('id', 'info__main_sample_id')
+
+        main_samples = {str(sample_id): str(owner_id) for owner_id, sample_id in owners if sample_id}
+        templates = []
+        for sample_id, meta in Sample.objects.filter(id__in=main_samples.keys()).values_list('id', 'meta'):
+            template_id = SampleManager.get_template_id(meta or {}, template_version)
+            if template_id:
+                templates.append((main_samples[str(sample_id)], str(template_id)))
+        return templates
+
+    @staticmethod
+    def __load_activity_templates(index_key: str, template_version: str) -> List[Tuple[str, str]]:
+        """
+        Face templates of finalized activities of a workspace
+        """
+        from platform_lib.managers import ActivityProcessManager
+
+        templates = []
+        activities = Activity.objects.filter(workspace_id=index_key, status=Activity.Type.FINALIZED) \
+            .values_list('id', 'data')
+        for activity_id, data in activities.iterator():
+            template_id = (ActivityProcessManager(data or {}).get_template(template_version) or {}).get('id')
+            if template_id:
+                templates.append((str(activity_id), str(template_id)))
+        return templates
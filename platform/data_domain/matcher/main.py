@@ -1,15 +1,79 @@
 import json
+import base64
+import struct
 import logging
 import requests
-from typing import List
+from typing import List, Optional, Union, Type, Callable
 
+from data_domain.matcher.base import MatcherBackend, MatcherRequestError
+from data_domain.matcher.local import LocalMatcher
+from platform_lib.http_client import ServiceClient
 from user_domain.models import Workspace
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
-class MatcherAPI:
+class BinaryTemplateTransport:
+    """
+    Search request with raw templates packed in one multipart part instead of base64 strings in GraphQL variables.
+    Every template is prefixed by its size (uint32, little-endian).
+    Matchers without the binary endpoint are remembered and asked over GraphQL
+    """
+    search_path = '/binary/search'
+    unsupported_statuses = (404, 405, 415, 501)
+    __unsupported_urls = set()
+
+    @classmethod
+    def search(cls, service: str, matcher_url: str, variables: dict) -> Optional[dict]:
+        """
+        Returns response in the same shape as GraphQL one or None if binary transport is not available.
+        Error statuses and bodies which are not JSON are returned as GraphQL errors
+        """
+        if not settings.MATCHER_BINARY_TRANSPORT or matcher_url in cls.__unsupported_urls:
+            return None
+
+        templates = variables['templates']
+        files = {'templates': ('templates', cls.pack(templates), 'application/octet-stream')}
+        params = {key: value for key, value in variables.items() if key != 'templates'}
+
+        try:
+            response = ServiceClient.for_service(service).post(
+                matcher_url + cls.search_path,
+                data={'variables': json.dumps(params)},
+                files=files
+            )
+        except requests.exceptions.Timeout:
+            return {}
+
+        if response.status_code in cls.unsupported_statuses:
+            logger.info(msg=f'{matcher_url} does not support binary templates, GraphQL is used')
+            cls.__unsupported_urls.add(matcher_url)
+            return None
+
+        try:
+            result = response.json()
+        except ValueError:  # error pages of proxies and crashed matchers are not JSON
+            result = None
+        if not isinstance(result, dict) or (not response.ok and not result.get('errors')):
+            return {'errors': [{'message': f'{matcher_url} binary search failed with status {response.status_code}'}]}
+
+        # templates are not sent back, restore them as GraphQL returns them
+        for search_result, template in zip((result.get('data') or {}).get('search') or [], templates):
+            search_result['template'] = template
+
+        return result
+
+    @staticmethod
+    def pack(templates: List[Union[str, bytes]]) -> bytes:
+        packed = []
+        for template in templates:
+            template = base64.b64decode(template) if isinstance(template, str) else template
+            packed += [struct.pack('<I', len(template)), template]
+        return b''.join(packed)
+
+
+class RemoteMatcher(MatcherBackend):
     @classmethod
     def set_base(cls, index_key: str, template_version: str):
         query = '''
@@ -28,12 +92,14 @@ class MatcherAPI:
             logger.error(msg=f'FaceMatcher returned an error. {errors}')
             return {}
 
+        cls.__mark_dirty(index_key, template_version)
+
         search_data = response.get('data', {}).get('setBase', {}).get('templatesCount', {})
 
         return search_data if search_data is not None else {}
 
     @classmethod
-    def set_base_add(cls, index_key: str, template_version: str, templates_info: list):
+    def set_base_add(cls, index_key: str, template_version: str, templates_info: list, raise_errors: bool = False):
         query = '''
         mutation($indexKey: String!, $templateVersion: String!, $templatesInfo: [TemplateInfoType!]!)
             {
@@ -47,19 +113,23 @@ class MatcherAPI:
         }
         operation = {'query': query, 'variables': variables}
 
-        response = cls.__graph_request(operation)
+        response = cls.__graph_request(operation, raise_errors)
         errors = response.get('errors')
 
         if errors is not None:
             logger.error(msg=f'FaceMatcher returned an error. {errors}')
+            if raise_errors:
+                raise MatcherRequestError(errors)
             return {}
 
+        cls.__mark_dirty(index_key, template_version)
+
         search_data = response.get('data', {}).get('setBaseUpdate', {}).get('templatesCount', {})
 
         return search_data if search_data is not None else {}
 
     @classmethod
-    def set_base_commit(cls, index_key: str, template_version: str):
+    def set_base_commit(cls, index_key: str, template_version: str, raise_errors: bool = False):
         query = '''
             mutation($indexKey: String!, $templateVersion: String!)
                 {
@@ -72,11 +142,13 @@ class MatcherAPI:
         }
         operation = {'query': query, 'variables': variables}
 
-        response = cls.__graph_request(operation)
+        response = cls.__graph_request(operation, raise_errors)
         errors = response.get('errors')
 
         if errors is not None:
             logger.error(msg=f'FaceMatcher returned an error. {errors}')
+            if raise_errors:
+                raise MatcherRequestError(errors)
             return {}
 
         commit_data = response.get('data', {}).get('setBaseUpdate', {}).get('templatesCount', {})
@@ -84,7 +156,7 @@ class MatcherAPI:
         return commit_data if commit_data is not None else {}
 
     @classmethod
-    def set_base_remove(cls, index_key: str, template_version: str, person_ids: list):
+    def set_base_remove(cls, index_key: str, template_version: str, person_ids: list, raise_errors: bool = False):
         person_ids = list(map(str, person_ids))
         query = '''
         mutation($indexKey: String!, $templateVersion: String!, $personIds: [String!]!){
@@ -99,13 +171,17 @@ class MatcherAPI:
         }
         operation = {'query': query, 'variables': variables}
 
-        response = cls.__graph_request(operation)
+        response = cls.__graph_request(operation, raise_errors)
         errors = response.get('errors')
 
         if errors is not None:
             logger.error(msg=f'FaceMatcher returned an error. {errors}')
+            if raise_errors:
+                raise MatcherRequestError(errors)
             return {}
 
+        cls.__mark_dirty(index_key, template_version)
+
         search_data = response.get('data', {}).get('setBaseUpdate', {}).get('templatesCount', {})
 
         return search_data if search_data is not None else {}
@@ -120,7 +196,6 @@ class MatcherAPI:
                far: float = 1.0,
                frr: float = 0.0) -> List[dict]:
 
-        # TODO optimise network overhead
         query = '''
         query($indexKey: String!, $templateVersion: String!, $nearestCount: Int!, $templates: [Base64!]!,
                 $score: Float!, $faR: Float! , $frR: Float!){
@@ -148,8 +223,10 @@ class MatcherAPI:
             'frR': frr
         }
 
-        operation = {'query': query, 'variables': variables}
-        response = cls.__graph_request(operation)
+        response = BinaryTemplateTransport.search('matcher', cls.__get_matcher_url(variables), variables)
+        if response is None:
+            operation = {'query': query, 'variables': variables}
+            response = cls.__graph_request(operation)
         errors = response.get('errors')
 
         if errors is not None:
@@ -176,31 +253,52 @@ class MatcherAPI:
             logger.error(msg=f'FaceMatcher returned an error. {errors}')
             return False
 
+        cls.__forget_dirty(index_key, template_version)
+
         return response.get('data', {}).get('deleteIndex', {}).get('ok', False)
 
-    @classmethod
-    def __graph_request(cls, operation: dict):
-        variables = operation.get('variables', {})
+    @staticmethod
+    def __mark_dirty(index_key: str, template_version: str):
+        from data_domain.managers import IndexCommitManager
+        IndexCommitManager.mark_dirty(index_key, template_version)
+
+    @staticmethod
+    def __forget_dirty(index_key: str, template_version: str):
+        from data_domain.managers import IndexCommitManager
+        IndexCommitManager.forget(index_key, template_version)
+
+    @staticmethod
+    def __get_matcher_url(variables: Union[dict, str]) -> str:
         if isinstance(variables, str):
             variables = json.loads(variables)
         ws_id = variables.get('workspaceId')
 
-        matcher_url = settings.MATCHER_SERVICE_URL
         if ws_id and Workspace.objects.get(id=ws_id).config.get('is_custom', False):
-            matcher_url = settings.MATCHER_SERVICE_V2_URL
+            return settings.MATCHER_SERVICE_V2_URL
+        return settings.MATCHER_SERVICE_URL
+
+    @classmethod
+    def __graph_request(cls, operation: dict, raise_errors: bool = False):
+        matcher_url = cls.__get_matcher_url(operation.get('variables', {}))
 
         try:
-            return requests.post(
+            return ServiceClient.for_service('matcher').post(
                 matcher_url + "/graphql",
                 data=json.dumps(operation),
-                headers={'Content-Type': 'application/json'},
-                timeout=settings.SERVICE_TIMEOUT
+                headers={'Content-Type': 'application/json'}
             ).json()
         except requests.exceptions.Timeout:
+            if raise_errors:
+                raise MatcherRequestError(f'{matcher_url} did not answer in time')
             return {}
+        except (requests.exceptions.RequestException, ValueError) as ex:
+            # matcher is down or answered with an error page which is not JSON
+            if raise_errors:
+                raise MatcherRequestError(f'{matcher_url} request failed. {ex}') from ex
+            raise
 
 
-class ActivityMatcherAPI:
+class RemoteActivityMatcher(MatcherBackend):
     @classmethod
     def set_base(cls, index_key: str, template_version: str):
         query = '''
@@ -286,7 +384,6 @@ class ActivityMatcherAPI:
                far: float = 1.0,
                frr: float = 0.0) -> List[dict]:
 
-        # TODO optimise network overhead
         query = '''
         query($indexKey: String!, $templateVersion: String!, $nearestCount: Int!, $templates: [Base64!]!,
                 $score: Float!, $faR: Float! , $frR: Float!){
@@ -314,8 +411,10 @@ class ActivityMatcherAPI:
             'frR': frr
         }
 
-        operation = {'query': query, 'variables': variables}
-        response = cls.__graph_request(operation)
+        response = BinaryTemplateTransport.search('activity_matcher', settings.ACTIVITY_MATCHER_SERVICE_URL, variables)
+        if response is None:
+            operation = {'query': query, 'variables': variables}
+            response = cls.__graph_request(operation)
         errors = response.get('errors')
 
         if errors is not None:
@@ -348,11 +447,36 @@ class ActivityMatcherAPI:
     def __graph_request(cls, operation: dict):
         matcher_url = settings.ACTIVITY_MATCHER_SERVICE_URL
         try:
-            return requests.post(
+            return ServiceClient.for_service('activity_matcher').post(
                 matcher_url + "/graphql",
                 data=json.dumps(operation),
-                headers={'Content-Type': 'application/json'},
-                timeout=settings.SERVICE_TIMEOUT
+                headers={'Content-Type': 'application/json'}
             ).json()
         except requests.exceptions.Timeout:
             return {}
+
+
+class MatcherProxy:
+    """
+    Routes matcher calls to the backend selected by MATCHER_BACKEND: 'remote' matcher services or 'local' engine
+    """
+    def __init__(self, remote: Type[MatcherBackend], local_factory: Callable[[], MatcherBackend]):
+        self.__remote = remote
+        self.__local_factory = local_factory
+        self.__local = None
+
+    @property
+    def backend(self) -> Union[Type[MatcherBackend], MatcherBackend]:
+        if settings.MATCHER_BACKEND != 'local':
+            return self.__remote
+
+        if self.__local is None:
+            self.__local = self.__local_factory()
+        return self.__local
+
+    def __getattr__(self, name: str):
+        return getattr(self.backend, name)
+
+
+MatcherAPI = MatcherProxy(RemoteMatcher, LocalMatcher.face)
+ActivityMatcherAPI = MatcherProxy(RemoteActivityMatcher, LocalMatcher.activity)
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.18 on 2023-06-05 09:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_domain', '0005_add_sample_ttl'),
+        ('data_domain', '0005_finalize_old_activitites'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexMutation',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('index', models.CharField(max_length=64)),
+                ('template_version', models.CharField(max_length=64)),
+                ('person_id', models.CharField(max_length=64)),
+                ('template_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('creation_date', models.DateTimeField(auto_now_add=True)),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index_mutations', to='user_domain.workspace')),
+            ],
+            options={
+                'verbose_name_plural': 'Index mutations',
+                'db_table': 'data_domain_index_mutation',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='indexmutation',
+            index=models.Index(fields=['index', 'template_version'], name='data_domain_index_2b26f6_idx'),
+        ),
+    ]
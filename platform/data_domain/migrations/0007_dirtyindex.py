@@ -0,0 +1,27 @@
+# Generated by Django 3.2.18 on 2023-06-13 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_domain', '0006_indexmutation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.CharField(max_length=64)),
+                ('template_version', models.CharField(max_length=64)),
+                ('dirty_since', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Dirty indexes',
+                'db_table': 'data_domain_dirty_index',
+                'unique_together': {('index', 'template_version')},
+            },
+        ),
+    ]
@@ -69,6 +69,40 @@ class BlobMeta(models.Model):
         verbose_name_plural = 'BlobMeta'
 
 
+class IndexMutation(models.Model):
+    """
+    Buffered change of a matcher index, template_id is None for removal of the person
+    """
+    id = models.BigAutoField(primary_key=True)
+
+    workspace = models.ForeignKey(Workspace, related_name='index_mutations', on_delete=models.CASCADE, null=False)
+
+    index = models.CharField(max_length=64)
+    template_version = models.CharField(max_length=64)
+    person_id = models.CharField(max_length=64)
+    template_id = models.CharField(max_length=64, null=True, blank=True)
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'data_domain_index_mutation'
+        verbose_name_plural = 'Index mutations'
+        indexes = [models.Index(fields=['index', 'template_version'])]
+
+
+class DirtyIndex(models.Model):
+    """
+    Matcher index with changes not committed yet, dirty_since is the time of the first uncommitted change
+    """
+    index = models.CharField(max_length=64)
+    template_version = models.CharField(max_length=64)
+    dirty_since = models.DateTimeField()
+
+    class Meta:
+        db_table = 'data_domain_dirty_index'
+        verbose_name_plural = 'Dirty indexes'
+        unique_together = ('index', 'template_version')
+
+
 # class SampleBlobMeta(models.Model):
 #     id = models.UUIDField(primary_key=True, unique=True, default=uuid4, editable=False)
 #     sample = models.ForeignKey(Sample, related_name='blobmeta_samples', on_delete=models.CASCADE)
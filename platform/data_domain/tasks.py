@@ -11,13 +11,14 @@ from django.db.models import DateField, IntegerField, Func
 from django.db.models.functions import Coalesce, Cast
 from django.contrib.postgres.fields.jsonb import KeyTextTransform, KeyTransform
 from django.conf import settings
+from django.core.cache import cache
 from celery import shared_task, execute
 
 from requests.exceptions import ConnectionError as RequestConnectionError
 
 from activation_manager.models import Activation
 from collector_domain.models import Agent, AttentionArea, Camera
-from data_domain.managers import ActivityManager, SampleManager
+from data_domain.managers import ActivityManager, SampleManager, IndexMutationManager, IndexCommitManager
 from data_domain.matcher.main import MatcherAPI, ActivityMatcherAPI
 from data_domain.models import Activity, Sample, BlobMeta
 from label_domain.models import Label
@@ -441,8 +442,8 @@ def reidentification(activity_id: str):
         if activity_quality > current_quality:
             template_id = SampleManager.get_template_id(activity_sample.meta, template_version)
             templates_info = [{'id': str(template_id), 'personId': str(person.id)}]
-            MatcherAPI.set_base_remove(str(activity.workspace.id), template_version, [str(person.id)])
-            MatcherAPI.set_base_add(str(activity.workspace.id), template_version, templates_info)
+            IndexMutationManager.remove(activity.workspace_id, activity.workspace_id, template_version, [person.id])
+            IndexMutationManager.add(activity.workspace_id, activity.workspace_id, template_version, templates_info)
 
         return
 
@@ -508,10 +509,11 @@ def reidentification(activity_id: str):
                     else:
                         person.info.update(person_meta)
                         person.save()
-                    # TODO: call async set-base
                     templates_info = [{'id': str(template_id), 'personId': str(person.id)}]
-                    MatcherAPI.set_base_remove(str(activity.workspace.id), template_version, [str(person.id)])
-                    MatcherAPI.set_base_add(str(activity.workspace.id), template_version, templates_info)
+                    IndexMutationManager.remove(activity.workspace_id, activity.workspace_id, template_version,
+                                                [person.id])
+                    IndexMutationManager.add(activity.workspace_id, activity.workspace_id, template_version,
+                                             templates_info)
 
             break
 
@@ -524,7 +526,7 @@ def reidentification(activity_id: str):
                     profile = Profile.objects.create(workspace=activity.workspace, person=person, info=person_meta)
 
             templates_info = [{'id': str(template_id), 'personId': str(person.id)}]
-            MatcherAPI.set_base_add(str(activity.workspace.id), template_version, templates_info)
+            IndexMutationManager.add(activity.workspace_id, activity.workspace_id, template_version, templates_info)
             break
 
     with transaction.atomic():
@@ -555,12 +557,15 @@ def rebuild_index(index: str, template_version: str):
              retry_backoff_max=700,
              retry_jitter=True)
 def commit_index():
-    for ws in Workspace.objects.filter(config__is_active=True):
-        template_version = ws.config.get('template_version', settings.DEFAULT_TEMPLATES_VERSION)
-        MatcherAPI.set_base_commit(str(ws.id), template_version)
+    # changes made outside of the platform or lost with a rolled back transaction are committed by a full pass
+    if settings.INDEX_FULL_COMMIT_PERIOD and cache.add('matcher:full_commit', True,
+                                                       timeout=settings.INDEX_FULL_COMMIT_PERIOD):
+        IndexCommitManager.mark_all_dirty()
 
-        for label in Label.objects.filter(workspace_id=ws.id).values_list('id', flat=True):
-            MatcherAPI.set_base_commit(str(label), template_version)
+    # buffered adds and removes go to the matcher right before the commit which makes them visible
+    IndexMutationManager.flush()
+
+    return IndexCommitManager.commit()
 
 
 @shared_task(autoretry_for=(RequestConnectionError,),
@@ -1,3 +1,84 @@
-from django.test import TestCase
+import base64
+from unittest import skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from data_domain.matcher.local import LocalMatcher, np
+from data_domain.models import Blob, BlobMeta
+from user_domain.models import Workspace
+
+
+@skipIf(np is None, 'numpy is not installed')
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   MATCHER_LOCAL_TEMPLATE_OFFSET=0)
+class LocalMatcherTest(TestCase):
+    template_version = 'template_test'
+
+    def setUp(self):
+        self.ws = Workspace.objects.create(title='testws', config={'is_active': True})
+        self.index = str(self.ws.id)
+        self.rng = np.random.default_rng(0)
+        self.templates = {}  # person id -> [(template id, vector)]
+        for person_idx in range(5):
+            self.add_template(f'person{person_idx}')
+
+        self.matcher = LocalMatcher('face', 'personId', self.load_templates)
+
+    def add_template(self, person_id: str, vector=None) -> dict:
+        vector = self.rng.standard_normal(128).astype(np.float32) if vector is None else vector
+        blob_meta = BlobMeta.objects.create(workspace=self.ws, blob=Blob.objects.create(data=vector.tobytes()))
+        self.templates.setdefault(person_id, []).append((str(blob_meta.id), vector))
+        return {'id': str(blob_meta.id), 'personId': person_id}
+
+    def load_templates(self, index: str, template_version: str):
+        return [(person_id, template_id) for person_id, templates in self.templates.items()
+                for template_id, _ in templates]
+
+    def search(self, vector, **kwargs) -> list:
+        template = base64.b64encode(vector.tobytes()).decode()
+        return self.matcher.search(self.index, self.template_version, [template], **kwargs)[0]['searchResult']
+
+    def test_set_base_add_remove_search(self):
+        self.assertEqual(self.matcher.set_base(self.index, self.template_version), 5)
+
+        probe = self.templates['person3'][0][1] + 0.1 * self.rng.standard_normal(128).astype(np.float32)
+        result = self.search(probe, nearest_count=2)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0]['personId'], 'person3')
+        self.assertEqual(result[0]['matchTemplateId'], self.templates['person3'][0][0])
+
+        new_vector = self.rng.standard_normal(128).astype(np.float32)
+        self.matcher.set_base_add(self.index, self.template_version, [self.add_template('person5', new_vector)])
+        self.assertEqual(self.search(new_vector, nearest_count=1)[0]['personId'], 'person5')
+
+        self.assertEqual(self.matcher.set_base_remove(self.index, self.template_version, ['person3', 'person5']), 4)
+        self.templates.pop('person3')
+        self.templates.pop('person5')
+        persons = [match['personId'] for match in self.search(probe, nearest_count=10)]
+        self.assertEqual(sorted(persons), ['person0', 'person1', 'person2', 'person4'])
+
+    def test_match_result_thresholds(self):
+        threshold = settings.MATCHER_LOCAL_MATCH_SIMILARITY
+        far_threshold = float(settings.DEFAULT_FAR_THRESHOLD_VALUE)
+        score_threshold = float(settings.DEFAULT_SCORE_THRESHOLD_VALUE)
+
+        at_threshold = LocalMatcher.match_result(threshold)
+        self.assertAlmostEqual(at_threshold['score'], score_threshold)
+        self.assertAlmostEqual(at_threshold['faR'], far_threshold)
+
+        match, non_match = LocalMatcher.match_result(threshold + 0.1), LocalMatcher.match_result(threshold - 0.1)
+        self.assertGreater(match['score'], score_threshold)
+        self.assertLess(match['faR'], far_threshold)
+        self.assertLess(non_match['score'], score_threshold)
+        self.assertGreater(non_match['faR'], far_threshold)
+
+        self.assertAlmostEqual(LocalMatcher.match_result(1.)['score'], 1.)
+        self.assertAlmostEqual(LocalMatcher.match_result(-1.)['faR'], 1.)
+
+    def test_search_filters_by_far(self):
+        self.matcher.set_base(self.index, self.template_version)
+        vector = self.templates['person1'][0][1]
+        result = self.search(vector, nearest_count=5, far=float(settings.DEFAULT_FAR_THRESHOLD_VALUE))
+        # random templates are near orthogonal, only the same template passes the default faR
+        self.assertEqual([match['personId'] for match in result], ['person1'])
@@ -48,12 +48,18 @@ app.conf.beat_schedule = {
     'matcher-indexes-commit': {
         'task': 'data_domain.tasks.commit_index',
         'schedule': settings.INDEX_UPDATE_PERIOD
+    },
+    'ingest-spool-drain': {
+        'task': 'api_gateway.tasks.drain_ingest_spool',
+        'schedule': settings.INGEST_SPOOL_DRAIN_PERIOD,
+        'args': ()
     }
 }
 
 
 app.conf.task_routes = {
     'notification_domain.tasks.triggers_handler': {'queue': settings.NOTIFICATIONS_QUEUE},
+    'notification_domain.tasks.trigger_events_handler': {'queue': settings.NOTIFICATIONS_QUEUE},
     'notification_domain.tasks.send_notification_task': {'queue': settings.NOTIFICATION_SENDER_QUEUE},
     'collector_domain.tasks.*': {'queue': settings.COLLECTOR_QUEUE},
     re.compile(r'^data_domain\.tasks\.(?!elastic_(drop|push|manager)$)(.*)'): {
@@ -63,6 +69,7 @@ app.conf.task_routes = {
     'person_domain.tasks.duplicate_persons': {'queue': settings.QA_QUEUE},
     'data_domain.tasks.commit_index': {'queue': settings.MATCHER_QUEUE},
     'data_domain.tasks.delete_index': {'queue': settings.MATCHER_QUEUE},
+    'api_gateway.tasks.*': {'queue': settings.INGEST_QUEUE},
 }
 
 
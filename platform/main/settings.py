@@ -328,6 +328,14 @@ MATCHER_SERVICE_V2_URL = f"http://{MATCHER_SERVICE_V2_HOST}:{MATCHER_SERVICE_V2_
 ACTIVITY_MATCHER_SERVICE_HOST = os.environ.get('ACTIVITY_MATCHER_SERVICE_HOST', 'localhost')
 ACTIVITY_MATCHER_SERVICE_PORT = os.environ.get('ACTIVITY_MATCHER_SERVICE_PORT', 5002)
 ACTIVITY_MATCHER_SERVICE_URL = f"http://{ACTIVITY_MATCHER_SERVICE_HOST}:{ACTIVITY_MATCHER_SERVICE_PORT}"
+# 'remote': matcher services, 'local': in-process NumPy engine for small and medium workspaces
+MATCHER_BACKEND = os.environ.get('MATCHER_BACKEND', 'remote')
+MATCHER_LOCAL_TEMPLATE_OFFSET = int(os.environ.get('MATCHER_LOCAL_TEMPLATE_OFFSET', 0))  # bytes before vector
+# cosine similarity of the local backend which gets DEFAULT_SCORE_THRESHOLD_VALUE and DEFAULT_FAR_THRESHOLD_VALUE,
+# set it to the similarity at the wanted faR of the template model
+MATCHER_LOCAL_MATCH_SIMILARITY = float(os.environ.get('MATCHER_LOCAL_MATCH_SIMILARITY', 0.5))
+# send search templates as raw bytes, matchers without binary endpoints are asked over GraphQL
+MATCHER_BINARY_TRANSPORT = json.loads(os.environ.get('MATCHER_BINARY_TRANSPORT', "True").lower())
 
 QUALITY_SERVICE_HOST = os.environ.get('QUALITY_SERVICE_HOST', '0.0.0.0')
 QUALITY_SERVICE_PORT = os.environ.get('QUALITY_SERVICE_PORT', 5005)
@@ -382,6 +390,16 @@ QUALITY_ASSESSMENT_HOST = os.environ.get('QUALITY_ASSESSMENT_ESTIMATOR_SERVICE_H
 QUALITY_ASSESSMENT_PORT = os.environ.get('QUALITY_ASSESSMENT_ESTIMATOR_PORT', 80)
 QUALITY_ASSESSMENT_SERVICE_URL = f"http://{QUALITY_ASSESSMENT_HOST}:{QUALITY_ASSESSMENT_PORT}"
 
+# image_api service hosting several blocks behind /process/pipeline, empty to send a request per block
+IMAGE_API_PIPELINE_HOST = os.environ.get('IMAGE_API_PIPELINE_SERVICE_HOST', '')
+IMAGE_API_PIPELINE_PORT = os.environ.get('IMAGE_API_PIPELINE_PORT', 80)
+IMAGE_API_PIPELINE_URL = (f"http://{IMAGE_API_PIPELINE_HOST}:{IMAGE_API_PIPELINE_PORT}"
+                          if IMAGE_API_PIPELINE_HOST else '')
+# images and templates are sent to image_api as raw bytes in BSON, services without binary endpoints get JSON
+IMAGE_API_BINARY_TRANSPORT = json.loads(os.environ.get('IMAGE_API_BINARY_TRANSPORT', "True").lower())
+# independent estimators requested at once by SampleEnricher without pipeline, not above image_api pool size
+SAMPLE_ENRICHER_CONCURRENCY = int(os.environ.get('SAMPLE_ENRICHER_CONCURRENCY', 4))
+
 SERVICE_KEY = os.environ.get("SERVICE_KEY", "1q2w3e4r")
 
 # QA group
@@ -423,6 +441,7 @@ CHANNEL_LAYERS = {
 }
 
 AGENT_INACTIVE_PERIOD_SECONDS = 60
+AGENT_HEARTBEAT_TIMEOUT = int(os.environ.get('AGENT_HEARTBEAT_TIMEOUT', 24 * 60 * 60))
 
 DEFAULT_PROFILE_LABEL_TITLES = ['Staff', 'VIP', 'Shoplifter']
 
@@ -448,13 +467,30 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 8388608  # 8 Mb
 MAX_IMAGE_WIDTH = int(os.environ.get('MAX_IMAGE_WIDTH', 4032))
 MAX_IMAGE_HEIGHT = int(os.environ.get('MAX_IMAGE_HEIGHT', 4032))
 BATCH_SIZE = int(os.environ.get('BATCH_SIZE', 1000))
+INGEST_BATCH_MAX_SAMPLES = int(os.environ.get('INGEST_BATCH_MAX_SAMPLES', 100))
+INGEST_SPOOL_BATCH_SIZE = int(os.environ.get('INGEST_SPOOL_BATCH_SIZE', 100))
+INGEST_SPOOL_CLAIM_TIMEOUT = int(os.environ.get('INGEST_SPOOL_CLAIM_TIMEOUT', 300))
+INGEST_SPOOL_MAX_ATTEMPTS = int(os.environ.get('INGEST_SPOOL_MAX_ATTEMPTS', 3))
+INGEST_IDEMPOTENCY_TTL = int(os.environ.get('INGEST_IDEMPOTENCY_TTL', 300))
+# decoded size of gzip or zstd encoded uploads. It is above DATA_UPLOAD_MAX_MEMORY_SIZE on purpose: file parts of
+# multipart batches are not counted by Django, while a body read as request.body stays capped by
+# DATA_UPLOAD_MAX_MEMORY_SIZE after decoding too
+INGEST_MAX_DECODED_SIZE = int(os.environ.get('INGEST_MAX_DECODED_SIZE', 67108864))  # 64 Mb
 
 # CELERY
 TRIGGERS_HANDLER_PERIOD = int(os.environ.get('TRIGGERS_HANDLER_PERIOD', 5))
+TRIGGERS_INDEX_TTL = int(os.environ.get('TRIGGERS_INDEX_TTL', 60))  # seconds a parsed trigger index is reused
+# active notifications without a trigger timer get one, e.g. the ones created by workers of the previous release
+TRIGGERS_TIMER_SEED_PERIOD = int(os.environ.get('TRIGGERS_TIMER_SEED_PERIOD', 60))
 PUSH_TO_ELASTIC_PERIOD = int(os.environ.get('PUSH_TO_ELASTIC_PERIOD', 60))
 AGENT_STATUS_CHECK_PERIOD = int(os.environ.get('AGENT_STATUS_CHECK_PERIOD', 30))
 ACTIVITY_STATUS_CHECK_PERIOD = int(os.environ.get('ACTIVITY_STATUS_CHECK_PERIOD', 30))
 INDEX_UPDATE_PERIOD = int(os.environ.get('INDEX_UPDATE_PERIOD', 60))
+INDEX_COMMIT_CONCURRENCY = int(os.environ.get('INDEX_COMMIT_CONCURRENCY', 8))  # not above matcher pool size
+INDEX_COMMIT_LAG_WARNING = int(os.environ.get('INDEX_COMMIT_LAG_WARNING', 2 * INDEX_UPDATE_PERIOD))  # seconds
+# period of committing all indexes, not only dirty ones, 0 disables
+INDEX_FULL_COMMIT_PERIOD = int(os.environ.get('INDEX_FULL_COMMIT_PERIOD', 3600))
+INGEST_SPOOL_DRAIN_PERIOD = int(os.environ.get('INGEST_SPOOL_DRAIN_PERIOD', 2))
 
 
 COLLECTOR_QUEUE = os.environ.get('COLLECTOR_QUEUE')
@@ -469,6 +505,7 @@ QA_QUEUE = os.environ.get('QA_QUEUE')
 DATA_PURGE_QUEUE = os.environ.get('DATA_PURGE_QUEUE')
 ACTIVITY_QUEUE = os.environ.get('ACTIVITY_QUEUE')
 MATCHER_QUEUE = os.environ.get('MATCHER_QUEUE')
+INGEST_QUEUE = os.environ.get('INGEST_QUEUE', COLLECTOR_QUEUE)
 
 IS_ON_PREMISE = bool(int(os.environ['IS_ON_PREMISE']))
 
@@ -541,6 +578,17 @@ ACTIVITY_FAILED_TIME = int(os.environ.get('ACTIVITY_FAILED_TIME', 30))
 NOTIFICATION_DEFAULT_TTL = int(os.environ.get('NOTIFICATION_DEFAULT_TTL', 30))  # in seconds
 
 SERVICE_TIMEOUT = int(os.environ.get('SERVICE_TIMEOUT', 10))  # in seconds
+SERVICE_TIMEOUTS = {
+    'image_api': int(os.environ.get('IMAGE_API_TIMEOUT', 60)),  # in seconds
+}
+SERVICE_POOL_SIZE = int(os.environ.get('SERVICE_POOL_SIZE', 10))  # keep-alive connections per service host
+SERVICE_POOL_SIZES = {
+    'matcher': int(os.environ.get('MATCHER_POOL_SIZE', SERVICE_POOL_SIZE)),
+    'activity_matcher': int(os.environ.get('ACTIVITY_MATCHER_POOL_SIZE', SERVICE_POOL_SIZE)),
+    'processing': int(os.environ.get('PROCESSING_POOL_SIZE', SERVICE_POOL_SIZE)),
+    'quality': int(os.environ.get('QUALITY_POOL_SIZE', SERVICE_POOL_SIZE)),
+    'image_api': int(os.environ.get('IMAGE_API_POOL_SIZE', SERVICE_POOL_SIZE)),
+}
 
 # Custom fields
 if REQUIRED_PROFILE_FIELDS := os.environ.get('REQUIRED_PROFILE_FIELDS', []):
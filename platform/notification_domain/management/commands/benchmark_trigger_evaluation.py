@@ -0,0 +1,70 @@
+import random
+import time
+import uuid
+
+from django.core.management import BaseCommand
+
+from platform_lib.meta_language_parser import MetaLanguageParser
+
+
+class Command(BaseCommand):
+    help = 'Time of evaluation of presence triggers over packed ongoings, parser per check against compiled parsers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--triggers', type=int, default=1000, help='Number of triggers')
+        parser.add_argument('--ongoings', type=int, default=500, help='Number of persons in ongoings')
+        parser.add_argument('--labels', type=int, default=200, help='Number of labels referenced by triggers')
+        parser.add_argument('--cameras', type=int, default=50, help='Number of cameras ongoings are spread over')
+        parser.add_argument('--number', type=int, default=5, help='Number of passes of every case')
+
+    @staticmethod
+    def __build_triggers(count: int, labels: list) -> list:
+        return [(str(uuid.uuid4()), {
+            'variables': {
+                '0_v': {
+                    'type': 'presence',
+                    'target': [{'type': 'Label', 'uuid': label} for label in random.sample(labels, 2)],
+                    'target_limit': 0,
+                    'target_operation': '>',
+                    'place': []
+                }
+            }
+        }) for _ in range(count)]
+
+    @staticmethod
+    def __build_ongoings(count: int, labels: list, cameras: int) -> list:
+        packed_ongoings = {}
+        for _ in range(count):
+            camera_id = str(random.randrange(cameras))
+            packed_ongoings.setdefault(camera_id, {
+                'camera_id': camera_id, 'location_ids': [''], 'attention_area_ids': [], 'area_type_ids': [],
+                'persons': []
+            })['persons'].append({
+                'id': str(uuid.uuid4()), 'profile_id': str(uuid.uuid4()), 'activity_id': str(uuid.uuid4()),
+                'match_data': {'score': random.random()}, 'profile_group_ids': random.sample(labels, 1),
+                'face_best_shot': None, 'body_best_shot': None
+            })
+        return list(packed_ongoings.values())
+
+    def handle(self, *args, **options):
+        labels = [str(uuid.uuid4()) for _ in range(options['labels'])]
+        triggers = self.__build_triggers(options['triggers'], labels)
+        packed_ongoings = self.__build_ongoings(options['ongoings'], labels, options['cameras'])
+        number = options['number']
+
+        cases = [
+            ('parser per check', lambda trigger_id, meta: MetaLanguageParser(meta)),
+            ('compiled', lambda trigger_id, meta: MetaLanguageParser.compiled(trigger_id, 0, meta)),
+        ]
+
+        for title, get_parser in cases:
+            detected = 0
+            start = time.perf_counter()
+            for _ in range(number):
+                for trigger_id, meta in triggers:
+                    result, _ = get_parser(trigger_id, meta).calculate_meta_condition(packed_ongoings, 0.5)
+                    detected += result
+            elapsed = (time.perf_counter() - start) / number
+
+            self.stdout.write(f'{title}: {elapsed * 1000:.1f} ms per pass of {len(triggers)} triggers over '
+                              f'{options["ongoings"]} persons, {detected // number} triggers fired')
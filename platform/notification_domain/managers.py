@@ -1,20 +1,25 @@
 import logging
+import threading
+import time
 import uuid
 from datetime import timedelta
 from enum import Enum
-from typing import Optional, List, Dict, Union, Callable
+from itertools import chain
+from typing import Optional, List, Dict, Union, Callable, Iterable, Tuple
 
 from django.apps import apps
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import F, QuerySet
+from django.db.models import F, QuerySet, Count, Max, Min
 from strawberry import ID
 
 from collector_domain.models import Camera
+from data_domain.managers import OngoingManager
 from data_domain.models import Activity
 from label_domain.models import Label
 from main import celery
-from notification_domain.models import Endpoint, Trigger, Notification
+from notification_domain.models import Endpoint, Trigger, Notification, TriggerTimer
 from notification_domain.utils import NotificationMessageGenerator
 from person_domain.models import Profile
 from platform_lib.managers import TriggerMetaManager, ActivityProcessManager
@@ -546,6 +551,247 @@ class NotificationManager:
             .exists()
 
 
+class TriggerTimerManager:
+    """
+    Timers of triggers with active notifications. A timer is due when notifications of the trigger may outlive
+    the trigger lifetime, timers are ticked every TRIGGERS_HANDLER_PERIOD and rescheduled to the next expiration
+    """
+    @staticmethod
+    def schedule(trigger_id: Union[str, uuid.UUID], due):
+        TriggerTimer.objects.bulk_create([TriggerTimer(trigger_id=trigger_id, due=due)], ignore_conflicts=True)
+        # the earliest expiration wins, notifications refreshed meanwhile are checked again on tick
+        TriggerTimer.objects.filter(trigger_id=trigger_id, due__gt=due).update(due=due)
+
+    @classmethod
+    def seed(cls) -> int:
+        """
+        Schedule timers of triggers with active notifications but without a timer, so every active notification
+        is deprecated after the trigger lifetime
+
+        Returns
+        -------
+        int
+            Number of scheduled timers
+        """
+        trigger_ids = set(Notification.objects.filter(is_active=True).values_list('meta__trigger__id', flat=True))
+        trigger_ids -= set(map(str, TriggerTimer.objects.values_list('trigger_id', flat=True)))
+        trigger_ids = list(Trigger.objects.filter(id__in=[i for i in trigger_ids if i])
+                           .values_list('id', flat=True))
+
+        now = utcnow_with_tz()
+        for trigger_id in trigger_ids:
+            cls.schedule(trigger_id, now)
+        return len(trigger_ids)
+
+    @classmethod
+    def tick(cls) -> int:
+        """
+        Deprecate outlived notifications of due triggers, missing timers are seeded every TRIGGERS_TIMER_SEED_PERIOD
+
+        Returns
+        -------
+        int
+            Number of due triggers
+        """
+        if cache.add('notification:timer_seed', True, timeout=settings.TRIGGERS_TIMER_SEED_PERIOD):
+            cls.seed()
+
+        with transaction.atomic():
+            timers = list(TriggerTimer.objects.select_for_update(skip_locked=True).select_related('trigger')
+                          .filter(due__lte=utcnow_with_tz()))
+            TriggerTimer.objects.filter(trigger_id__in=[timer.trigger_id for timer in timers]).delete()
+
+        for timer in timers:
+            trigger_id = str(timer.trigger_id)
+            lifetime = TriggerMetaManager(timer.trigger.meta).get_trigger_lifetime() or \
+                settings.NOTIFICATION_DEFAULT_TTL
+            NotificationManager.Presence.deprecate_with_lifetime(trigger_id, lifetime)
+
+            last_modified = Notification.objects.filter(meta__trigger__id=trigger_id, is_active=True) \
+                .aggregate(oldest=Min('last_modified'))['oldest']
+            if last_modified is not None:
+                cls.schedule(trigger_id, last_modified + timedelta(seconds=lifetime))
+
+        return len(timers)
+
+
+class TriggerEngine:
+    """
+    Incremental trigger evaluation. Triggers of a workspace are indexed by the persons, labels and locations
+    they reference, so an ongoings change evaluates only the triggers referencing something in it.
+    Parsed indexes are kept per process and rebuilt when triggers of the workspace change or after TRIGGERS_INDEX_TTL.
+    Ongoings expire without a change event, so triggers which become true when persons leave
+    (count below, equal or not equal to a limit) are also evaluated by the periodic pass
+    """
+    # index key of triggers evaluated by the periodic pass
+    periodic_key = '$periodic'
+    count_down_operations = ('<', '<=', '=', '!=')
+
+    __indexes: Dict[str, tuple] = {}
+    __lock = threading.Lock()
+
+    @classmethod
+    def handle_change(cls, workspace_id: str, keys: Optional[Iterable[str]] = None) -> int:
+        """
+        Evaluate triggers affected by the ongoings change of a workspace
+
+        Parameters
+        ----------
+        workspace_id: str
+            workspace which ongoings are changed
+        keys: Optional[Iterable[str]]
+            ids of persons, labels and locations of the changed ongoings, all triggers are affected if None
+
+        Returns
+        -------
+        int
+            Number of evaluated triggers
+        """
+        triggers = cls.get_affected(workspace_id, keys)
+        if not triggers:
+            return 0
+
+        packed_ongoings = cls.pack_ongoings(OngoingManager.get_ongoings(workspace_id=workspace_id))
+
+        trigger_ids = [str(trigger.id) for trigger, _ in triggers]
+        active_notifications = list(Notification.objects.filter(workspace_id=workspace_id, is_active=True,
+                                                                meta__trigger__id__in=trigger_ids))
+        evaluated = 0
+        for trigger, meta_language_parser in triggers:
+            trigger_active_notifications = [notification for notification in active_notifications
+                                            if notification.meta['trigger']['id'] == str(trigger.id)]
+            # without ongoings only triggers with notifications to close and count-down triggers can change
+            if not packed_ongoings and not trigger_active_notifications and \
+                    not cls.__is_count_down(meta_language_parser):
+                continue
+
+            notification_lcm = NotificationLifetimeCycleManager(
+                trigger,
+                active_notifications=trigger_active_notifications,
+                meta_language_parser=meta_language_parser
+            )
+            notification_lcm.handle_notification(packed_ongoings, event_mode=True)
+            evaluated += 1
+
+        return evaluated
+
+    @classmethod
+    def __is_count_down(cls, meta_language_parser: MetaLanguageParser) -> bool:
+        """
+        Whether the trigger can become true when persons leave
+        """
+        return any(meta_language_parser.get_variable_kwargs_by_number(i).get('target_operation')
+                   in cls.count_down_operations
+                   for i, _ in enumerate(meta_language_parser.meta.get('variables', {})))
+
+    @classmethod
+    def handle_periodic(cls) -> int:
+        """
+        Evaluate triggers which can become true without a change event, in all active workspaces
+
+        Returns
+        -------
+        int
+            Number of evaluated triggers
+        """
+        workspace_ids = Trigger.objects.filter(workspace__config__is_active=True) \
+            .values_list('workspace_id', flat=True).distinct()
+        return sum(cls.handle_change(str(workspace_id), [cls.periodic_key]) for workspace_id in workspace_ids)
+
+    @classmethod
+    def get_affected(cls, workspace_id: str, keys: Optional[Iterable[str]] = None) -> \
+            List[Tuple[Trigger, MetaLanguageParser]]:
+        index = cls.__get_index(str(workspace_id))
+        if keys is None:
+            triggers = chain.from_iterable(index.values())
+        else:
+            # triggers without targets and places are affected by any change
+            triggers = chain.from_iterable(index.get(key, []) for key in [None, *keys])
+
+        affected = {}
+        for trigger, meta_language_parser in triggers:
+            affected.setdefault(trigger.id, (trigger, meta_language_parser))
+        return list(affected.values())
+
+    @staticmethod
+    def pack_ongoings(ongoings: List[dict]) -> List[dict]:
+        """
+        Group persons of ongoings by camera and location
+        """
+        ongoing_group = dict()
+
+        for ongoing in ongoings:
+            key = f'{ongoing.get("camera_id", "")}:{ongoing.get("location_id", "")}'
+            human = OngoingManager.get_parent_process(ongoing)
+            human_object = human['object']
+
+            profile_group_list = human_object.get('match_data', {}).get('profileGroups', [])
+            human_object['profile_group_ids'] = [group.get('id') for group in profile_group_list]
+            human_object['face_best_shot'] = ongoing.get('face_best_shot')
+            human_object['body_best_shot'] = ongoing.get('body_best_shot')
+            human_object['activity_id'] = human['id']
+
+            if key in ongoing_group:
+                ongoing_group[key]['persons'].append(human_object)
+            else:
+                ongoing_group[key] = {
+                    'camera_id': ongoing.get('camera_id', ''),
+                    'location_ids': [ongoing.get('location_id', '')],
+                    'attention_area_ids': [],
+                    'area_type_ids': [],
+                    'persons': [human_object]
+                }
+
+        return list(ongoing_group.values())
+
+    @staticmethod
+    def get_change_keys(ongoings: List[dict]) -> List[str]:
+        """
+        Ids of persons, their labels and locations in ongoings, triggers are looked up by them
+        """
+        keys = set()
+        for ongoing in ongoings:
+            human_object = OngoingManager.get_parent_process(ongoing).get('object', {})
+            keys.add(human_object.get('id'))
+            keys.update(group.get('id') for group in human_object.get('match_data', {}).get('profileGroups', []))
+            keys.add(ongoing.get('location_id'))
+        keys.discard(None)
+        keys.discard('')
+        return sorted(map(str, keys))
+
+    @classmethod
+    def __get_index(cls, workspace_id: str) -> Dict[Optional[str], List[Tuple[Trigger, MetaLanguageParser]]]:
+        # soft deleted triggers are saved inactive, so they change last_modified of the workspace triggers too
+        version = tuple(Trigger.original_objects.filter(workspace_id=workspace_id)
+                        .aggregate(count=Count('id'), last_modified=Max('last_modified')).values())
+
+        cached = cls.__indexes.get(workspace_id)
+        if cached is not None and cached[0] == version and time.monotonic() - cached[1] < settings.TRIGGERS_INDEX_TTL:
+            return cached[2]
+
+        index = {}
+        triggers = Trigger.objects.select_related('workspace').filter(workspace_id=workspace_id,
+                                                                      workspace__config__is_active=True)
+        for trigger in triggers:
+            meta_language_parser = MetaLanguageParser.compiled(
+                trigger.id, trigger.last_modified, TriggerMetaManager(trigger.meta).get_condition_language()
+            )
+            keys = set()
+            for i, _ in enumerate(meta_language_parser.meta.get('variables', {})):
+                keys.update(item.get('uuid') for item in meta_language_parser.get_targets(i))
+                keys.update(item.get('uuid') for item in meta_language_parser.get_places(i))
+            keys.discard(None)
+            if cls.__is_count_down(meta_language_parser):
+                index.setdefault(cls.periodic_key, []).append((trigger, meta_language_parser))
+
+            for key in keys or [None]:
+                index.setdefault(key, []).append((trigger, meta_language_parser))
+
+        with cls.__lock:
+            cls.__indexes[workspace_id] = (version, time.monotonic(), index)
+        return index
+
+
 class NotificationLifetimeCycleManager:
     """
     Class that helps to handle and route trigger notifications
@@ -560,13 +806,15 @@ class NotificationLifetimeCycleManager:
     camera_model = apps.get_model('collector_domain', 'Camera')
     activity_model = apps.get_model('data_domain', 'Activity')
 
-    def get_notification_function(self, notification_type: str, fast_mode: bool) -> Optional[Callable]:
-        mapping_name = f'{notification_type}{"_fast" if fast_mode else ""}'
+    def get_notification_function(self, notification_type: str, fast_mode: bool, event_mode: bool = False) -> \
+            Optional[Callable]:
+        mapping_name = f'{notification_type}{"_fast" if fast_mode else ""}{"_event" if event_mode else ""}'
 
         scheme_mapping = {
             'presence': self.presence_scheme_reactivate,
             # 'location_overflow': self.location_overflow_schema,
-            'presence_fast': self.presence_scheme_only_creation
+            'presence_fast': self.presence_scheme_only_creation,
+            'presence_event': self.presence_scheme_event
         }
 
         try:
@@ -576,11 +824,16 @@ class NotificationLifetimeCycleManager:
 
         return function
 
-    def __init__(self, trigger: Trigger, active_notifications: List[Notification] = None):
+    def __init__(self,
+                 trigger: Trigger,
+                 active_notifications: List[Notification] = None,
+                 meta_language_parser: Optional[MetaLanguageParser] = None):
         self.workspace_id = str(trigger.workspace.id)
         self.manager = NotificationManager(workspace_id=self.workspace_id)
         self.trigger = trigger
-        self.meta_language_parser = MetaLanguageParser(TriggerMetaManager(trigger.meta).get_condition_language())
+        self.meta_language_parser = meta_language_parser or MetaLanguageParser.compiled(
+            trigger.id, trigger.last_modified, TriggerMetaManager(trigger.meta).get_condition_language()
+        )
 
         if active_notifications is None:
             self.active_notifications = list(self.manager.get_active(str(self.trigger.id)))
@@ -625,9 +878,10 @@ class NotificationLifetimeCycleManager:
     #     if self.trigger.endpoints.filter(type=Endpoint.Type.WEB_INTERFACE).exists():
     #         send_websocket_notifications(self.workspace_id, notif_socket_meta)
 
-    def handle_notification(self, packed_ongoings, fast_mode: bool = False):
+    def handle_notification(self, packed_ongoings, fast_mode: bool = False, event_mode: bool = False):
         """
         Use ongoings and trigger meta to calculate current state info and raise notification based on this state.
+        In event mode notifications are created and refreshed only, expiration is left to trigger timers
         """
 
         result, result_values = self.meta_language_parser.calculate_meta_condition(
@@ -637,7 +891,9 @@ class NotificationLifetimeCycleManager:
         result_value = list(result_values.values())[0]
 
         variable_type = self.meta_language_parser.get_variable_type_by_number(0)
-        notification_func = self.get_notification_function(notification_type=variable_type, fast_mode=fast_mode)
+        notification_func = self.get_notification_function(notification_type=variable_type,
+                                                           fast_mode=fast_mode,
+                                                           event_mode=event_mode)
 
         if not self.meta_language_parser.get_condition() and notification_func is not None:
             notification_func(result, result_value)
@@ -747,24 +1003,41 @@ class NotificationLifetimeCycleManager:
         """
         lifetime = TriggerMetaManager(self.trigger.meta).get_trigger_lifetime() or settings.NOTIFICATION_DEFAULT_TTL
 
-        def get_notifications_by_targets(targets: list) -> List[Notification]:
-            target_notifications = []
-            for target in targets:
-                person_notification = next(
-                    filter(lambda x: x.meta['profile']['id'] == target['profile_id'], self.active_notifications), None
-                )
-                if person_notification:
-                    target_notifications.append(person_notification)
-
-            return target_notifications
-
         if result:
             # update last modified only on active notifications
-            self.manager.refresh_last_modified_object_list(get_notifications_by_targets(result_value.target_info))
+            self.manager.refresh_last_modified_object_list(
+                self.__get_notifications_by_targets(result_value.target_info)
+            )
 
         # deprecate only old notifications that modified earlier than lifetime from now
         self.manager.Presence.deprecate_with_lifetime(str(self.trigger.id), lifetime)
 
+    def presence_scheme_event(self, result: bool, result_value: PresenceResult):
+        """
+        Presence notifications on ongoings change: create notifications of new targets, refresh the ones
+        of targets still present and schedule the trigger timer that deprecates them after lifetime
+        """
+        if not result:
+            return
+
+        refreshed = self.__get_notifications_by_targets(result_value.target_info)
+        self.presence_scheme_only_creation(result, result_value)
+        self.manager.refresh_last_modified_object_list(refreshed)
+
+        lifetime = TriggerMetaManager(self.trigger.meta).get_trigger_lifetime() or settings.NOTIFICATION_DEFAULT_TTL
+        TriggerTimerManager.schedule(self.trigger.id, utcnow_with_tz() + timedelta(seconds=lifetime))
+
+    def __get_notifications_by_targets(self, targets: list) -> List[Notification]:
+        target_notifications = []
+        for target in targets:
+            person_notification = next(
+                filter(lambda x: x.meta['profile']['id'] == target['profile_id'], self.active_notifications), None
+            )
+            if person_notification:
+                target_notifications.append(person_notification)
+
+        return target_notifications
+
 # def __create_location_overflow_notification(self, current_count: int, lifetime: int) -> Notification:
 #     location_id = self.meta_language_parser.get_places(0)[0].get('uuid')
 #     # location_title = self.get_label_title(location_id) if location_id else ''
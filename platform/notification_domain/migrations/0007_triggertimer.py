@@ -0,0 +1,41 @@
+# Generated by Django 3.2.18 on 2023-06-20 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def schedule_active_notifications(apps, schema_editor):
+    # active notifications were expired by the periodic handler before, now only by timers
+    Notification = apps.get_model('notification_domain', 'Notification')
+    Trigger = apps.get_model('notification_domain', 'Trigger')
+    TriggerTimer = apps.get_model('notification_domain', 'TriggerTimer')
+
+    trigger_ids = set(Notification.objects.filter(is_active=True).values_list('meta__trigger__id', flat=True))
+    now = django.utils.timezone.now()
+    TriggerTimer.objects.bulk_create([
+        TriggerTimer(trigger_id=trigger_id, due=now)
+        for trigger_id in Trigger.objects.filter(id__in=[i for i in trigger_ids if i]).values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification_domain', '0006_trigger_title'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TriggerTimer',
+            fields=[
+                ('trigger', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='timer', serialize=False, to='notification_domain.trigger')),
+                ('due', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Trigger timers',
+                'db_table': 'notification_domain_trigger_timer',
+            },
+        ),
+        migrations.RunPython(schedule_active_notifications, reverse_code=migrations.RunPython.noop),
+    ]
@@ -98,6 +98,18 @@ class Notification(models.Model):
         verbose_name_plural = 'Notifications'
 
 
+class TriggerTimer(models.Model):
+    """
+    Next time when active notifications of the trigger may outlive the trigger lifetime
+    """
+    trigger = models.OneToOneField(Trigger, primary_key=True, related_name='timer', on_delete=models.CASCADE)
+    due = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'notification_domain_trigger_timer'
+        verbose_name_plural = 'Trigger timers'
+
+
 @receiver(pre_delete, sender="notification_domain.Trigger")
 def deactivate_notification_trigger(sender, instance, *args, **kwargs):
     trigger_id = str(instance.id)
@@ -6,7 +6,7 @@ from django.conf import settings
 from django.db import transaction
 
 import platform_lib.utils
-from data_domain.managers import SampleManager
+from data_domain.managers import SampleManager, IndexMutationManager
 from data_domain.matcher.main import ActivityMatcherAPI, MatcherAPI
 from label_domain.managers import LabelManager
 from person_domain.models import Person, Profile
@@ -97,6 +97,8 @@ class PersonManager:
             for person in persons:
                 activity_ids += list(person.activities.values_list("id", flat=True))
             persons.delete()
+            # persons are removed from the matcher right away, buffered adds must not bring them back
+            IndexMutationManager.discard(workspace.id, person_ids)
 
         cls.__set_base_remove(workspace, person_ids, activity_ids)
         cls.__drop_elastic_index(str(workspace.id), person_ids)
@@ -156,19 +158,11 @@ class ProfileManager:
         )
         template_id = SampleManager.get_template_id(sample.meta, template_version)
         for index_key in remove_indexes:
-            current_app.tasks['data_domain.tasks.remove_from_index'].delay(
-                index=str(index_key),
-                template_version=template_version,
-                person_ids=[str(profile.person_id)]
-            )
+            IndexMutationManager.remove(workspace_id, index_key, template_version, [profile.person_id])
 
         templates_info = [{'id': template_id, 'personId': str(profile.person_id)}]
         for index_key in add_indexes:
-            current_app.tasks['data_domain.tasks.add_to_index'].delay(
-                index=str(index_key),
-                template_version=template_version,
-                templates_info=templates_info
-            )
+            IndexMutationManager.add(workspace_id, index_key, template_version, templates_info)
 
     @staticmethod
     def _add_to_indexes(indexes: Iterable[str], workspace_id: str, profile: Profile):
@@ -186,11 +180,7 @@ class ProfileManager:
 
         templates_info = [{'id': template_id, 'personId': str(profile.person_id)}]
         for index_key in indexes:
-            current_app.tasks['data_domain.tasks.add_to_index'].delay(
-                index=str(index_key),
-                template_version=template_version,
-                templates_info=templates_info
-            )
+            IndexMutationManager.add(workspace_id, index_key, template_version, templates_info)
 
     @staticmethod
     def _remove_from_indexes(indexes: Iterable[str], workspace_id: str, person_ids: List[str]):
@@ -198,11 +188,7 @@ class ProfileManager:
                             or settings.DEFAULT_TEMPLATES_VERSION)
 
         for index_key in indexes:
-            current_app.tasks['data_domain.tasks.remove_from_index'].delay(
-                index=str(index_key),
-                template_version=template_version,
-                person_ids=person_ids
-            )
+            IndexMutationManager.remove(workspace_id, index_key, template_version, person_ids)
 
     def get_profile(self) -> Profile:
         return self.profile
@@ -50,6 +50,7 @@ class CodedException(Exception):
             "0x573bkd35": "One or several profiles_groups does not exist",
             "0x86bjl434": "One or several activities does not exist",
             "0x943b3c24": "One or several samples does not exist",
+            "0x7c2e41a9": "Sample {} has no template of the workspace template version",
             "0x358vri3s": "Activity is anonymous"
         },
         "balance": {
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Pooled keep-alive HTTP clients of internal services (matchers, processing service, image api).
+
+Every service has its own requests session, so TCP connections are reused between calls instead of
+a handshake per request. Sessions are per process: they are dropped in forked children (celery prefork,
+preloaded gunicorn workers), so a child never shares sockets with its parent.
+"""
+import os
+import threading
+from typing import Dict
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# hosts kept in a session pool, image api estimators live on separate hosts
+POOL_HOSTS = 16
+
+
+class ServiceClient:
+    __clients: Dict[str, 'ServiceClient'] = {}
+    __lock = threading.Lock()
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool_size = settings.SERVICE_POOL_SIZES.get(name, settings.SERVICE_POOL_SIZE)
+        self.timeout = settings.SERVICE_TIMEOUTS.get(name, settings.SERVICE_TIMEOUT)
+        self.__session = None
+
+    @classmethod
+    def for_service(cls, name: str) -> 'ServiceClient':
+        """
+        Get client of a service
+
+        Parameters
+        ----------
+        name: str
+            service name, pool size and timeout are taken from SERVICE_POOL_SIZES and SERVICE_TIMEOUTS by it
+
+        Returns
+        -------
+        ServiceClient
+        """
+        client = cls.__clients.get(name)
+        if client is None:
+            with cls.__lock:
+                client = cls.__clients.setdefault(name, cls(name))
+        return client
+
+    @property
+    def session(self) -> requests.Session:
+        session = self.__session
+        if session is None:
+            with self.__lock:
+                if self.__session is None:
+                    self.__session = self.__create_session()
+                session = self.__session
+        return session
+
+    def __create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def reset(self):
+        """
+        Forget pooled connections without closing them, they may belong to the parent process
+        """
+        self.__session = None
+
+    @classmethod
+    def reset_all(cls):
+        cls.__lock = threading.Lock()
+        for client in cls.__clients.values():
+            client.reset()
+
+
+os.register_at_fork(after_in_child=ServiceClient.reset_all)
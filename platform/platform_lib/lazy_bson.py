@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Zero-copy BSON decoding of network samples.
+
+Same document layout as bson.loads produces, but the input buffer is never sliced into new bytes objects:
+binary values are returned as memoryviews into it, so blobs stay in the request buffer until they are written.
+"""
+import re
+import struct
+from binascii import b2a_hex
+from datetime import datetime, timezone
+from typing import Tuple, Union
+from uuid import UUID
+
+from bson.codec import decode_object
+
+_NUL = re.compile(b'\x00')
+
+_DOUBLE = struct.Struct('<d')
+_INT = struct.Struct('<i')
+_CHAR = struct.Struct('<b')
+_LONG = struct.Struct('<q')
+_UINT64 = struct.Struct('<Q')
+_INT_CHAR = struct.Struct('<ib')
+
+
+def loads(data: Union[bytes, bytearray, memoryview]) -> dict:
+    """
+    Decode BSON document. Binary values are memoryviews into **data**
+    """
+    view = data if isinstance(data, memoryview) else memoryview(data)
+    return _decode_document(view, 0)[1]
+
+
+def _decode_document(view: memoryview, base: int, as_array: bool = False) -> Tuple[int, Union[dict, list]]:
+    length = _INT.unpack_from(view, base)[0]
+    end_point = base + length
+    if view[end_point - 1] != 0:
+        raise ValueError('missing null-terminator in document')
+    base += 4
+    retval = [] if as_array else {}
+
+    while base < end_point - 1:
+        element_type = _CHAR.unpack_from(view, base)[0]
+
+        name_end = _NUL.search(view, base + 1).start()
+        name = None if as_array else str(view[base + 1:name_end], 'utf-8')
+        base = name_end + 1
+
+        if element_type == 0x01:  # double
+            value = _DOUBLE.unpack_from(view, base)[0]
+            base += 8
+        elif element_type == 0x02:  # string
+            length = _INT.unpack_from(view, base)[0]
+            value = str(view[base + 4:base + 4 + length - 1], 'utf-8')
+            base += 4 + length
+        elif element_type == 0x03:  # document
+            base, value = _decode_document(view, base)
+        elif element_type == 0x04:  # array
+            base, value = _decode_document(view, base, as_array=True)
+        elif element_type == 0x05:  # binary
+            length, binary_subtype = _INT_CHAR.unpack_from(view, base)
+            value = view[base + 5:base + 5 + length]
+            if binary_subtype in (0x03, 0x04):  # legacy UUID, UUID
+                value = UUID(bytes=value.tobytes())
+            base += 5 + length
+        elif element_type == 0x07:  # object_id
+            value = b2a_hex(view[base:base + 12])
+            base += 12
+        elif element_type == 0x08:  # boolean
+            value = bool(_CHAR.unpack_from(view, base)[0])
+            base += 1
+        elif element_type == 0x09:  # UTCdatetime
+            value = datetime.fromtimestamp(_LONG.unpack_from(view, base)[0] / 1000.0, timezone.utc)
+            base += 8
+        elif element_type == 0x0A:  # none
+            value = None
+        elif element_type == 0x10:  # int32
+            value = _INT.unpack_from(view, base)[0]
+            base += 4
+        elif element_type == 0x11:  # uint64
+            value = _UINT64.unpack_from(view, base)[0]
+            base += 8
+        elif element_type == 0x12:  # int64
+            value = _LONG.unpack_from(view, base)[0]
+            base += 8
+        else:
+            raise ValueError(f'unsupported element type {element_type:#x}')
+
+        if as_array:
+            retval.append(value)
+        else:
+            retval[name] = value
+
+    if not as_array and "$$__CLASS_NAME__$$" in retval:
+        retval = decode_object(retval)
+    return end_point, retval
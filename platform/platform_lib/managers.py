@@ -1,5 +1,7 @@
 import base64
+import time
 import uuid
+from collections import defaultdict
 from typing import Optional, Dict, List, Union, Tuple, Callable
 from enum import Enum
 import bson
@@ -9,8 +11,11 @@ import requests
 import json
 from django.core.cache import cache
 
+from platform_lib import lazy_bson
 from platform_lib.exceptions import KibanaError
+from platform_lib.validation import ValidatorRegistry, validate
 from platform_lib.validation.schemes import trigger_meta_scheme, activity_meta_scheme
+from plib.tracing.utils import get_tracer, ContextStub
 
 
 class BaseProcessManager:
@@ -28,12 +33,57 @@ class BaseProcessManager:
 
     key_process_info_values = {'quality', 'age', 'gender', 'time_interval', 'finalized', 'class'}
 
+    class ProcessIndex:
+        """
+        Lookup tables over list of processes built by one pass: class -> processes, id -> process
+        and parent id -> children. Order of processes in the original list is kept.
+        Process info is cached here as well by process object id
+        """
+        def __init__(self, processes: List[Dict]):
+            self.by_class = defaultdict(list)
+            self.by_id = {}
+            self.children = defaultdict(list)
+            self.process_info = {}
+
+            for process in processes:
+                self.by_class[process.get('object', {}).get('class')].append(process)
+                self.by_id.setdefault(process.get('id'), process)
+                self.children[process.get('parent')].append(process)
+
+        def get_descendants(self, process_id: str, output: Optional[List[Dict]] = None) -> List[Dict]:
+            """
+            Get all children of process with **process_id** recursively in depth-first order
+            """
+            output = [] if output is None else output
+            for child in self.children.get(process_id, []):
+                output.append(child)
+                self.get_descendants(child['id'], output)
+
+            return output
+
     def __init__(self, processes: List[Dict]):
         self.processes = processes
+        self.__index = None
+        self.__indexed_size = None
 
         # For static method replacing
         self._get_processes = self._get_processes_instance
 
+    @property
+    def index(self) -> ProcessIndex:
+        """
+        Index of **self.processes** built on first access.
+        It is rebuilt if processes were added or removed, changes inside of processes require **reset_index** call
+        """
+        if self.__index is None or self.__indexed_size != len(self.processes):
+            self.__index = self.ProcessIndex(self.processes)
+            self.__indexed_size = len(self.processes)
+
+        return self.__index
+
+    def reset_index(self):
+        self.__index = None
+
     @staticmethod
     def _get_processes(process_class: ProcessClass, processes: List[Dict]) -> List[Dict]:
         """
@@ -63,7 +113,21 @@ class BaseProcessManager:
         List[Dict]
             List of process with process_class
         """
-        return list(filter(lambda track: track.get('object', {}).get('class') == process_class.value, self.processes))
+        return list(self.index.by_class.get(process_class.value, []))
+
+    def get_process_by_id(self, process_id: str) -> Optional[Dict]:
+        return self.index.by_id.get(process_id)
+
+    def get_indexed_process_info(self, process: Dict) -> Dict:
+        """
+        Cached version of **get_process_info** for processes of this manager
+        """
+        cached_info = self.index.process_info
+        process_info = cached_info.get(id(process))
+        if process_info is None:
+            process_info = cached_info[id(process)] = self.get_process_info(process)
+
+        return process_info
 
     @classmethod
     def _iterate_through_process(cls,
@@ -245,7 +309,51 @@ class BaseProcessManager:
 class RawProcessManager(BaseProcessManager):
 
     @classmethod
-    def validate_sample_meta(cls, meta: Dict) -> bool:
+    def validate_sample_meta(cls, meta: Dict, validated: Optional[Dict] = None) -> bool:
+        """
+        Validate meta by activity meta scheme
+
+        Parameters
+        ----------
+        meta: Dict
+            Meta to validate
+        validated: Optional[Dict]
+            Snapshot of already valid meta got by **get_validated_snapshot**. Validation is skipped
+            if **meta** items constrained by the scheme are the same as in the snapshot
+
+        Returns
+        -------
+        bool
+            Validation result
+        """
+        tracer = get_tracer(__name__)
+        with tracer.start_as_current_span("validate_sample_meta") if tracer else ContextStub() as span:
+            start_time = time.perf_counter()
+            result, skipped = cls.__validate_sample_meta(meta, validated)
+            span.set_attribute("validation_time_ms", (time.perf_counter() - start_time) * 1000)
+            span.set_attribute("skipped", skipped)
+            span.set_attribute("valid", result)
+        return result
+
+    @classmethod
+    def get_validated_snapshot(cls, meta: Dict) -> Optional[Dict]:
+        """
+        Copy items of valid meta which are constrained by activity meta scheme.
+        Meta is changed in place during merging, so the snapshot is taken right after validation
+        """
+        return cls.__copy_meta(ValidatorRegistry.constrained_part(meta, activity_meta_scheme))
+
+    @classmethod
+    def __copy_meta(cls, meta):
+        # unlike deepcopy keeps blobs, which may be memoryviews, as is
+        if isinstance(meta, dict):
+            return {k: cls.__copy_meta(v) for k, v in meta.items()}
+        elif isinstance(meta, (list, tuple)):
+            return type(meta)([cls.__copy_meta(v) for v in meta])
+        return meta
+
+    @classmethod
+    def __validate_sample_meta(cls, meta: Dict, validated: Optional[Dict] = None) -> Tuple[bool, bool]:
 
         def json_decoder(o: Union[list, tuple, str]):
             if isinstance(o, str):
@@ -263,16 +371,21 @@ class RawProcessManager(BaseProcessManager):
             else:
                 return o
 
+        if validated is not None:
+            constrained_part = ValidatorRegistry.constrained_part(meta, activity_meta_scheme)
+            if constrained_part is not None and constrained_part == validated:
+                return True, True
+
         try:
-            jsonschema.validate(meta, activity_meta_scheme)
+            validate(meta, activity_meta_scheme)
         except jsonschema.ValidationError:
             try:
                 # bson doesn't decode numbers therefore try to decode meta data
                 s = {k: json_decoder(v) for k, v in meta.items()}
-                jsonschema.validate(s, activity_meta_scheme)
+                validate(s, activity_meta_scheme)
             except Exception:
-                return False
-        return True
+                return False, False
+        return True, False
 
     @classmethod
     def __bsm(cls, key: str, blob: bytes) -> Dict:
@@ -292,14 +405,16 @@ class RawProcessManager(BaseProcessManager):
         return result
 
     @classmethod
-    def decode(cls, data: bytes) -> Tuple[Dict, bool]:
+    def decode(cls, data: Union[bytes, memoryview], lazy: bool = False) -> Tuple[Dict, bool]:
         """
         Decodes abstract sample got over network
 
         Parameters
         ----------
-        data: bytes
+        data: Union[bytes, memoryview]
             "network sample" or raw_image
+        lazy: bool
+            Do not copy blobs out of **data**, they are decoded as memoryviews into it
 
         Returns
         -------
@@ -309,27 +424,36 @@ class RawProcessManager(BaseProcessManager):
         version_size = 1
         version = int.from_bytes(data[:version_size], byteorder='big')
         if version == 1:
+            if lazy:
+                return lazy_bson.loads(memoryview(data)[version_size:]), False
             return bson.loads(data[version_size:]), False
 
         # assume that it is a raw image and pack it to bsm format
         return cls.__bsm('image', data), True
 
+    @staticmethod
+    def is_network_sample(data: Union[bytes, memoryview]) -> bool:
+        """
+        Cheap format check of network sample without decoding: version byte and size of BSON document
+        """
+        version_size = 1
+        if len(data) < version_size + 5 or data[0] != 1:
+            return False
+
+        document_size = int.from_bytes(data[version_size:version_size + 4], byteorder='little')
+        return document_size == len(data) - version_size and data[-1] == 0
+
     @classmethod
     def parse_human_processes(cls, processes: List[Dict]) -> List[Dict]:
-        humans = cls._get_processes(cls.ProcessClass.HUMAN, processes)
+        index = cls.ProcessIndex(processes)
+        humans = index.by_class.get(cls.ProcessClass.HUMAN.value, [])
         humans_pack = []
 
-        def get_child(parent_id: str, output: list):
-            for proc in processes:
-                if proc.get('parent') == parent_id:
-                    output.append(proc)
-                    get_child(proc['id'], output)
-
         for human in humans:
             if human.get('finalize', True) and not human.get('object', {}).get('id'):
                 continue
             res = [human]
-            get_child(human['id'], res)
+            index.get_descendants(human['id'], res)
             humans_pack.append({'processes': res})
 
         return humans_pack
@@ -392,7 +516,7 @@ class ActivityProcessManager(BaseProcessManager):
         if len(face_processes) == 0:
             return None, None
 
-        face_info = self.get_process_info(face_processes[0])
+        face_info = self.get_indexed_process_info(face_processes[0])
 
         return face_info.get('age'), face_info.get('gender')
 
@@ -401,7 +525,7 @@ class ActivityProcessManager(BaseProcessManager):
         if len(face_processes) == 0:
             return None
 
-        face_info = self.get_process_info(face_processes[0])
+        face_info = self.get_indexed_process_info(face_processes[0])
 
         return face_info.get('$best_shot')
 
@@ -410,7 +534,7 @@ class ActivityProcessManager(BaseProcessManager):
         if len(body_processes) == 0:
             return None
 
-        body_info = self.get_process_info(body_processes[0])
+        body_info = self.get_indexed_process_info(body_processes[0])
 
         return body_info.get('$best_shot')
 
@@ -419,7 +543,7 @@ class ActivityProcessManager(BaseProcessManager):
         if len(face_processes) == 0:
             return None
 
-        face_info = self.get_process_info(face_processes[0])
+        face_info = self.get_indexed_process_info(face_processes[0])
 
         return face_info.get(f'${template_version}')
 
@@ -1,11 +1,22 @@
-import copy
+import operator
+import threading
 import uuid
-from collections import namedtuple
-from typing import List, Dict, Union
+from collections import namedtuple, OrderedDict
+from typing import Any, Callable, List, Dict, Union
 
 PresenceResult = namedtuple('PresenceResult', ['result', 'target_info'])
 LocationResult = namedtuple('LocationResult', ['result', 'current_count'])
 
+# comparisons allowed in target_operation
+OPERATIONS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '=': operator.eq,
+    '<=': operator.le,
+    '>=': operator.ge,
+    '!=': operator.ne
+}
+
 
 class MetaLanguageParser:
     """
@@ -26,8 +37,15 @@ class MetaLanguageParser:
         Obtain the type of function required to calculate a variable from the variable number
     calculate_meta_condition(ongoings: list):
         Checks the condition derived from the meta-language on the set of received ongoings
+    compiled(key: str, version: Any, meta: dict):
+        Get parser of a trigger from the cache of compiled parsers
     """
 
+    # compiled parsers by trigger, least recently used are dropped
+    cache_size = 4096
+    __compiled: 'OrderedDict[str, tuple]' = OrderedDict()
+    __lock = threading.Lock()
+
     dict_types_places = {
         'camera': 'camera_id',
         'location': 'location_ids',
@@ -37,7 +55,41 @@ class MetaLanguageParser:
 
     def __init__(self, meta: dict):
         self.meta = meta
-        self.__func_call_dict, self.__condition = self.__parse_meta_language(copy.deepcopy(meta))
+        self.__func_call_dict, self.__condition = self.__parse_meta_language(meta)
+        # variables compiled to functions of ongoings, evaluation does not touch meta anymore
+        self.__variable_functions = {
+            variable_name: self.__compile_variable(func_type, func_kwargs)
+            for variable_name, (func_type, func_kwargs) in self.__func_call_dict.items()
+        }
+
+    @classmethod
+    def compiled(cls, key: str, version: Any, meta: dict) -> 'MetaLanguageParser':
+        """
+        Get compiled parser of a trigger, the parser is compiled again when the version changes
+
+        Parameters
+        ----------
+        key: str
+            trigger id
+        version: Any
+            trigger modification time
+        meta: dict
+            trigger meta language
+        """
+        key = str(key)
+        with cls.__lock:
+            cached = cls.__compiled.get(key)
+            if cached is not None and cached[0] == version:
+                cls.__compiled.move_to_end(key)
+                return cached[1]
+
+        parser = cls(meta)
+        with cls.__lock:
+            cls.__compiled[key] = (version, parser)
+            cls.__compiled.move_to_end(key)
+            while len(cls.__compiled) > cls.cache_size:
+                cls.__compiled.popitem(last=False)
+        return parser
 
     def get_condition(self):
         return self.__condition
@@ -104,17 +156,10 @@ class MetaLanguageParser:
         if packed_ongoings is None:
             packed_ongoings = [{}]
 
-        condition_variables_result = {}
-        variable_function_mapping = self.__get_variable_function_mapping()
-
-        for function_var_name, function_call in self.__func_call_dict.items():
-            func_type = function_call[0]
-            func_kwargs = function_call[1]
-            # Enriching function named-arguments with ongoings
-            func_kwargs["packed_ongoings"] = packed_ongoings
-            func_kwargs["notification_score_threshold"] = notification_score_threshold
-
-            condition_variables_result[function_var_name] = (variable_function_mapping[func_type](**func_kwargs))
+        condition_variables_result = {
+            function_var_name: variable_function(packed_ongoings, notification_score_threshold)
+            for function_var_name, variable_function in self.__variable_functions.items()
+        }
 
         if self.__condition:
             # TODO made this when condition will be more than one variable
@@ -124,11 +169,21 @@ class MetaLanguageParser:
             return list(condition_variables_result.values())[0].result, condition_variables_result
 
     @classmethod
-    def __get_variable_function_mapping(cls) -> dict:
-        return {
-            "presence": cls.__presence,
-            "location_overflow": cls.__location_overflow
+    def __compile_variable(cls, func_type: str, func_kwargs: dict) -> Callable[[list, float], tuple]:
+        compilers = {
+            "presence": cls.__compile_presence,
+            "location_overflow": cls.__compile_location_overflow
         }
+        try:
+            return compilers[func_type](**func_kwargs)
+        except (KeyError, TypeError) as ex:
+            # malformed variables fail on calculation as before, getters of the parser keep working
+            error = ex
+
+            def malformed(packed_ongoings: list, notification_score_threshold: float):
+                raise error
+
+            return malformed
 
     def is_have_target(self, target_id: Union[str, uuid.UUID]) -> bool:
         for i, _ in enumerate(self.__func_call_dict):
@@ -147,17 +202,12 @@ class MetaLanguageParser:
         return False
 
     @staticmethod
-    def __check_operation(check_count: int, operation: str, limit: int) -> bool:
+    def __compile_operation(operation: str, limit: int) -> Callable[[int], bool]:
+        compare = OPERATIONS.get(operation)
+        if compare is None or type(limit) is not int:
+            return lambda check_count: False
 
-        if type(check_count) != int or type(limit) != int:
-            return False
-
-        acceptable_operations = ['>', '<', '=', '<=', '>=', '!=']
-        if operation in acceptable_operations:
-            eval_expression = f'{check_count} {operation} {limit}'
-            return eval(eval_expression)
-        else:
-            return False
+        return lambda check_count: type(check_count) is int and compare(check_count, limit)
 
     @staticmethod
     def __parse_meta_language(trigger_condition: dict) -> tuple:
@@ -167,14 +217,14 @@ class MetaLanguageParser:
         function_call_dict = {}
 
         for variable_name, variable_args in variables.items():
-            func_type = variable_args.pop("type")
-            func_kwargs = variable_args
+            func_type = variable_args["type"]
+            func_kwargs = {key: value for key, value in variable_args.items() if key != "type"}
             function_call_dict[variable_name] = (func_type, func_kwargs)
 
         return function_call_dict, condition
 
     @classmethod
-    def __location_overflow(cls, **kwargs) -> LocationResult:
+    def __compile_location_overflow(cls, **kwargs) -> Callable[[list, float], LocationResult]:
         """
         Function that determines that there are more people in a given place than the limit
 
@@ -182,29 +232,24 @@ class MetaLanguageParser:
         --------
         On cash register is more than 10 people
         """
-        packed_ongoings = kwargs["packed_ongoings"]
-        target_operation = kwargs["target_operation"]
-        target_limit = kwargs["target_limit"]
-        places = kwargs["place"]
+        check_operation = cls.__compile_operation(kwargs["target_operation"], kwargs["target_limit"])
+        place_uuids = frozenset(place["uuid"] for place in kwargs["place"])
 
-        place_uuids = {place["uuid"] for place in places}
+        def location_overflow(packed_ongoings: list, notification_score_threshold: float) -> LocationResult:
+            current_count = 0
 
-        variable_result = False
-        current_count = 0
+            for ongoing in packed_ongoings:
+                if not place_uuids.isdisjoint(ongoing["location_ids"]):
+                    current_count = len(ongoing["persons"])
+                    if check_operation(current_count):
+                        return LocationResult(True, current_count)
 
-        for ongoing in packed_ongoings:
-            if set(ongoing["location_ids"]) & place_uuids:
-                current_count = len(ongoing["persons"])
-                if cls.__check_operation(check_count=current_count,
-                                         operation=target_operation,
-                                         limit=target_limit):
-                    variable_result = True
-                    break
+            return LocationResult(False, current_count)
 
-        return LocationResult(variable_result, current_count)
+        return location_overflow
 
     @classmethod
-    def __presence(cls, **kwargs) -> PresenceResult:
+    def __compile_presence(cls, **kwargs) -> Callable[[list, float], PresenceResult]:
         """
         Function that determines whether a target is present or absent in any area of camera coverage in any quantity
 
@@ -212,46 +257,35 @@ class MetaLanguageParser:
         --------
         VIP is exist in any place
         """
-        packed_ongoings = kwargs["packed_ongoings"]
-        target_operation = kwargs["target_operation"]
-        target_limit = kwargs["target_limit"]
-        targets = kwargs["target"]
-        notification_score_threshold = kwargs['notification_score_threshold']
-
-        target_uuids = [target["uuid"] for target in targets]
-        detected_targets = []
-
-        for ongoing in packed_ongoings:
-            location_id = ongoing["location_ids"][0]
-            for person in ongoing['persons']:
-                if person.get('match_data', {}).get('score', 1) < notification_score_threshold:
-                    continue
-                person_id = person["id"]
-                # profile may not exist if person is not exist in base
-                profile_id = person.get("profile_id")
-                person_labels = person["profile_group_ids"]
-
-                person_info = {
-                    "id": person_id,
-                    "profile_id": profile_id,
-                    'activity_id': person['activity_id'],
-                    # "have_face_best_shot": person["have_face_best_shot"],
-                    # "have_body_best_shot": person["have_body_best_shot"],
-                    "face_best_shot": person["face_best_shot"],
-                    "body_best_shot": person["body_best_shot"],
-                    "profile_group_ids": person_labels,
-                    "location_id": location_id,
-                    "camera_id": ongoing["camera_id"],
-                }
-
-                if person_id in target_uuids:
-                    detected_targets.append(person_info)
-
-                if set(person_labels) & set(target_uuids):
-                    detected_targets.append(person_info)
-
-        result = cls.__check_operation(check_count=len(detected_targets),
-                                       operation=target_operation,
-                                       limit=target_limit)
-
-        return PresenceResult(result, detected_targets)
+        check_operation = cls.__compile_operation(kwargs["target_operation"], kwargs["target_limit"])
+        target_uuids = frozenset(target["uuid"] for target in kwargs["target"])
+
+        def presence(packed_ongoings: list, notification_score_threshold: float) -> PresenceResult:
+            detected_targets = []
+
+            for ongoing in packed_ongoings:
+                location_id = ongoing["location_ids"][0]
+                for person in ongoing['persons']:
+                    person_id = person["id"]
+                    person_labels = person["profile_group_ids"]
+                    # person is detected once by id and once more by labels, as the limit counts both
+                    matches = (person_id in target_uuids) + (not target_uuids.isdisjoint(person_labels))
+                    if not matches or person.get('match_data', {}).get('score', 1) < notification_score_threshold:
+                        continue
+
+                    person_info = {
+                        "id": person_id,
+                        # profile may not exist if person is not exist in base
+                        "profile_id": person.get("profile_id"),
+                        'activity_id': person['activity_id'],
+                        "face_best_shot": person["face_best_shot"],
+                        "body_best_shot": person["body_best_shot"],
+                        "profile_group_ids": person_labels,
+                        "location_id": location_id,
+                        "camera_id": ongoing["camera_id"],
+                    }
+                    detected_targets += [person_info] * matches
+
+            return PresenceResult(check_operation(len(detected_targets)), detected_targets)
+
+        return presence
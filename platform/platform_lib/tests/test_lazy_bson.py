@@ -0,0 +1,87 @@
+import os
+from datetime import datetime, timezone
+
+import bson
+from django.test import SimpleTestCase
+
+from platform_lib import lazy_bson
+
+
+def materialize(value):
+    """
+    Replace memoryviews of lazy document with bytes, as bson.loads returns them
+    """
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    if isinstance(value, dict):
+        return {key: materialize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [materialize(item) for item in value]
+    return value
+
+
+class LazyBsonTest(SimpleTestCase):
+    sample = {
+        'version': 1,
+        'timestamp': 1650000000123,
+        'score': 0.875,
+        'name': 'камера 1',
+        'is_active': True,
+        'deleted': None,
+        'created': datetime(2022, 4, 15, 5, 20, 0, tzinfo=timezone.utc),
+        '$image': os.urandom(1024),
+        'objects': [
+            {
+                'id': 0,
+                'class': 'face',
+                'bbox': [0.1, 0.2, 0.3, 0.4],
+                '$template': os.urandom(512),
+                'meta': {'labels': ['a', 'b'], 'nested': {'empty': {}, 'items': []}},
+            },
+            {'id': 1, 'class': 'body', 'bbox': [0.5, 0.6, 0.7, 0.8]},
+        ],
+        'matrix': [[1, 2], [3, 4], []],
+    }
+
+    def test_same_as_bson_loads(self):
+        data = bson.dumps(self.sample)
+
+        self.assertEqual(materialize(lazy_bson.loads(data)), bson.loads(data))
+
+    def test_binary_is_view_into_data(self):
+        data = bytearray(bson.dumps(self.sample))
+
+        sample = lazy_bson.loads(data)
+        image, template = sample['$image'], sample['objects'][0]['$template']
+
+        self.assertIsInstance(image, memoryview)
+        self.assertIsInstance(template, memoryview)
+        self.assertEqual(image.tobytes(), self.sample['$image'])
+        self.assertEqual(template.tobytes(), self.sample['objects'][0]['$template'])
+
+        # changes of the buffer are seen through the views, nothing was copied
+        offset = data.find(self.sample['$image'])
+        data[offset] ^= 0xFF
+        self.assertEqual(image[0], data[offset])
+
+    def test_accepts_memoryview_slice(self):
+        data = b'\x01' + bson.dumps(self.sample)
+
+        self.assertEqual(materialize(lazy_bson.loads(memoryview(data)[1:])), self.sample)
+
+    def test_truncated_and_malformed_input(self):
+        data = bson.dumps(self.sample)
+        cases = {
+            'empty': b'',
+            'short length': data[:3],
+            'truncated': data[:len(data) // 2],
+            'missing terminator': data[:-1] + b'\x01',
+            'unterminated name': b'\x0c\x00\x00\x00\x10abcdefg\x00',
+            'unsupported type': b'\x0c\x00\x00\x00\x7fa\x00\x00\x00\x00\x00\x00',
+        }
+        for title, case in cases.items():
+            with self.subTest(title):
+                with self.assertRaises(Exception):
+                    bson.loads(case)
+                with self.assertRaises(Exception):
+                    lazy_bson.loads(case)
@@ -0,0 +1,134 @@
+from django.test import SimpleTestCase
+
+from platform_lib.meta_language_parser import MetaLanguageParser
+
+VIP_LABEL = 'label-vip'
+PERSON_ID = 'person-1'
+LOCATION_ID = 'location-1'
+
+
+def presence_meta(operation: str, limit, target: list = None) -> dict:
+    return {
+        'variables': {
+            'a': {
+                'type': 'presence',
+                'target': target if target is not None else [{'uuid': VIP_LABEL, 'type': 'Label'}],
+                'target_operation': operation,
+                'target_limit': limit,
+            }
+        },
+        'condition': None
+    }
+
+
+def location_overflow_meta(operation: str, limit) -> dict:
+    return {
+        'variables': {
+            'a': {
+                'type': 'location_overflow',
+                'place': [{'uuid': LOCATION_ID, 'type': 'Location'}],
+                'target_operation': operation,
+                'target_limit': limit,
+            }
+        },
+        'condition': None
+    }
+
+
+def person(person_id: str = PERSON_ID, labels: list = None, score: float = None) -> dict:
+    data = {
+        'id': person_id,
+        'profile_id': f'profile-{person_id}',
+        'activity_id': f'activity-{person_id}',
+        'face_best_shot': None,
+        'body_best_shot': None,
+        'profile_group_ids': labels if labels is not None else [VIP_LABEL],
+    }
+    if score is not None:
+        data['match_data'] = {'score': score}
+    return data
+
+
+def ongoing(persons: list, location_id: str = LOCATION_ID) -> dict:
+    return {'camera_id': 'camera-1', 'location_ids': [location_id], 'persons': persons}
+
+
+class MetaLanguageParserTest(SimpleTestCase):
+    def calculate(self, meta: dict, ongoings: list, threshold: float = 0.5):
+        return MetaLanguageParser(meta).calculate_meta_condition(ongoings, threshold)
+
+    def test_presence_operations(self):
+        ongoings = [ongoing([person()])]  # one detection
+        cases = [
+            ('>', 0, True), ('>', 1, False),
+            ('<', 2, True), ('<', 1, False),
+            ('=', 1, True), ('=', 2, False),
+            ('<=', 1, True), ('<=', 0, False),
+            ('>=', 1, True), ('>=', 2, False),
+            ('!=', 0, True), ('!=', 1, False),
+        ]
+        for operation, limit, expected in cases:
+            with self.subTest(operation=operation, limit=limit):
+                result, _ = self.calculate(presence_meta(operation, limit), ongoings)
+                self.assertIs(result, expected)
+
+    def test_unknown_operation_and_limit_never_match(self):
+        ongoings = [ongoing([person()])]
+        for operation, limit in [('==', 1), ('>', '0'), ('>', 0.5)]:
+            with self.subTest(operation=operation, limit=limit):
+                result, _ = self.calculate(presence_meta(operation, limit), ongoings)
+                self.assertIs(result, False)
+
+    def test_presence_counts_id_and_label_matches(self):
+        meta = presence_meta('=', 2, target=[{'uuid': PERSON_ID, 'type': 'Person'},
+                                             {'uuid': VIP_LABEL, 'type': 'Label'}])
+        result, variables = self.calculate(meta, [ongoing([person()])])
+
+        self.assertIs(result, True)
+        self.assertEqual(len(variables['a'].target_info), 2)
+        self.assertEqual(variables['a'].target_info[0]['location_id'], LOCATION_ID)
+
+    def test_presence_skips_other_persons_and_low_scores(self):
+        ongoings = [ongoing([person('person-2', labels=[]), person('person-3', score=0.1), person('person-4')])]
+        result, variables = self.calculate(presence_meta('=', 1), ongoings, threshold=0.5)
+
+        self.assertIs(result, True)
+        self.assertEqual([info['id'] for info in variables['a'].target_info], ['person-4'])
+
+    def test_location_overflow(self):
+        ongoings = [
+            ongoing([person('person-1'), person('person-2')], location_id='location-2'),
+            ongoing([person('person-1'), person('person-2'), person('person-3')]),
+        ]
+
+        result, variables = self.calculate(location_overflow_meta('>', 2), ongoings)
+        self.assertIs(result, True)
+        self.assertEqual(variables['a'].current_count, 3)
+
+        result, variables = self.calculate(location_overflow_meta('>', 3), ongoings)
+        self.assertIs(result, False)
+        self.assertEqual(variables['a'].current_count, 3)
+
+    def test_malformed_variable_fails_on_calculation(self):
+        meta = {'variables': {'a': {'type': 'presence', 'target': []}}, 'condition': None}
+
+        parser = MetaLanguageParser(meta)
+        self.assertEqual(parser.get_variable_type_by_number(0), 'presence')
+        self.assertEqual(parser.get_targets(0), [])
+        with self.assertRaises(KeyError):
+            parser.calculate_meta_condition([ongoing([person()])], 0.5)
+
+        meta = {'variables': {'a': {'type': 'unknown'}}, 'condition': None}
+        with self.assertRaises(KeyError):
+            MetaLanguageParser(meta).calculate_meta_condition([ongoing([person()])], 0.5)
+
+    def test_compiled_is_invalidated_by_version(self):
+        key = 'trigger-compiled-test'
+        first = MetaLanguageParser.compiled(key, 1, presence_meta('>', 0))
+
+        self.assertIs(MetaLanguageParser.compiled(key, 1, presence_meta('>', 5)), first)
+
+        second = MetaLanguageParser.compiled(key, 2, presence_meta('>', 5))
+        self.assertIsNot(second, first)
+        result, _ = second.calculate_meta_condition([ongoing([person()])], 0.5)
+        self.assertIs(result, False)
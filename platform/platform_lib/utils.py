@@ -43,6 +43,7 @@ from django.conf import settings
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError
 
+from platform_lib.http_client import ServiceClient
 from platform_lib.exceptions import BadInputDataException
 from platform_lib.types import emotions_map, keypoints_map, JSONString, WithArchived, EyesInput, PointInputType, \
     CountList, FilterLookupCustom
@@ -618,12 +619,11 @@ def get_detect(image: str or bytes, templates_to_create: list,
     tracing_context = get_current_tracing_context()
     headers.update(tracing_context)
 
-    response = requests.post(
+    response = ServiceClient.for_service('processing').post(
         f'{settings.PROCESSING_SERVICE_URL}/graphql',
         data={'operations': operations, 'map': request_map},
         files={'0': ('image', image, 'application/octet-stream')},
-        headers=headers,
-        timeout=settings.SERVICE_TIMEOUT)
+        headers=headers)
     result = response.json()
     if result.get('errors') and result.get('errors')[0].get('message') == "No faces found":
         raise BadInputDataException('0x95bg42fd')
@@ -692,10 +692,9 @@ def estimate_quality(template_version: str, best_shot_id: str) -> float:
     try:
         tracing_context = get_current_tracing_context()
 
-        response = requests.post(
+        response = ServiceClient.for_service('quality').post(
             f'{settings.QUALITY_SERVICE_URL}/estimate/face',
             data=params,
-            timeout=settings.SERVICE_TIMEOUT,
             headers=tracing_context
         )
         response.raise_for_status()
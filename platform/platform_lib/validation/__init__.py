@@ -1,10 +1,65 @@
 # -*- coding: utf-8 -*-
+import re
+from typing import Dict, Optional, Tuple
+
 from jsonschema import Draft202012Validator, draft202012_format_checker, ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+
+class ValidatorRegistry:
+    """
+    Compiled validators cache.
+    Schemas are module or class level constants, so every schema is checked and compiled once per process
+    and its validator is kept by schema object id. Schema itself is kept too, so its id can not be reused
+    """
+    __validators: Dict[Tuple[int, Optional[type], bool], Tuple[dict, object]] = {}
+
+    @classmethod
+    def get(cls, schema: dict, validator_class: Optional[type] = None, format_checker: bool = False):
+        """
+        Get compiled validator of **schema**.
+        If validator class is not passed it is chosen and the schema is checked like jsonschema.validate does
+        """
+        key = (id(schema), validator_class, format_checker)
+        cached = cls.__validators.get(key)
+        if cached is None:
+            if validator_class is None:
+                validator_class = validator_for(schema)
+                validator_class.check_schema(schema)
+            validator = validator_class(schema, format_checker=draft202012_format_checker if format_checker else None)
+            cached = cls.__validators[key] = (schema, validator)
+
+        return cached[1]
+
+    @staticmethod
+    def constrained_part(instance: dict, schema: dict) -> Optional[dict]:
+        """
+        Get top level items of **instance** which are constrained by object **schema**.
+        Returns None if every item is constrained, so the whole instance should be taken into account
+        """
+        if (not isinstance(instance, dict) or schema.get('type') != 'object' or
+                set(schema.keys()) - {'type', 'properties', 'patternProperties', 'definitions', 'description'}):
+            return None
+
+        properties = schema.get('properties', {})
+        patterns = [re.compile(pattern) for pattern in schema.get('patternProperties', {})]
+        return {key: value for key, value in instance.items()
+                if key in properties or any(pattern.search(key) for pattern in patterns)}
+
+
+def validate(instance, schema: dict):
+    """
+    Same as jsonschema.validate but with validator compiled once per schema
+    """
+    error = best_match(ValidatorRegistry.get(schema).iter_errors(instance))
+    if error is not None:
+        raise error
 
 
 def is_valid_json(_dict, schema):
     try:
-        Draft202012Validator(schema, format_checker=draft202012_format_checker).validate(_dict)
+        ValidatorRegistry.get(schema, Draft202012Validator, format_checker=True).validate(_dict)
         return True
     except ValidationError as ex:  # TODO hard to debug need to make it verbose
         return False